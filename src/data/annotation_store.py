@@ -0,0 +1,440 @@
+import os
+import json
+import sqlite3
+import pathlib
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Union
+
+from data.binary_annotations import encode_annotations, decode_annotations
+
+ANNOTATION_ENCODINGS: list[str] = ["json", "binary"]
+
+
+def _check_encoding(encoding: str) -> None:
+    """
+    :param encoding: Encoding of stored annotations
+    """
+    if encoding not in ANNOTATION_ENCODINGS:
+        msg = f"Expected annotation encoding to be in {ANNOTATION_ENCODINGS}, "
+        msg += f"got '{encoding}'"
+        raise ValueError(msg)
+
+
+class AnnotationStore(ABC):
+    """
+    Storage backend for scene annotations addressed by scene name.
+    """
+
+    @abstractmethod
+    def read(self, name: str, arrays: bool = False) -> Optional[dict]:
+        """
+        Read annotations of a scene.
+        :param name: Scene name
+        :param arrays: Return points of binary encoded annotations as
+                       arrays of shape (n, 2) instead of nested lists
+        :return: Annotations or None if scene is not annotated yet
+        """
+
+    @abstractmethod
+    def write(self, name: str, annotations: dict) -> None:
+        """
+        Write annotations of a scene, replacing existing ones.
+        :param name: Scene name
+        :param annotations: Serialized scene
+        """
+
+    @abstractmethod
+    def delete(self, name: str) -> None:
+        """
+        Remove annotations of a scene if present.
+        :param name: Scene name
+        """
+
+    @abstractmethod
+    def names(self) -> list[str]:
+        """
+        :return: Sorted names of all annotated scenes
+        """
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        """
+        Iterate over all annotations in name order.
+        :return: Pairs of scene name and annotations
+        """
+        for name in self.names():
+            annotations: Optional[dict] = self.read(name)
+            if annotations is not None:
+                yield name, annotations
+
+    def __contains__(self, name: str) -> bool:
+        return self.read(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def close(self) -> None:
+        """
+        Release resources held by the store.
+        """
+        pass
+
+
+class JsonAnnotationStore(AnnotationStore):
+    """
+    One file per scene in the annotations directory, either as
+    JSON or in the compact binary format.
+    """
+
+    def __init__(
+        self,
+        annotations_path: Union[pathlib.Path, str],
+        encoding: str = "json",
+    ) -> None:
+        """
+        :param annotations_path: Directory containing JSON annotations
+        :param encoding: Encoding of annotation files ['json', 'binary']
+        """
+        _check_encoding(encoding)
+        self._annotations_path: pathlib.Path = pathlib.Path(annotations_path)
+        self._annotations_path.mkdir(parents=True, exist_ok=True)
+        self._encoding: str = encoding
+        self._suffix: str = ".json" if encoding == "json" else ".rlb"
+
+    @property
+    def annotations_path(self) -> pathlib.Path:
+        return self._annotations_path
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    def annotation_path(self, name: str) -> pathlib.Path:
+        """
+        :param name: Scene name
+        :return: Path to the annotation file of the scene
+        """
+        return self._annotations_path / (name + self._suffix)
+
+    def read(self, name: str, arrays: bool = False) -> Optional[dict]:
+        try:
+            if self._encoding == "binary":
+                data: bytes = self.annotation_path(name).read_bytes()
+                annotation = decode_annotations(data, arrays)
+            else:
+                with open(self.annotation_path(name)) as file_pointer:
+                    annotation = json.load(file_pointer)
+        except FileNotFoundError:
+            annotation = None
+        return annotation
+
+    def write(self, name: str, annotations: dict) -> None:
+        """
+        Write annotations to a temporary file first and rename it
+        afterwards, so a crash never leaves a truncated annotation.
+        :param name: Scene name
+        :param annotations: Serialized scene
+        """
+        annotation_path: pathlib.Path = self.annotation_path(name)
+        # Unique per process and thread, hidden from the scene listing
+        tmp_path: pathlib.Path = annotation_path.with_name(
+            f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            if self._encoding == "binary":
+                tmp_path.write_bytes(encode_annotations(annotations))
+            else:
+                with open(tmp_path, "w") as file_pointer:
+                    json.dump(annotations, file_pointer, indent=4, sort_keys=True)
+            os.replace(tmp_path, annotation_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def delete(self, name: str) -> None:
+        self.annotation_path(name).unlink(missing_ok=True)
+
+    def names(self) -> list[str]:
+        names: list[str] = []
+        with os.scandir(self._annotations_path) as directory:
+            for entry in directory:
+                stem, extension = os.path.splitext(entry.name)
+                if extension == self._suffix and not stem.startswith("."):
+                    names.append(stem)
+        return sorted(names)
+
+    def __contains__(self, name: str) -> bool:
+        return self.annotation_path(name).exists()
+
+
+class SQLiteAnnotationStore(AnnotationStore):
+    """
+    All annotations of a data set in a single SQLite file, stored
+    as compact JSON text or in the binary format.
+
+    Every thread gets its own connection, so the store may be shared
+    between the GUI, background writers and prefetchers. The store
+    can be pickled to worker processes, which open their own
+    connections.
+    """
+
+    def __init__(
+        self,
+        database_path: Union[pathlib.Path, str],
+        encoding: str = "json",
+    ) -> None:
+        """
+        :param database_path: Path of the SQLite file
+        :param encoding: Encoding of annotations ['json', 'binary']
+        """
+        _check_encoding(encoding)
+        self._encoding: str = encoding
+        self._database_path: pathlib.Path = pathlib.Path(database_path)
+        self._database_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS annotations "
+                "(name TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+
+    def __getstate__(self) -> dict:
+        return {"database_path": self._database_path, "encoding": self._encoding}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["database_path"], state["encoding"])
+
+    @property
+    def encoding(self) -> str:
+        return self._encoding
+
+    def _encode(self, annotations: dict) -> Union[str, bytes]:
+        """
+        :param annotations: Serialized scene
+        :return: Annotations as stored in the database
+        """
+        if self._encoding == "binary":
+            return encode_annotations(annotations)
+        return json.dumps(annotations, sort_keys=True, separators=(",", ":"))
+
+    @staticmethod
+    def _decode(data: Union[str, bytes], arrays: bool = False) -> dict:
+        """
+        Rows of both encodings may be mixed in one database.
+        :param data: Annotations as stored in the database
+        :param arrays: Return points of binary rows as arrays
+        :return: Serialized scene
+        """
+        if isinstance(data, bytes):
+            return decode_annotations(data, arrays)
+        return json.loads(data)
+
+    @property
+    def database_path(self) -> pathlib.Path:
+        return self._database_path
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        :return: Connection of the calling thread
+        """
+        connection: Optional[sqlite3.Connection]
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._database_path, timeout=60, check_same_thread=False
+            )
+            # Readers do not block the writer and vice versa
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def read(self, name: str, arrays: bool = False) -> Optional[dict]:
+        row: Optional[tuple[str]] = (
+            self._connection()
+            .execute("SELECT data FROM annotations WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return self._decode(row[0], arrays) if row else None
+
+    def write(self, name: str, annotations: dict) -> None:
+        data: Union[str, bytes] = self._encode(annotations)
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO annotations (name, data) VALUES (?, ?)",
+                (name, data),
+            )
+
+    def write_many(self, items: Iterator[tuple[str, dict]]) -> int:
+        """
+        Write many scenes in a single transaction.
+        :param items: Pairs of scene name and annotations
+        :return: Number of written scenes
+        """
+        rows: list[tuple[str, Union[str, bytes]]] = [
+            (name, self._encode(annotations)) for name, annotations in items
+        ]
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO annotations (name, data) VALUES (?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def delete(self, name: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM annotations WHERE name = ?", (name,))
+
+    def names(self) -> list[str]:
+        cursor: sqlite3.Cursor = self._connection().execute(
+            "SELECT name FROM annotations ORDER BY name"
+        )
+        return [row[0] for row in cursor]
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        cursor: sqlite3.Cursor = self._connection().execute(
+            "SELECT name, data FROM annotations ORDER BY name"
+        )
+        for name, data in cursor:
+            yield name, self._decode(data)
+
+    def __contains__(self, name: str) -> bool:
+        row: Optional[tuple[int]] = (
+            self._connection()
+            .execute("SELECT 1 FROM annotations WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return row is not None
+
+    def __len__(self) -> int:
+        cursor: sqlite3.Cursor
+        cursor = self._connection().execute("SELECT COUNT(*) FROM annotations")
+        return cursor.fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+ANNOTATION_STORES: list[str] = ["json", "sqlite"]
+
+
+def open_annotation_store(
+    dataset_path: Union[pathlib.Path, str],
+    backend: str = "json",
+    encoding: str = "json",
+) -> AnnotationStore:
+    """
+    Open the annotation store of a data set.
+    :param dataset_path: Path containing images and annotations
+    :param backend: Store layout, one of ANNOTATION_STORES
+    :param encoding: Encoding of annotations, one of ANNOTATION_ENCODINGS
+    :return: Annotation store
+    """
+    dataset_path = pathlib.Path(dataset_path)
+    if backend == "json":
+        return JsonAnnotationStore(dataset_path / "annotations", encoding)
+    elif backend == "sqlite":
+        return SQLiteAnnotationStore(dataset_path / "annotations.sqlite", encoding)
+    else:
+        msg = f"Expected annotation store to be in {ANNOTATION_STORES}, "
+        msg += f"got '{backend}'"
+        raise ValueError(msg)
+
+
+def convert_annotation_store(
+    source: AnnotationStore,
+    target: AnnotationStore,
+    batch_size: int = 1000,
+) -> int:
+    """
+    Copy all annotations from one store into another.
+    :param source: Store to read from
+    :param target: Store to write to
+    :param batch_size: Scenes per transaction for SQLite targets
+    :return: Number of converted scenes
+    """
+    converted: int = 0
+    if isinstance(target, SQLiteAnnotationStore):
+        batch: list[tuple[str, dict]] = []
+        for item in source.items():
+            batch.append(item)
+            if len(batch) >= batch_size:
+                converted += target.write_many(iter(batch))
+                batch = []
+        converted += target.write_many(iter(batch))
+    else:
+        for name, annotations in source.items():
+            target.write(name, annotations)
+            converted += 1
+    return converted
+
+
+def parse_cli() -> dict:
+    """
+    Parse CLI arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--dataset_path",
+        type=str,
+        help="Path to the directory containing a dataset",
+        required=True,
+    )
+    parser.add_argument(
+        "--source",
+        type=str,
+        help="Annotation store to read from",
+        choices=ANNOTATION_STORES,
+        default="json",
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        help="Annotation store to write to",
+        choices=ANNOTATION_STORES,
+        default="sqlite",
+    )
+    parser.add_argument(
+        "--source_encoding",
+        type=str,
+        help="Encoding of the annotations to read",
+        choices=ANNOTATION_ENCODINGS,
+        default="json",
+    )
+    parser.add_argument(
+        "--target_encoding",
+        type=str,
+        help="Encoding of the annotations to write",
+        choices=ANNOTATION_ENCODINGS,
+        default="json",
+    )
+    return vars(parser.parse_args())
+
+
+def main():
+    cli_args = parse_cli()
+    source: AnnotationStore
+    source = open_annotation_store(
+        cli_args["dataset_path"], cli_args["source"], cli_args["source_encoding"]
+    )
+    target: AnnotationStore
+    target = open_annotation_store(
+        cli_args["dataset_path"], cli_args["target"], cli_args["target_encoding"]
+    )
+    converted: int = convert_annotation_store(source, target)
+    source.close()
+    target.close()
+    print(f"Converted {converted} scenes.")
+
+
+if __name__ == "__main__":
+    main()
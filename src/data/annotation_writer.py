@@ -0,0 +1,169 @@
+import copy
+import json
+import time
+import hashlib
+import threading
+from typing import Optional
+
+from data.data_set import DataSet
+
+
+def annotation_hash(annotations: dict) -> str:
+    """
+    Hash of serialized scene annotations.
+    :param annotations: Serialized scene as given by Scene.to_dict
+    :return: Hex digest of annotations
+    """
+    serialized: str = json.dumps(annotations, sort_keys=True)
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+class AnnotationWriter:
+    """
+    Write scene annotations in a background thread.
+
+    Submitted annotations are skipped if they did not change since
+    they were loaded or written last. Several submits of the same
+    scene within the coalescing delay result in one write of the
+    latest annotations, written once no scene was submitted for the
+    delay.
+    """
+
+    def __init__(self, dataset: DataSet, delay: float = 0.5) -> None:
+        """
+        :param dataset: Data set to write annotations to
+        :param delay: Seconds to wait for further submits before writing
+        """
+        self._dataset: DataSet = dataset
+        self._delay: float = delay
+        self._hashes: dict[str, str] = {}
+        self._pending: dict[str, dict] = {}
+        # Annotations taken from pending by the running write
+        self._in_flight: dict[str, dict] = {}
+        self._last_submit: float = 0.0
+        self._writing: bool = False
+        self._flushing: bool = False
+        self._closed: bool = False
+        self._error: Optional[BaseException] = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="AnnotationWriter", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def mark_clean(self, name: str, annotations: dict) -> None:
+        """
+        Remember annotations of a scene as stored, e.g. after loading.
+        :param name: Scene name
+        :param annotations: Serialized scene
+        """
+        with self._condition:
+            self._hashes[name] = annotation_hash(annotations)
+
+    def submit(self, name: str, annotations: dict) -> bool:
+        """
+        Queue annotations of a scene for writing.
+        :param name: Scene name
+        :param annotations: Serialized scene
+        :return: True if annotations changed and are queued
+        """
+        digest: str = annotation_hash(annotations)
+        with self._condition:
+            if self._closed:
+                msg = f'Can not write "{name}", annotation writer is closed.'
+                raise RuntimeError(msg)
+            if self._hashes.get(name) == digest:
+                return False
+            self._hashes[name] = digest
+            self._pending[name] = copy.deepcopy(annotations)
+            self._last_submit = time.monotonic()
+            self._condition.notify_all()
+        return True
+
+    def pending(self, name: str) -> Optional[dict]:
+        """
+        Read through to annotations submitted but not yet written, so a
+        scene reloaded right after a submit is not read stale from the
+        store.
+        :param name: Scene name
+        :return: Copy of the latest submitted annotations of the scene,
+                 None if all of its submits are written
+        """
+        with self._condition:
+            annotations: Optional[dict] = self._pending.get(name)
+            if annotations is None:
+                annotations = self._in_flight.get(name)
+            return copy.deepcopy(annotations)
+
+    def flush(self) -> None:
+        """
+        Block until all queued annotations are written.
+        """
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+            while self._pending or self._writing:
+                self._condition.wait()
+            self._flushing = False
+            self._raise_error()
+
+    def close(self) -> None:
+        """
+        Write all queued annotations and stop the writer thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        with self._condition:
+            self._raise_error()
+
+    def _raise_error(self) -> None:
+        """
+        Raise the first error of the writer thread in the calling thread.
+        """
+        if self._error:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        """
+        Loop of the writer thread.
+        """
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending and self._closed:
+                    return
+                # Coalesce rapid submits unless someone waits for the writes
+                while not self._closed and not self._flushing:
+                    remaining: float = (
+                        self._last_submit + self._delay - time.monotonic()
+                    )
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                pending, self._pending = self._pending, {}
+                self._in_flight = pending
+                self._writing = True
+            for name, annotations in pending.items():
+                try:
+                    self._dataset.write_annotations(name, annotations)
+                except Exception as error:
+                    with self._condition:
+                        # Forget hash so a later submit retries the write
+                        self._hashes.pop(name, None)
+                        self._error = self._error or error
+            with self._condition:
+                self._in_flight = {}
+                self._writing = False
+                self._condition.notify_all()
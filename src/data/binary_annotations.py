@@ -0,0 +1,131 @@
+import json
+import struct
+from typing import Union
+
+import numpy as np
+
+# File signature followed by the byte length of the JSON header
+MAGIC: bytes = b"RLB1"
+_HEADER: struct.Struct = struct.Struct("<4sI")
+# Keys of lists holding [x, y] coordinates in serialized scenes
+COORDINATE_KEYS: tuple[str, ...] = ("points", "marks")
+
+
+def _split(node, coordinates: list[np.ndarray]):
+    """
+    Replace coordinate lists by their length and collect coordinates.
+    Lists of floats are flagged, so integer coordinates keep their
+    type if stored in a float block.
+    :param node: Part of serialized scene
+    :param coordinates: Collected coordinate arrays
+    :return: Skeleton of the node
+    """
+    if isinstance(node, dict):
+        skeleton: dict = {}
+        for key, value in node.items():
+            if key in COORDINATE_KEYS and isinstance(value, (list, np.ndarray)):
+                points: np.ndarray = np.asarray(value).reshape(-1, 2)
+                if not len(points):
+                    points = points.astype(np.int64)
+                coordinates.append(points)
+                skeleton[str(key)] = {"__points__": len(points)}
+                if not np.issubdtype(points.dtype, np.integer):
+                    skeleton[str(key)]["__float__"] = 1
+            else:
+                skeleton[str(key)] = _split(value, coordinates)
+        return skeleton
+    elif isinstance(node, (list, tuple)):
+        return [_split(value, coordinates) for value in node]
+    return node
+
+
+def _join(node, coordinates: np.ndarray, offset: list[int], arrays: bool, typed: bool):
+    """
+    Replace coordinate counts by the coordinates.
+    :param node: Part of skeleton
+    :param coordinates: All coordinates, shape (n, 2)
+    :param offset: Position of the next coordinate, updated in place
+    :param arrays: Return coordinates as arrays instead of lists
+    :param typed: Float coordinates of lists not flagged as float are
+                  integers
+    :return: Node of serialized scene
+    """
+    if isinstance(node, dict):
+        if "__points__" in node and set(node) <= {"__points__", "__float__"}:
+            count: int = node["__points__"]
+            points: np.ndarray = coordinates[offset[0] : offset[0] + count]
+            offset[0] += count
+            if typed and "__float__" not in node:
+                points = points.astype(np.int64)
+            return points if arrays else points.tolist()
+        return {
+            key: _join(value, coordinates, offset, arrays, typed)
+            for key, value in node.items()
+        }
+    elif isinstance(node, list):
+        return [_join(value, coordinates, offset, arrays, typed) for value in node]
+    return node
+
+
+def encode_annotations(annotations: dict) -> bytes:
+    """
+    Encode serialized scene into the compact binary format.
+
+    The structure of the scene is stored as JSON header without any
+    coordinates. All mark coordinates follow as one block of delta
+    encoded int16 or int32 values, or float64 if coordinates are not
+    integral. Integer coordinates keep their type in float blocks.
+    :param annotations: Serialized scene as given by Scene.to_dict
+    :return: Encoded scene
+    """
+    coordinates: list[np.ndarray] = []
+    skeleton: dict = _split(annotations, coordinates)
+    points: np.ndarray = (
+        np.concatenate(coordinates) if coordinates else np.zeros((0, 2), dtype=np.int64)
+    )
+    if np.issubdtype(points.dtype, np.integer):
+        points = points.astype(np.int64)
+        deltas: np.ndarray = np.diff(points, axis=0, prepend=0)
+        dtype: str = "<i2"
+        largest: int = np.abs(deltas).max().item() if len(deltas) else 0
+        if largest > np.iinfo(np.int16).max:
+            dtype = "<i4"
+        if largest > np.iinfo(np.int32).max:
+            msg = f"Expected coordinate deltas to fit into int32, got {largest}"
+            raise ValueError(msg)
+        block: bytes = deltas.astype(dtype).tobytes()
+    else:
+        dtype = "<f8"
+        block = points.astype(dtype).tobytes()
+    header: bytes = json.dumps(
+        {"dtype": dtype, "count": len(points), "typed": True, "scene": skeleton},
+        separators=(",", ":"),
+    ).encode()
+    return _HEADER.pack(MAGIC, len(header)) + header + block
+
+
+def decode_annotations(data: Union[bytes, memoryview], arrays: bool = False) -> dict:
+    """
+    Decode scene from the compact binary format.
+    :param data: Encoded scene
+    :param arrays: Return coordinates as arrays of shape (n, 2) for
+                   bulk loading instead of nested lists
+    :return: Serialized scene as read from the JSON format
+    """
+    magic, header_length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        msg = f"Expected binary annotations to start with {MAGIC}, got {magic}"
+        raise ValueError(msg)
+    header_end: int = _HEADER.size + header_length
+    header: dict = json.loads(bytes(data[_HEADER.size : header_end]))
+    dtype: str = header["dtype"]
+    block: np.ndarray = np.frombuffer(
+        data, dtype=dtype, count=header["count"] * 2, offset=header_end
+    ).reshape(-1, 2)
+    points: np.ndarray
+    if dtype == "<f8":
+        points = block.astype(np.float64)
+    else:
+        points = np.cumsum(block, axis=0, dtype=np.int64)
+    # Files written before integer lists were typed decode as floats
+    return _join(header["scene"], points, [0], arrays, header.get("typed", False))
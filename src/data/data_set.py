@@ -1,46 +1,148 @@
-import json
-from typing import Union
+import collections
+import concurrent.futures
+from typing import Callable, Iterator, Optional, Union
 import pathlib
 import cv2
+import numpy as np
+from PIL import Image
+
+from data.manifest import DataSetManifest
+from data.frame_cache import FrameCache
+from data.annotation_store import (
+    AnnotationStore,
+    JsonAnnotationStore,
+    open_annotation_store,
+)
+
+# OpenCV read flags per decode scale, JPEGs are reduced by DCT scaling
+REDUCED_READ_FLAGS: dict[int, int] = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
 
 
 class DataSet:
     """
     Loads images and annotations.
 
+    Scenes are addressed by their name, i.e. the image file stem.
+    Apart from the file listing collected on initialization the
+    data set holds no state, so reads and writes of different
+    scenes may be issued concurrently from several threads.
     """
 
-    def __init__(self, dataset_path: Union[pathlib.Path, str]):
+    def __init__(
+        self,
+        dataset_path: Union[pathlib.Path, str],
+        manifest: bool = False,
+        annotation_store: Union[str, AnnotationStore] = "json",
+        annotation_encoding: str = "json",
+        decode_scale: int = 1,
+        frame_cache: Optional[FrameCache] = None,
+    ):
         """
         Initialize the data loader.
 
         :param dataset_path: Path containing images and annotations.
+        :param manifest: Use a persistent manifest instead of listing
+                         the images directory on every start.
+        :param annotation_store: Annotation store or its backend name.
+        :param annotation_encoding: Encoding of annotations if the
+                                    store is given by name.
+        :param decode_scale: Decode images reduced by this factor
+                             [1, 2, 4, 8]. JPEG images are scaled
+                             while decoding.
+        :param frame_cache: Cache of decoded frames shared between
+                            runs and processes.
         :return: None.
         """
         self._dataset_path = pathlib.Path(dataset_path)
+        if decode_scale not in REDUCED_READ_FLAGS:
+            msg = f"Expected decode scale to be in {list(REDUCED_READ_FLAGS)}"
+            msg += f", got {decode_scale}"
+            raise ValueError(msg)
+        self._decode_scale: int = decode_scale
+        self._frame_cache: Optional[FrameCache] = frame_cache
+
+        # Store holding the annotations
+        self._annotation_store: AnnotationStore
+        if isinstance(annotation_store, str):
+            annotation_store = open_annotation_store(
+                self._dataset_path, annotation_store, annotation_encoding
+            )
+        self._annotation_store = annotation_store
+        self._camera_yml = self._dataset_path / "camera" / "camera.yaml"
 
         # Collect all images and annotations
         # Directory with images
-        images_path = self._dataset_path / "images"
+        self._images_path = self._dataset_path / "images"
+        self._manifest: Optional[DataSetManifest] = None
+        if manifest:
+            self._manifest = DataSetManifest(self._dataset_path)
+            annotated_names: Optional[list[str]] = None
+            store: AnnotationStore = self._annotation_store
+            # The manifest scans the annotations directory for JSON files
+            if not (
+                isinstance(store, JsonAnnotationStore) and store.encoding == "json"
+            ):
+                annotated_names = store.names()
+            self._manifest.refresh(annotated_names=annotated_names)
+            self._images_paths = []
+        else:
+            self._scan_images()
 
+    def _scan_images(self) -> None:
+        """
+        List the images directory.
+        """
         # Find paths to images with all given extensions
         extensions = {"*.jpg", "*.jpeg", "*.png"}
         self._images_paths = []
         for extension in extensions:
-            for image_path in images_path.glob(extension):
+            for image_path in self._images_path.glob(extension):
                 self._images_paths.append(image_path)
         # Sort to get video image order.
         self._images_paths = sorted(self._images_paths)
-        # Path to directory with annotations
-        self._json_path = self._dataset_path / "annotations"
-        self._json_path.mkdir(parents=True, exist_ok=True)
-        self._camera_yml = self._dataset_path / "camera" / "camera.yaml"
+        # Scene name to position in data set
+        self._name_to_index: dict[str, int] = {
+            image_path.stem: index
+            for index, image_path in enumerate(self._images_paths)
+        }
+
+    @classmethod
+    def from_settings(
+        cls, dataset_path: Union[pathlib.Path, str], settings: dict
+    ) -> "DataSet":
+        """
+        Create data set configured by RailLabel settings.
+        :param dataset_path: Path containing images and annotations
+        :param settings: Dict of RailLabel settings
+        :return: Data set
+        """
+        frame_cache: Optional[FrameCache] = None
+        if settings.get("frame_cache_path"):
+            frame_cache = FrameCache(
+                settings["frame_cache_path"],
+                int(settings.get("frame_cache_size_gb", 50) * 2**30),
+            )
+        return cls(
+            dataset_path,
+            manifest=settings.get("dataset_manifest", False),
+            annotation_store=settings.get("annotation_store", "json"),
+            annotation_encoding=settings.get("annotation_encoding", "json"),
+            decode_scale=settings.get("decode_scale", 1),
+            frame_cache=frame_cache,
+        )
 
     def __len__(self):
         """
         Implement the len() call on the data loader.
         :return: Length of dataset.
         """
+        if self._manifest is not None:
+            return len(self._manifest)
         return len(self._images_paths)
 
     def __getitem__(self, item):
@@ -48,29 +150,202 @@ class DataSet:
         :param item: Subscription of data loader.
         :return: Dictionary with image and annotation.
         """
-        image_path = self._images_paths[item]
-        image = cv2.imread(str(image_path))
-        # Try to get annotations file.
-        self.annotation_path = self._json_path / (image_path.stem + ".json")
-        try:
-            with open(self.annotation_path) as file_pointer:
-                annotation = json.load(file_pointer)
-        except FileNotFoundError:
-            annotation = None
+        return self.read_scene(self.scene_name(item))
+
+    def read_scene(self, name: str) -> dict:
+        """
+        :param name: Scene name
+        :return: Dictionary with image and annotation.
+        """
         data = {
-            "image": image,
-            "name": image_path.stem,
-            "annotations": annotation,
+            "image": self.read_image(name),
+            "name": name,
+            "annotations": self.read_annotations(name, arrays=True),
             "camera_yml": self._camera_yml,
+            "scale": self._decode_scale,
         }
         return data
 
-    def write_annotations(self, annotations):
+    def iter_names(
+        self,
+        start: Optional[str] = None,
+        stop: Optional[str] = None,
+        predicate: Optional[Callable[[str], bool]] = None,
+    ) -> Iterator[str]:
+        """
+        Lazily iterate over scene names in data set order, which is not
+        the sort order of the names for video data sets.
+        :param start: Name of the first scene to include
+        :param stop: Name of the first scene to exclude
+        :param predicate: Only yield names the predicate is true for
+        :return: Scene names
+        """
+        first: int = self.index(start) if start is not None else 0
+        last: int = self.index(stop) if stop is not None else len(self)
+        for index in range(first, last):
+            name: str = self.scene_name(index)
+            if predicate is None or predicate(name):
+                yield name
+
+    def iter_scenes(
+        self,
+        start: Optional[str] = None,
+        stop: Optional[str] = None,
+        predicate: Optional[Callable[[str], bool]] = None,
+        prefetch: int = 4,
+        workers: int = 1,
+    ) -> Iterator[dict]:
+        """
+        Lazily iterate over scenes in data set order while reading
+        ahead in background threads. At most prefetch scenes are held
+        in memory, independent of the size of the data set.
+        :param start: Name of the first scene to include
+        :param stop: Name of the first scene to exclude
+        :param predicate: Only read scenes the predicate is true for,
+                          evaluated on the name before decoding
+        :param prefetch: Number of scenes to read ahead
+        :param workers: Number of reader threads
+        :return: Dictionaries with image and annotation
+        """
+        names: Iterator[str] = self.iter_names(start, stop, predicate)
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+        pending: collections.deque = collections.deque()
+        try:
+            for name in names:
+                pending.append(executor.submit(self.read_scene, name))
+                if len(pending) > prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def is_annotated(self, name: str) -> bool:
+        """
+        :param name: Scene name
+        :return: True if annotations exist for the scene
+        """
+        return name in self._annotation_store
+
+    @property
+    def dataset_path(self) -> pathlib.Path:
+        return self._dataset_path
+
+    @property
+    def camera_yml(self) -> pathlib.Path:
+        return self._camera_yml
+
+    @property
+    def decode_scale(self) -> int:
+        return self._decode_scale
+
+    @property
+    def annotation_store(self) -> AnnotationStore:
+        return self._annotation_store
+
+    @property
+    def manifest(self) -> Optional[DataSetManifest]:
+        return self._manifest
+
+    @property
+    def names(self) -> list[str]:
+        """
+        :return: Names of all scenes in data set order
+        """
+        if self._manifest is not None:
+            return self._manifest.names
+        return [image_path.stem for image_path in self._images_paths]
+
+    def scene_name(self, index: int) -> str:
+        """
+        Name of the scene at given position.
+        :param index: Position in data set
+        :return: Scene name
+        """
+        if self._manifest is not None:
+            return self._manifest.scene_name(index)
+        return self._images_paths[index].stem
+
+    def index(self, name: str) -> int:
+        """
+        Position of the scene with given name.
+        :param name: Scene name
+        :return: Position in data set
+        """
+        if self._manifest is not None:
+            return self._manifest.index(name)
+        try:
+            return self._name_to_index[name]
+        except KeyError:
+            msg = f'Expected scene name to be in data set, got "{name}"'
+            raise KeyError(msg) from None
+
+    def image_path(self, name: str) -> pathlib.Path:
+        """
+        :param name: Scene name
+        :return: Path to the image of the scene
+        """
+        if self._manifest is not None:
+            return self._images_path / self._manifest.file_name(self.index(name))
+        return self._images_paths[self.index(name)]
+
+    def image_size(self, name: str) -> tuple[int, int]:
+        """
+        Native size of the image of a scene without decoding it.
+        :param name: Scene name
+        :return: Width and height of the image
+        """
+        if self._manifest is not None:
+            size: tuple[int, int] = self._manifest.image_size(self.index(name))
+            if min(size) >= 0:
+                return size
+        with Image.open(self.image_path(name)) as image:
+            return image.size
+
+    def read_image(self, name: str) -> np.ndarray:
+        """
+        Decode the image of a scene at the decode scale of the data set.
+        With a frame cache the image is a read-only memory map.
+        :param name: Scene name
+        :return: BGR image
+        """
+        if self._frame_cache is None:
+            return self._decode_image(name)
+        source_path: pathlib.Path = self.image_path(name)
+        image: Optional[np.ndarray]
+        image = self._frame_cache.get(name, source_path, self._decode_scale)
+        if image is None:
+            image = self._decode_image(name)
+            if image is not None:
+                image = self._frame_cache.put(
+                    name, source_path, image, self._decode_scale
+                )
+        return image
+
+    def _decode_image(self, name: str) -> np.ndarray:
+        """
+        :param name: Scene name
+        :return: Decoded BGR image
+        """
+        flags: int = REDUCED_READ_FLAGS[self._decode_scale]
+        return cv2.imread(str(self.image_path(name)), flags)
+
+    def read_annotations(self, name: str, arrays: bool = False) -> Optional[dict]:
+        """
+        Read annotations of a scene.
+        :param name: Scene name
+        :param arrays: Return points of binary encoded annotations as
+                       arrays of shape (n, 2) for bulk loading
+        :return: Annotations or None if scene is not annotated yet
+        """
+        return self._annotation_store.read(name, arrays)
+
+    def write_annotations(self, name: str, annotations: dict) -> None:
         """
-        Write serialized scenes to dedicated JSON file.
+        Write serialized scene to the annotation store.
 
-        :param annotations:
+        :param name: Scene name
+        :param annotations: Serialized scene
         :return: None.
         """
-        with open(self.annotation_path, "w") as file_pointer:
-            json.dump(annotations, file_pointer, indent=4, sort_keys=True)
+        self._annotation_store.write(name, annotations)
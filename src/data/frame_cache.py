@@ -0,0 +1,227 @@
+import os
+import zlib
+import pathlib
+import threading
+import contextlib
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+
+@contextlib.contextmanager
+def _locked(path: pathlib.Path) -> Iterator:
+    """
+    Open a file exclusively locked against other processes, by flock
+    on POSIX and by locking its first byte on Windows. Unlocked if
+    neither is available.
+    :param path: Path of the file, created if missing
+    :return: File opened for reading and writing
+    """
+    with open(path, "a+") as file:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(file, fcntl.LOCK_EX)
+            yield file
+            return
+        try:
+            import msvcrt
+        except ImportError:
+            yield file
+            return
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield file
+        finally:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FrameCache:
+    """
+    Cache of decoded frames as raw uint8 arrays in .npy files.
+
+    Cached frames are returned as read-only memory maps, so repeated
+    passes and several worker processes share the pages of the
+    operating system cache instead of decoding again. File names
+    contain size and modification time of the source, so changed
+    sources miss the cache and their stale frames are evicted in least
+    recently used order once the cache exceeds its size budget. The used
+    size is kept in a locked file of the cache directory, so all
+    processes sharing the cache share one budget.
+    """
+
+    def __init__(
+        self, cache_path: Union[pathlib.Path, str], max_bytes: int = 50 * 2**30
+    ) -> None:
+        """
+        :param cache_path: Directory to store decoded frames
+        :param max_bytes: Size budget of the cache directory
+        """
+        self._cache_path: pathlib.Path = pathlib.Path(cache_path)
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        self._max_bytes: int = max_bytes
+        # Used size of the cache directory, shared by all processes
+        self._usage_path: pathlib.Path = self._cache_path / ".usage"
+
+    def __getstate__(self) -> dict:
+        return {"cache_path": self._cache_path, "max_bytes": self._max_bytes}
+
+    def __setstate__(self, state: dict) -> None:
+        # The cache directory exists already, workers do not touch it
+        self._cache_path = state["cache_path"]
+        self._max_bytes = state["max_bytes"]
+        self._usage_path = self._cache_path / ".usage"
+
+    @property
+    def cache_path(self) -> pathlib.Path:
+        return self._cache_path
+
+    def frame_path(
+        self, name: str, source_path: pathlib.Path, scale: int = 1
+    ) -> pathlib.Path:
+        """
+        :param name: Scene name
+        :param source_path: Image or video the frame is decoded from
+        :param scale: Decode scale of the frame
+        :return: Path of the cached frame for the actual source
+        """
+        stat: os.stat_result = source_path.stat()
+        # Spread frames over subdirectories to keep directories small
+        bucket: str = f"{zlib.crc32(name.encode()) & 0xFF:02x}"
+        file_name: str = f"{name}.x{scale}.{stat.st_size}.{stat.st_mtime_ns}.npy"
+        return self._cache_path / bucket / file_name
+
+    def get(
+        self, name: str, source_path: pathlib.Path, scale: int = 1
+    ) -> Optional[np.ndarray]:
+        """
+        :param name: Scene name
+        :param source_path: Image or video the frame is decoded from
+        :param scale: Decode scale of the frame
+        :return: Read-only memory map of the frame or None on a miss
+        """
+        frame_path: pathlib.Path = self.frame_path(name, source_path, scale)
+        try:
+            frame: np.ndarray = np.load(frame_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        # Mark as recently used for eviction
+        try:
+            os.utime(frame_path)
+        except OSError:
+            pass
+        return frame
+
+    def put(
+        self, name: str, source_path: pathlib.Path, image: np.ndarray, scale: int = 1
+    ) -> np.ndarray:
+        """
+        Store a decoded frame.
+        :param name: Scene name
+        :param source_path: Image or video the frame is decoded from
+        :param image: Decoded frame
+        :param scale: Decode scale of the frame
+        :return: Read-only memory map of the stored frame
+        """
+        if image is None:
+            msg = f'Expected a decoded frame of "{name}", got None'
+            raise ValueError(msg)
+        frame_path: pathlib.Path = self.frame_path(name, source_path, scale)
+        frame_path.parent.mkdir(exist_ok=True)
+        tmp_path: pathlib.Path = frame_path.with_name(
+            f".{frame_path.stem}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            frame: np.ndarray = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.uint8, shape=image.shape
+            )
+            frame[...] = image
+            frame.flush()
+            del frame
+            os.replace(tmp_path, frame_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        frame = np.load(frame_path, mmap_mode="r")
+        with _locked(self._usage_path) as usage_file:
+            total_bytes: int = self._read_usage(usage_file)
+            total_bytes += frame_path.stat().st_size
+            if total_bytes > self._max_bytes:
+                total_bytes, _ = self._evict(0.9)
+            self._write_usage(usage_file, total_bytes)
+        return frame
+
+    def _read_usage(self, usage_file) -> int:
+        """
+        :param usage_file: Locked usage file
+        :return: Used size of the cache directory, scanned if unknown
+        """
+        usage_file.seek(0)
+        try:
+            return int(usage_file.read())
+        except ValueError:
+            return sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def _write_usage(usage_file, total_bytes: int) -> None:
+        """
+        :param usage_file: Locked usage file
+        :param total_bytes: Used size of the cache directory
+        """
+        usage_file.seek(0)
+        usage_file.truncate()
+        usage_file.write(str(total_bytes))
+        usage_file.flush()
+
+    def _entries(self) -> list[tuple[int, pathlib.Path, int]]:
+        """
+        :return: Last use, path and size of all cached frames
+        """
+        entries: list[tuple[int, pathlib.Path, int]] = []
+        for bucket in os.scandir(self._cache_path):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".npy"):
+                    stat: os.stat_result = entry.stat()
+                    entries.append(
+                        (stat.st_mtime_ns, pathlib.Path(entry.path), stat.st_size)
+                    )
+        return entries
+
+    def evict(self, target: float = 0.9) -> int:
+        """
+        Delete least recently used frames until the cache is below a
+        fraction of its budget. Other processes may still map deleted
+        frames, their pages stay valid until unmapped.
+        :param target: Fraction of the size budget to shrink to
+        :return: Number of deleted frames
+        """
+        with _locked(self._usage_path) as usage_file:
+            total_bytes, deleted = self._evict(target)
+            self._write_usage(usage_file, total_bytes)
+        return deleted
+
+    def _evict(self, target: float) -> tuple[int, int]:
+        """
+        Delete least recently used frames while holding the usage lock.
+        The cache directory is rescanned, so frames of all processes
+        count towards the budget.
+        :param target: Fraction of the size budget to shrink to
+        :return: Used size after eviction and number of deleted frames
+        """
+        entries: list[tuple[int, pathlib.Path, int]] = sorted(self._entries())
+        total_bytes: int = sum(size for _, _, size in entries)
+        deleted: int = 0
+        for _, frame_path, size in entries:
+            if total_bytes <= self._max_bytes * target:
+                break
+            frame_path.unlink(missing_ok=True)
+            total_bytes -= size
+            deleted += 1
+        return total_bytes, deleted
@@ -0,0 +1,22 @@
+import pathlib
+from typing import Union
+
+from data.data_set import DataSet
+from data.video_data_set import VideoDataSet
+
+DATASET_SOURCES: dict[str, type] = {"images": DataSet, "video": VideoDataSet}
+
+
+def load_data_set(dataset_path: Union[pathlib.Path, str], settings: dict) -> DataSet:
+    """
+    Open data set with the source configured in RailLabel settings.
+    :param dataset_path: Path to dataset root directory
+    :param settings: Dict of RailLabel settings
+    :return: Data set reading from images or videos
+    """
+    source: str = settings.get("dataset_source", "images")
+    if source not in DATASET_SOURCES:
+        msg = f"Expected dataset source to be in {list(DATASET_SOURCES)}, "
+        msg += f"got '{source}'"
+        raise ValueError(msg)
+    return DATASET_SOURCES[source].from_settings(dataset_path, settings)
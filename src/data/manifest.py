@@ -0,0 +1,315 @@
+import os
+import zlib
+import pathlib
+from typing import Iterable, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS: tuple[str, ...] = (".jpg", ".jpeg", ".png")
+
+
+def _name_hashes(names: np.ndarray) -> np.ndarray:
+    """
+    Hash encoded scene names for the lookup table.
+    :param names: Byte strings of scene names
+    :return: Unsigned 32-bit hashes
+    """
+    return np.fromiter(
+        (zlib.crc32(name) for name in names.tolist()),
+        dtype=np.uint32,
+        count=len(names),
+    )
+
+
+def _build_lookup(hashes: np.ndarray) -> np.ndarray:
+    """
+    Build an open addressing table mapping name hashes to indices.
+    Slots contain the index of a name or -1 if empty. Collisions are
+    resolved by linear probing.
+    :param hashes: Hashes of the names
+    :return: Lookup table
+    """
+    size: int = max(8, 2 * len(hashes))
+    table: np.ndarray = np.full(size, -1, dtype=np.int32)
+    indices: np.ndarray = np.arange(len(hashes), dtype=np.int32)
+    slots: np.ndarray = hashes.astype(np.int64) % size
+    # Insert all names at once, losers of a slot probe the next one
+    while len(indices):
+        free: np.ndarray = table[slots] == -1
+        unique_slots, first = np.unique(slots[free], return_index=True)
+        winners: np.ndarray = np.flatnonzero(free)[first]
+        table[unique_slots] = indices[winners]
+        placed: np.ndarray = np.zeros(len(indices), dtype=bool)
+        placed[winners] = True
+        indices = indices[~placed]
+        slots = (slots[~placed] + 1) % size
+    return table
+
+
+class DataSetManifest:
+    """
+    Persistent listing of the images of a data set.
+
+    Stores scene names, image file names, image sizes, modification
+    times and annotation presence as compact arrays. The listing is
+    only rescanned if the modification time of the images or
+    annotations directory changed, and headers are only read for
+    images new to the manifest. Images whose header can not be read,
+    e.g. truncated files, are listed with an unknown size of -1.
+    """
+
+    version: int = 1
+
+    def __init__(
+        self,
+        dataset_path: Union[pathlib.Path, str],
+        manifest_path: Optional[Union[pathlib.Path, str]] = None,
+    ) -> None:
+        """
+        :param dataset_path: Path containing images and annotations
+        :param manifest_path: Path of the manifest file
+        """
+        self._dataset_path: pathlib.Path = pathlib.Path(dataset_path)
+        self._images_path: pathlib.Path = self._dataset_path / "images"
+        self._annotations_path: pathlib.Path = self._dataset_path / "annotations"
+        if manifest_path is None:
+            manifest_path = self._dataset_path / ".raillabel" / "manifest.npz"
+        self._manifest_path: pathlib.Path = pathlib.Path(manifest_path)
+
+        self._file_names: np.ndarray = np.array([], dtype=bytes)
+        self._names: np.ndarray = np.array([], dtype=bytes)
+        self._widths: np.ndarray = np.array([], dtype=np.int32)
+        self._heights: np.ndarray = np.array([], dtype=np.int32)
+        self._mtimes: np.ndarray = np.array([], dtype=np.int64)
+        self._annotated: np.ndarray = np.array([], dtype=bool)
+        self._lookup: np.ndarray = np.full(8, -1, dtype=np.int32)
+        self._images_mtime: int = -1
+        self._annotations_mtime: int = -1
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @property
+    def manifest_path(self) -> pathlib.Path:
+        return self._manifest_path
+
+    @property
+    def names(self) -> list[str]:
+        """
+        :return: Names of all scenes in sorted order
+        """
+        return [name.decode() for name in self._names.tolist()]
+
+    @property
+    def image_sizes(self) -> np.ndarray:
+        """
+        :return: Width and height of all images, shape (n, 2)
+        """
+        return np.stack((self._widths, self._heights), axis=1)
+
+    @property
+    def annotated(self) -> np.ndarray:
+        """
+        :return: Boolean array whether a scene has an annotation file
+        """
+        return self._annotated
+
+    def scene_name(self, index: int) -> str:
+        """
+        :param index: Position in data set
+        :return: Scene name
+        """
+        return self._names[index].decode()
+
+    def file_name(self, index: int) -> str:
+        """
+        :param index: Position in data set
+        :return: Image file name including extension
+        """
+        return self._file_names[index].decode()
+
+    def image_size(self, index: int) -> tuple[int, int]:
+        """
+        :param index: Position in data set
+        :return: Width and height of the image, -1 if unknown
+        """
+        return self._widths[index].item(), self._heights[index].item()
+
+    def index(self, name: str) -> int:
+        """
+        Position of the scene with given name in constant time.
+        :param name: Scene name
+        :return: Position in data set
+        """
+        encoded: bytes = name.encode()
+        size: int = len(self._lookup)
+        slot: int = zlib.crc32(encoded) % size
+        while self._lookup[slot] != -1:
+            index: int = self._lookup[slot].item()
+            if self._names[index] == encoded:
+                return index
+            slot = (slot + 1) % size
+        msg = f'Expected scene name to be in data set, got "{name}"'
+        raise KeyError(msg)
+
+    def refresh(
+        self,
+        full: bool = False,
+        annotated_names: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """
+        Bring manifest up to date with the data set directories.
+        :param full: Check modification time of every image even if
+                     the images directory did not change
+        :param annotated_names: Names of annotated scenes for stores
+                                other than the annotations directory
+        :return: True if the manifest changed and was saved
+        """
+        changed: bool = False
+        images_mtime: int = -1
+        if self._images_path.exists():
+            images_mtime = self._images_path.stat().st_mtime_ns
+        if full or images_mtime != self._images_mtime:
+            self._scan_images(full)
+            self._images_mtime = images_mtime
+            changed = True
+        if annotated_names is not None:
+            annotated: np.ndarray = self._mark_annotated(
+                {name.encode() for name in annotated_names}
+            )
+            if changed or not np.array_equal(annotated, self._annotated):
+                self._annotated = annotated
+                changed = True
+        else:
+            annotations_mtime: int = -1
+            if self._annotations_path.exists():
+                annotations_mtime = self._annotations_path.stat().st_mtime_ns
+            if changed or annotations_mtime != self._annotations_mtime:
+                self._scan_annotations()
+                self._annotations_mtime = annotations_mtime
+                changed = True
+        if changed:
+            self._save()
+        return changed
+
+    def _scan_images(self, full: bool) -> None:
+        """
+        List images and read headers of new or modified images.
+        :param full: Compare modification times of known images
+        """
+        old_index: dict[bytes, int] = {
+            file_name: index
+            for index, file_name in enumerate(self._file_names.tolist())
+        }
+        entries: list[tuple[bytes, os.DirEntry]] = []
+        if self._images_path.exists():
+            with os.scandir(self._images_path) as directory:
+                for entry in directory:
+                    if os.path.splitext(entry.name)[1] in IMAGE_EXTENSIONS:
+                        entries.append((entry.name.encode(), entry))
+        # Sort to get video image order.
+        entries.sort(key=lambda item: item[0])
+
+        count: int = len(entries)
+        widths: np.ndarray = np.full(count, -1, dtype=np.int32)
+        heights: np.ndarray = np.full(count, -1, dtype=np.int32)
+        mtimes: np.ndarray = np.zeros(count, dtype=np.int64)
+        file_name: bytes
+        entry: os.DirEntry
+        for index, (file_name, entry) in enumerate(entries):
+            old: Optional[int] = old_index.get(file_name)
+            if old is not None and not full:
+                widths[index] = self._widths[old]
+                heights[index] = self._heights[old]
+                mtimes[index] = self._mtimes[old]
+                continue
+            mtime: int = entry.stat().st_mtime_ns
+            if old is not None and self._mtimes[old] == mtime:
+                widths[index] = self._widths[old]
+                heights[index] = self._heights[old]
+            else:
+                # Only the header is read, the image is not decoded
+                try:
+                    with Image.open(entry.path) as image:
+                        widths[index], heights[index] = image.size
+                except OSError:
+                    # Corrupt images fail when their scene is read
+                    pass
+            mtimes[index] = mtime
+
+        self._file_names = np.array([item[0] for item in entries], dtype=bytes)
+        self._names = np.array(
+            [os.path.splitext(item[0])[0] for item in entries], dtype=bytes
+        )
+        self._widths, self._heights, self._mtimes = widths, heights, mtimes
+        self._lookup = _build_lookup(_name_hashes(self._names))
+
+    def _scan_annotations(self) -> None:
+        """
+        Mark scenes having an annotation file.
+        """
+        annotated: set[bytes] = set()
+        if self._annotations_path.exists():
+            with os.scandir(self._annotations_path) as directory:
+                for entry in directory:
+                    stem, extension = os.path.splitext(entry.name)
+                    if extension == ".json" and not stem.startswith("."):
+                        annotated.add(stem.encode())
+        self._annotated = self._mark_annotated(annotated)
+
+    def _mark_annotated(self, annotated: set[bytes]) -> np.ndarray:
+        """
+        :param annotated: Encoded names of annotated scenes
+        :return: Boolean array whether a scene is annotated
+        """
+        return np.fromiter(
+            (name in annotated for name in self._names.tolist()),
+            dtype=bool,
+            count=len(self._names),
+        )
+
+    def _load(self) -> None:
+        """
+        Load manifest from disk if available and compatible.
+        """
+        try:
+            with np.load(self._manifest_path) as manifest:
+                if manifest["version"].item() != self.version:
+                    return
+                self._file_names = manifest["file_names"]
+                self._names = manifest["names"]
+                self._widths = manifest["widths"]
+                self._heights = manifest["heights"]
+                self._mtimes = manifest["mtimes"]
+                self._annotated = manifest["annotated"]
+                self._lookup = manifest["lookup"]
+                self._images_mtime = manifest["images_mtime"].item()
+                self._annotations_mtime = manifest["annotations_mtime"].item()
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return
+
+    def _save(self) -> None:
+        """
+        Atomically write manifest to disk.
+        """
+        self._manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: pathlib.Path = self._manifest_path.with_name(
+            f".{self._manifest_path.stem}.{os.getpid()}.tmp.npz"
+        )
+        np.savez(
+            tmp_path,
+            version=np.array(self.version),
+            file_names=self._file_names,
+            names=self._names,
+            widths=self._widths,
+            heights=self._heights,
+            mtimes=self._mtimes,
+            annotated=self._annotated,
+            lookup=self._lookup,
+            images_mtime=np.array(self._images_mtime, dtype=np.int64),
+            annotations_mtime=np.array(self._annotations_mtime, dtype=np.int64),
+        )
+        os.replace(tmp_path, self._manifest_path)
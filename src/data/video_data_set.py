@@ -0,0 +1,293 @@
+import os
+import pathlib
+import threading
+from typing import Optional, Union
+
+import cv2
+import numpy as np
+
+from data.data_set import DataSet
+from data.annotation_store import AnnotationStore
+from data.frame_cache import FrameCache
+
+VIDEO_EXTENSIONS: tuple[str, ...] = (".mp4", ".avi", ".mkv", ".mov")
+
+
+class VideoSeekIndex:
+    """
+    Presentation timestamps of all frames of one video.
+
+    The index is built by one sequential pass over the video and
+    cached next to the data set, validated by size and modification
+    time of the video. Seeking by timestamp lets the decoder jump to
+    the preceding keyframe and decode forward to the exact frame.
+    """
+
+    def __init__(self, video_path: pathlib.Path, cache_path: pathlib.Path) -> None:
+        """
+        :param video_path: Path of the video
+        :param cache_path: Path of the cached index
+        """
+        self._video_path: pathlib.Path = video_path
+        self._cache_path: pathlib.Path = cache_path
+        stat: os.stat_result = video_path.stat()
+        self._signature: np.ndarray = np.array(
+            [stat.st_size, stat.st_mtime_ns], dtype=np.int64
+        )
+        self._timestamps: np.ndarray = self._load()
+        if self._timestamps is None:
+            self._timestamps = self._build()
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def timestamp(self, frame: int) -> float:
+        """
+        :param frame: Frame number
+        :return: Presentation timestamp in milliseconds
+        """
+        return self._timestamps[frame].item()
+
+    def _load(self) -> Optional[np.ndarray]:
+        """
+        :return: Cached timestamps if the video did not change
+        """
+        try:
+            with np.load(self._cache_path) as index:
+                if np.array_equal(index["signature"], self._signature):
+                    return index["timestamps"]
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            pass
+        return None
+
+    def _build(self) -> np.ndarray:
+        """
+        :return: Timestamps of all frames read from the video
+        """
+        capture = cv2.VideoCapture(str(self._video_path))
+        timestamps: list[float] = []
+        while capture.grab():
+            timestamps.append(capture.get(cv2.CAP_PROP_POS_MSEC))
+        capture.release()
+        return np.array(timestamps, dtype=np.float64)
+
+    def _save(self) -> None:
+        """
+        Atomically write index to cache.
+        """
+        self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path: pathlib.Path = self._cache_path.with_name(
+            f".{self._cache_path.stem}.{os.getpid()}.tmp.npz"
+        )
+        np.savez(tmp_path, signature=self._signature, timestamps=self._timestamps)
+        os.replace(tmp_path, self._cache_path)
+
+
+class _VideoReader:
+    """
+    Capture of one video which remembers its position, so reading
+    the following frame decodes forward instead of seeking.
+    """
+
+    def __init__(self, video_path: pathlib.Path, index: VideoSeekIndex) -> None:
+        self.lock = threading.Lock()
+        self._capture = cv2.VideoCapture(str(video_path))
+        self._index: VideoSeekIndex = index
+        self._next_frame: int = 0
+
+    def read(self, frame: int) -> np.ndarray:
+        """
+        Decode a frame, callers must hold the lock.
+        :param frame: Frame number
+        :return: BGR image
+        """
+        if frame != self._next_frame:
+            self._capture.set(cv2.CAP_PROP_POS_MSEC, self._index.timestamp(frame))
+        success, image = self._capture.read()
+        if not success:
+            self._next_frame = -1
+            msg = f"Could not decode frame {frame}"
+            raise IOError(msg)
+        self._next_frame = frame + 1
+        return image
+
+    def size(self) -> tuple[int, int]:
+        """
+        :return: Width and height of the frames
+        """
+        width: int = int(self._capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height: int = int(self._capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return width, height
+
+    def release(self) -> None:
+        self._capture.release()
+
+
+class VideoDataSet(DataSet):
+    """
+    Loads frames directly from the videos in the videos directory.
+
+    Scenes are named by video and frame number, e.g. the frame 42 of
+    "run_01.mp4" is the scene "run_01_000042", and annotations are
+    stored under this name.
+    """
+
+    def __init__(
+        self,
+        dataset_path: Union[pathlib.Path, str],
+        manifest: bool = False,
+        annotation_store: Union[str, AnnotationStore] = "json",
+        annotation_encoding: str = "json",
+        decode_scale: int = 1,
+        frame_cache: Optional[FrameCache] = None,
+    ):
+        """
+        :param dataset_path: Path containing videos and annotations
+        :param manifest: Unused, the seek indices list all frames
+        :param annotation_store: Annotation store or its backend name
+        :param annotation_encoding: Encoding of annotations if the
+                                    store is given by name
+        :param decode_scale: Reduce frames by this factor [1, 2, 4, 8]
+        :param frame_cache: Cache of decoded frames
+        """
+        super().__init__(
+            dataset_path,
+            annotation_store=annotation_store,
+            annotation_encoding=annotation_encoding,
+            decode_scale=decode_scale,
+            frame_cache=frame_cache,
+        )
+        videos_path: pathlib.Path = self._dataset_path / "videos"
+        cache_path: pathlib.Path = self._dataset_path / ".raillabel" / "videos"
+        self._video_paths: list[pathlib.Path] = sorted(
+            path for path in videos_path.iterdir() if path.suffix in VIDEO_EXTENSIONS
+        )
+        self._video_positions: dict[str, int] = {
+            video_path.stem: position
+            for position, video_path in enumerate(self._video_paths)
+        }
+        self._seek_indices: list[VideoSeekIndex] = [
+            VideoSeekIndex(video_path, cache_path / (video_path.stem + ".npz"))
+            for video_path in self._video_paths
+        ]
+        # First data set position of every video
+        self._offsets: np.ndarray = np.cumsum(
+            [0] + [len(index) for index in self._seek_indices]
+        )
+        self._readers: dict[int, _VideoReader] = {}
+        self._readers_lock = threading.Lock()
+
+    def _scan_images(self) -> None:
+        """
+        Video data sets have no images directory to list.
+        """
+        self._images_paths = []
+
+    def __getstate__(self) -> dict:
+        state: dict = self.__dict__.copy()
+        # Captures and locks are opened again in the receiving process
+        state["_readers"] = {}
+        del state["_readers_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._readers_lock = threading.Lock()
+
+    def __len__(self):
+        return self._offsets[-1].item()
+
+    @property
+    def names(self) -> list[str]:
+        return [self.scene_name(index) for index in range(len(self))]
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """
+        :param index: Position in data set
+        :return: Position of the video and frame number
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Data set index {index} out of range")
+        position: int = np.searchsorted(self._offsets, index, side="right").item()
+        position -= 1
+        return position, index - self._offsets[position].item()
+
+    def scene_name(self, index: int) -> str:
+        position, frame = self._locate(index)
+        return f"{self._video_paths[position].stem}_{frame:06d}"
+
+    def _frame(self, name: str) -> tuple[int, int]:
+        """
+        :param name: Scene name
+        :return: Position of the video and frame number
+        """
+        stem, _, frame = name.rpartition("_")
+        position: Optional[int] = self._video_positions.get(stem)
+        if position is None or not frame.isdigit():
+            msg = f'Expected scene name to be in data set, got "{name}"'
+            raise KeyError(msg)
+        if int(frame) >= len(self._seek_indices[position]):
+            msg = f'Expected scene name to be in data set, got "{name}"'
+            raise KeyError(msg)
+        return position, int(frame)
+
+    def index(self, name: str) -> int:
+        position, frame = self._frame(name)
+        return self._offsets[position].item() + frame
+
+    def image_path(self, name: str) -> pathlib.Path:
+        """
+        :param name: Scene name
+        :return: Path to the video containing the scene
+        """
+        return self._video_paths[self._frame(name)[0]]
+
+    def image_size(self, name: str) -> tuple[int, int]:
+        reader: _VideoReader = self._reader(self._frame(name)[0])
+        with reader.lock:
+            return reader.size()
+
+    def _reader(self, position: int) -> _VideoReader:
+        """
+        :param position: Position of the video
+        :return: Reader of the video, opened on first use
+        """
+        with self._readers_lock:
+            if position not in self._readers:
+                self._readers[position] = _VideoReader(
+                    self._video_paths[position], self._seek_indices[position]
+                )
+            return self._readers[position]
+
+    def _decode_image(self, name: str) -> np.ndarray:
+        """
+        Decode a frame. Reading the frame following the last read
+        frame of a video decodes forward without seeking.
+        :param name: Scene name
+        :return: BGR image
+        """
+        position, frame = self._frame(name)
+        reader: _VideoReader = self._reader(position)
+        with reader.lock:
+            image: np.ndarray = reader.read(frame)
+        if self._decode_scale != 1:
+            image = cv2.resize(
+                image,
+                None,
+                fx=1 / self._decode_scale,
+                fy=1 / self._decode_scale,
+                interpolation=cv2.INTER_AREA,
+            )
+        return image
+
+    def close(self) -> None:
+        """
+        Release all video captures.
+        """
+        with self._readers_lock:
+            for reader in self._readers.values():
+                reader.release()
+            self._readers = {}
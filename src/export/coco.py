@@ -0,0 +1,153 @@
+import json
+import pathlib
+from typing import Union
+
+import numpy as np
+
+# Track classes in category id order, starting at id 1
+CATEGORIES: list[str] = [
+    "left_bed",
+    "left_rails",
+    "ego_bed",
+    "ego_rails",
+    "right_bed",
+    "right_rails",
+]
+
+
+def polygon_rle(polygon: np.ndarray, width: int, height: int) -> list[int]:
+    """
+    Run-length encode the pixels of a polygon in COCO order without
+    rasterizing a mask. Every image column is intersected with the
+    polygon edges, pixels with centers inside the polygon by the
+    even-odd rule are foreground.
+    :param polygon: Polygon of shape (n, 2) in pixel coordinates
+    :param width: Image width
+    :param height: Image height
+    :return: Alternating counts of background and foreground pixels
+             in column-major order, starting with background
+    """
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    boundaries: np.ndarray = np.zeros(0, dtype=np.int64)
+    if len(polygon) >= 3:
+        x_min: int = max(int(np.ceil(polygon[:, 0].min())), 0)
+        x_max: int = min(int(np.floor(polygon[:, 0].max())), width - 1)
+        columns: np.ndarray = np.arange(x_min, x_max + 1, dtype=np.float64)[:, None]
+        x0, y0 = polygon[:, 0], polygon[:, 1]
+        x1, y1 = np.roll(polygon, -1, axis=0).T
+        # Half-open edges count shared vertices once
+        crossing: np.ndarray = ((x0 <= columns) & (columns < x1)) | (
+            (x1 <= columns) & (columns < x0)
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ys: np.ndarray = y0 + (columns - x0) * (y1 - y0) / (x1 - x0)
+        ys = np.sort(np.where(crossing, ys, np.inf), axis=1)
+        pairs: int = int(crossing.sum(axis=1).max(initial=0)) // 2
+        begins: np.ndarray = np.ceil(ys[:, 0 : 2 * pairs : 2])
+        ends: np.ndarray = np.floor(ys[:, 1 : 2 * pairs : 2]) + 1
+        valid: np.ndarray = np.isfinite(ends)
+        begins = np.clip(np.where(valid, begins, 0), 0, height)
+        ends = np.clip(np.where(valid, ends, 0), 0, height)
+        valid &= begins < ends
+        offsets: np.ndarray = columns.astype(np.int64) * height
+        boundaries = (
+            np.column_stack([(offsets + begins)[valid], (offsets + ends)[valid]])
+            .astype(np.int64)
+            .ravel()
+        )
+        # Runs continuing in the next column share a boundary
+        values, multiplicities = np.unique(boundaries, return_counts=True)
+        boundaries = values[multiplicities % 2 == 1]
+    counts: list[int] = np.diff(boundaries, prepend=0).tolist()
+    if not counts or sum(counts) < width * height:
+        counts.append(width * height - sum(counts))
+    return counts
+
+
+def compress_rle(counts: list[int]) -> str:
+    """
+    Compress RLE counts to the string format of the COCO API.
+    :param counts: Counts as given by polygon_rle
+    :return: Compressed counts
+    """
+    characters: list[str] = []
+    for i, count in enumerate(counts):
+        value: int = count - counts[i - 2] if i > 2 else count
+        more: bool = True
+        while more:
+            character: int = value & 0x1F
+            value >>= 5
+            more = value != -1 if character & 0x10 else value != 0
+            if more:
+                character |= 0x20
+            characters.append(chr(character + 48))
+    return "".join(characters)
+
+
+def scene_instances(
+    polygons: list[tuple[str, np.ndarray]], width: int, height: int
+) -> list[dict]:
+    """
+    COCO annotations of all rail and track bed instances of a scene.
+    :param polygons: Class name and polygon per instance, as given by
+                     SegmentationLabel.polygons
+    :param width: Image width
+    :param height: Image height
+    :return: Annotations without image and annotation ids
+    """
+    instances: list[dict] = []
+    for class_name, polygon in polygons:
+        if class_name not in CATEGORIES:
+            continue
+        counts: list[int] = polygon_rle(polygon, width, height)
+        area: int = sum(counts[1::2])
+        if not area:
+            continue
+        polygon = np.asarray(polygon).reshape(-1, 2)
+        lower: np.ndarray = np.clip(polygon.min(axis=0), 0, [width, height])
+        upper: np.ndarray = np.clip(polygon.max(axis=0), 0, [width, height])
+        instances.append(
+            {
+                "category_id": CATEGORIES.index(class_name) + 1,
+                "segmentation": [polygon.ravel().tolist()],
+                "rle": {"size": [height, width], "counts": compress_rle(counts)},
+                "area": area,
+                "bbox": np.concatenate([lower, upper - lower]).tolist(),
+                "iscrowd": 0,
+            }
+        )
+    return instances
+
+
+def merge_coco(
+    coco_path: Union[pathlib.Path, str], output_file: Union[pathlib.Path, str]
+) -> int:
+    """
+    Merge the COCO files of all scenes into one COCO data set.
+    :param coco_path: Directory of the COCO files per scene
+    :param output_file: Path of the merged COCO file
+    :return: Number of scenes
+    """
+    images: list[dict] = []
+    annotations: list[dict] = []
+    for image_id, scene_path in enumerate(
+        sorted(pathlib.Path(coco_path).glob("*.json")), 1
+    ):
+        with open(scene_path) as file_pointer:
+            scene: dict = json.load(file_pointer)
+        images.append({"id": image_id, **scene["image"]})
+        for instance in scene["annotations"]:
+            annotations.append(
+                {"id": len(annotations) + 1, "image_id": image_id, **instance}
+            )
+    coco: dict = {
+        "images": images,
+        "annotations": annotations,
+        "categories": [
+            {"id": category_id, "name": name, "supercategory": "track"}
+            for category_id, name in enumerate(CATEGORIES, 1)
+        ],
+    }
+    with open(output_file, "w") as file_pointer:
+        json.dump(coco, file_pointer, separators=(",", ":"))
+    return len(images)
@@ -0,0 +1,196 @@
+import io
+import os
+import time
+import concurrent.futures
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+from tabulate import tabulate
+
+
+class Encoder(ABC):
+    """
+    Encoding of labels and images to file contents.
+    """
+
+    # File extension including the dot
+    extension: str = ""
+
+    @abstractmethod
+    def encode(self, image: np.ndarray) -> bytes:
+        """
+        :param image: uint8 label or BGR image
+        :return: Encoded file
+        """
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.extension})"
+
+
+class OpenCVEncoder(Encoder):
+    """
+    Encoding by cv2.imencode with optional parameters, e.g. the PNG
+    compression level. OpenCV releases the GIL while encoding, so
+    threads encode in parallel.
+    """
+
+    def __init__(self, extension: str, parameters: Optional[list[int]] = None):
+        """
+        :param extension: File extension of an OpenCV format, e.g. '.png'
+        :param parameters: Pairs of cv2.IMWRITE_* flags and values
+        """
+        self.extension = extension
+        self.parameters: list[int] = parameters or []
+
+    def encode(self, image: np.ndarray) -> bytes:
+        success, encoded = cv2.imencode(self.extension, image, self.parameters)
+        if not success:
+            msg = f"Encoding a {image.shape} image as {self.extension} failed"
+            raise ValueError(msg)
+        return encoded.tobytes()
+
+
+class PaletteEncoder(Encoder):
+    """
+    Indexed PNG of single channel class masks. Pixel values are kept
+    as palette indices, so the masks stay lossless class ids while
+    image viewers show the palette colors.
+    """
+
+    extension = ".png"
+
+    def __init__(self, palette: dict[int, tuple[int, int, int]], compression: int = 6):
+        """
+        :param palette: RGB color per class id, other ids are black
+        :param compression: zlib compression level from 0 to 9
+        """
+        self.palette: list[int] = [0] * 3 * 256
+        for class_id, color in palette.items():
+            self.palette[3 * class_id : 3 * class_id + 3] = color
+        self.compression: int = compression
+
+    def encode(self, image: np.ndarray) -> bytes:
+        if image.ndim != 2:
+            msg = f"Expected a single channel mask, got shape {image.shape}"
+            raise ValueError(msg)
+        indexed: Image.Image = Image.fromarray(image, mode="P")
+        indexed.putpalette(self.palette)
+        file_pointer: io.BytesIO = io.BytesIO()
+        indexed.save(file_pointer, "PNG", compress_level=self.compression)
+        return file_pointer.getvalue()
+
+
+class NpyEncoder(Encoder):
+    """
+    Raw NumPy array, the fastest to write and read at full size.
+    """
+
+    extension = ".npy"
+
+    def encode(self, image: np.ndarray) -> bytes:
+        file_pointer: io.BytesIO = io.BytesIO()
+        np.save(file_pointer, np.ascontiguousarray(image), allow_pickle=False)
+        return file_pointer.getvalue()
+
+
+# Encoder formats with the meaning of their optional level
+ENCODERS: dict[str, str] = {
+    "png": "compression 0 to 9",
+    "palette": "compression 0 to 9, single channel masks only",
+    "webp": "lossless, no level",
+    "jpg": "quality 0 to 100",
+    "npy": "raw, no level",
+}
+# Lowest and highest level by format, formats without levels are missing
+_LEVELS: dict[str, tuple[int, int]] = {
+    "png": (0, 9),
+    "palette": (0, 9),
+    "jpg": (0, 100),
+}
+
+
+def parse_encoder(
+    spec: str, palette: Optional[dict[int, tuple[int, int, int]]] = None
+) -> Encoder:
+    """
+    :param spec: Format and optional level, e.g. 'png:9' or 'jpg:90',
+                 see ENCODERS
+    :param palette: RGB color per class id of palette encoders
+    :return: Encoder
+    """
+    encoder_format, _, level = spec.partition(":")
+    if encoder_format not in ENCODERS or (level and not level.isdigit()):
+        msg = f"Expected encoder like 'png:9' with format in {list(ENCODERS)}"
+        msg += f", got {spec}"
+        raise ValueError(msg)
+    if level and encoder_format not in _LEVELS:
+        msg = f"Expected no level for {encoder_format} encoders, got {spec}"
+        raise ValueError(msg)
+    lowest, highest = _LEVELS.get(encoder_format, (0, 0))
+    if level and not lowest <= int(level) <= highest:
+        msg = f"Expected {encoder_format} encoder level of"
+        msg += f" {ENCODERS[encoder_format]}, got {spec}"
+        raise ValueError(msg)
+    if encoder_format == "png":
+        parameters: list[int] = []
+        if level:
+            parameters = [cv2.IMWRITE_PNG_COMPRESSION, int(level)]
+        return OpenCVEncoder(".png", parameters)
+    if encoder_format == "palette":
+        return PaletteEncoder(palette or {}, int(level or 6))
+    if encoder_format == "webp":
+        # Quality above 100 selects lossless WebP
+        return OpenCVEncoder(".webp", [cv2.IMWRITE_WEBP_QUALITY, 101])
+    if encoder_format == "jpg":
+        parameters = [cv2.IMWRITE_JPEG_QUALITY, int(level)] if level else []
+        return OpenCVEncoder(".jpg", parameters)
+    return NpyEncoder()
+
+
+def benchmark_encoders(
+    images: list[np.ndarray],
+    encoders: dict[str, Encoder],
+    workers: Optional[int] = None,
+) -> list[dict]:
+    """
+    Measure encode time and file size of encoders, once per image in
+    sequence and once in parallel threads.
+    :param images: Labels or images to encode
+    :param encoders: Encoders by name
+    :param workers: Number of threads encoding in parallel, all cores
+                    if None
+    :return: Name, mean milliseconds and kilobytes per image, size
+             relative to the raw image and parallel images per second
+             per encoder
+    """
+    if not images:
+        msg = "Expected images to benchmark, got none"
+        raise ValueError(msg)
+    workers = workers or os.cpu_count() or 1
+    raw_size: int = sum(image.nbytes for image in images)
+    rows: list[dict] = []
+    for name, encoder in encoders.items():
+        start: float = time.perf_counter()
+        size: int = sum(len(encoder.encode(image)) for image in images)
+        elapsed: float = time.perf_counter() - start
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            start = time.perf_counter()
+            list(executor.map(encoder.encode, images))
+            parallel: float = time.perf_counter() - start
+        rows.append(
+            {
+                "encoder": name,
+                "encode [ms]": round(1000 * elapsed / len(images), 2),
+                "size [KB]": round(size / len(images) / 1024, 1),
+                "ratio": round(size / raw_size, 4),
+                f"{workers} threads [1/s]": round(len(images) / parallel, 1),
+            }
+        )
+    return rows
+
+
+def print_benchmark(rows: list[dict]) -> None:
+    print(tabulate(rows, headers="keys"))
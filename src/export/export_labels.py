@@ -0,0 +1,996 @@
+import os
+import json
+import time
+import pathlib
+import argparse
+import functools
+import collections
+from typing import Optional, Union
+
+import cv2
+import yaml
+import numpy as np
+
+from data.annotation_writer import annotation_hash
+from data.data_set import DataSet
+from data.loader import load_data_set
+from data.manifest import IMAGE_EXTENSIONS
+from export.coco import merge_coco, scene_instances
+from export.encoders import ENCODERS, Encoder, parse_encoder
+from export.pipeline import Pipeline, Stage
+from export.pool import (
+    BACKENDS,
+    init_worker,
+    map_scenes,
+    peak_memory,
+    print_report,
+    worker_camera,
+    worker_dataset,
+)
+from export.sinks import DirectorySink, ShardSink, Sink, close_shard_sinks
+from export.export_manifest import (
+    ExportManifest,
+    export_scenes,
+    file_hash,
+    settings_hash,
+)
+from scene.switch.yolo_label import LABEL_NAMES, yolo_boxes, yolo_lines
+from scene.track.segmentation_label import (
+    SegmentationLabel,
+    label_encoder,
+    rasterize,
+    view_image,
+)
+
+# Targets rasterized from the contour polygons of the tracks
+RASTER_TARGETS: list[str] = ["segmentation", "human", "overlay"]
+# Targets written from the contour polygons without rasterizing
+POLYGON_TARGETS: list[str] = ["coco"]
+TARGETS: list[str] = RASTER_TARGETS + POLYGON_TARGETS + ["yolo"]
+# Default number of threads per pipeline stage, processes for geometry
+STAGE_WORKERS: dict[str, int] = {
+    "read": 4,
+    "geometry": os.cpu_count() or 1,
+    "render": 2,
+    "encode": os.cpu_count() or 1,
+    "write": 2,
+}
+
+
+def _image_file(dataset: DataSet, name: str, data: Optional[dict]) -> tuple[str, bytes]:
+    """
+    :param dataset: Data set of the scene
+    :param name: Scene name
+    :param data: Dict representing the scene if already read
+    :return: Extension and content of the image file of the scene,
+             copied as stored if possible
+    """
+    image_path: pathlib.Path = dataset.image_path(name)
+    if dataset.decode_scale == 1 and image_path.suffix in IMAGE_EXTENSIONS:
+        return image_path.suffix, image_path.read_bytes()
+    image: np.ndarray = data["image"] if data else dataset.read_image(name)
+    return ".png", cv2.imencode(".png", image)[1].tobytes()
+
+
+def geometry_scene(dataset: DataSet, name: str, annotations: dict) -> dict:
+    """
+    Scene for targets which need the track geometry only. The image is
+    not decoded but a zero-strided array of the image size.
+    :param dataset: Data set of the scene
+    :param name: Scene name
+    :param annotations: Annotations of the scene
+    :return: Dict representing the scene
+    """
+    width, height = dataset.image_size(name)
+    scale: int = dataset.decode_scale
+    shape: tuple[int, int, int] = (-(-height // scale), -(-width // scale), 3)
+    return {
+        "image": np.broadcast_to(np.zeros(3, dtype=np.uint8), shape),
+        "name": name,
+        "annotations": annotations,
+        "camera_yml": dataset.camera_yml,
+        "scale": scale,
+    }
+
+
+def export_scene(
+    name: str,
+    targets: list[str],
+    sink: Sink,
+    settings: dict,
+    yolo_labels: str = "both",
+    images: bool = False,
+    verbose: bool = False,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
+    scale: Optional[float] = None,
+    encoders: Optional[dict[str, Encoder]] = None,
+) -> list[pathlib.Path]:
+    """
+    Write all targets of a scene inside an export worker. The image is
+    decoded once and only if a raster target is requested, the track
+    geometry is calculated once for all raster and polygon targets.
+    Labels and images may be cropped to a region of interest and are
+    written at a target size, which is given directly or by a scale.
+    :param name: Scene name
+    :param targets: Targets to write, subset of TARGETS
+    :param sink: Destination of the written files
+    :param settings: Dict of RailLabel settings
+    :param yolo_labels: Option of ["kind", "direction", "both"]
+    :param images: Write the image of the scene along with its labels
+    :param verbose: Verbose std out
+    :param roi: x, y, width and height of the exported region in
+                native image coordinates, the whole image if None
+    :param size: Width and height of the written labels and images
+    :param scale: Factor from the native region to the written labels
+                  and images, instead of size
+    :param encoders: Encoder per raster target, the default encoder of
+                     its color type if not given
+    :return: Paths of the written outputs
+    """
+    dataset: DataSet = worker_dataset()
+    raster_targets: list[str] = [
+        target for target in targets if target in RASTER_TARGETS
+    ]
+    transformed: bool = roi is not None or size is not None or scale is not None
+    data: Optional[dict] = None
+    annotations: Optional[dict]
+    if raster_targets or (images and transformed):
+        data = dataset.read_scene(name)
+        annotations = data["annotations"]
+    else:
+        annotations = dataset.read_annotations(name, arrays=True)
+    if not annotations:
+        msg: str = f'No annotations found for "{name}".'
+        print(msg) if verbose else None
+        return []
+
+    if scale is not None:
+        region_size: tuple[int, int] = roi[2:] if roi else dataset.image_size(name)
+        size = (round(region_size[0] * scale), round(region_size[1] * scale))
+    segmentation_label: Optional[SegmentationLabel] = None
+    if data is not None:
+        segmentation_label = SegmentationLabel(
+            data, settings, worker_camera(), roi, size
+        )
+    elif set(targets) & set(POLYGON_TARGETS):
+        segmentation_label = SegmentationLabel(
+            geometry_scene(dataset, name, annotations),
+            settings,
+            worker_camera(),
+            roi,
+            size,
+        )
+
+    files: dict[str, bytes] = {}
+    if images and transformed:
+        encoded: np.ndarray = cv2.imencode(".png", segmentation_label.image)[1]
+        files["image.png"] = encoded.tobytes()
+    elif images:
+        extension, image_file = _image_file(dataset, name, data)
+        files["image" + extension] = image_file
+    if "coco" in targets:
+        width, height = segmentation_label.size
+        image_path: pathlib.Path = dataset.image_path(name)
+        suffix: str = image_path.suffix if image_path.suffix in IMAGE_EXTENSIONS else ""
+        coco: dict = {
+            "image": {
+                "file_name": name + (suffix or ".png"),
+                "width": width,
+                "height": height,
+            },
+            "annotations": scene_instances(segmentation_label.polygons, width, height),
+        }
+        files["coco.json"] = json.dumps(coco, separators=(",", ":")).encode()
+    for target in raster_targets:
+        image: np.ndarray
+        image = segmentation_label.label(target, settings.get("tile_height"))
+        encoder: Encoder = (encoders or {}).get(target) or label_encoder(target)
+        files[target + encoder.extension] = encoder.encode(image)
+    if "yolo" in targets:
+        width, height = dataset.image_size(name)
+        boxes: np.ndarray = yolo_boxes(yolo_labels, annotations, width, height, roi)
+        files["yolo.txt"] = "\n".join(yolo_lines(boxes)).encode()
+    outputs: list[pathlib.Path] = sink.write(name, files)
+    msg: str = f'Created {", ".join(targets)} of "{name}".'
+    print(msg) if verbose else None
+    return outputs
+
+
+def _active(job: dict) -> bool:
+    """
+    :return: True if a pipeline job is outdated and annotated
+    """
+    return not job["skip"] and bool(job["annotations"])
+
+
+def _job_name(item: Union[str, dict]) -> str:
+    """
+    :param item: Scene name or job of a pipeline stage
+    :return: Scene name
+    """
+    return item if isinstance(item, str) else item["name"]
+
+
+def _read_job(
+    name: str,
+    dataset: DataSet,
+    manifest: Optional[ExportManifest],
+    decode: bool,
+    images: bool,
+    transformed: bool,
+) -> dict:
+    """
+    Read stage of the pipeline. Reads annotations and, if needed, the
+    image of a scene unless its outputs are up to date.
+    :param name: Scene name
+    :param dataset: Data set of the scene
+    :param manifest: Manifest of the export, export all if None
+    :param decode: Decode the image
+    :param images: Copy the image file of the scene
+    :param transformed: Labels and images are cropped or resized
+    :return: Job of the scene
+    """
+    annotations: dict = dataset.read_annotations(name)
+    job: dict = {
+        "name": name,
+        "hash": annotation_hash(annotations),
+        "skip": False,
+        "annotations": annotations,
+        "image": None,
+        "arrays": {},
+        "files": {},
+        "outputs": [],
+    }
+    if manifest is not None and manifest.is_current(name, job["hash"]):
+        job["skip"] = True
+    elif annotations and decode:
+        job["image"] = dataset.read_image(name)
+    if _active(job) and images and not transformed:
+        # Read the image here if it is re-encoded but was not decoded
+        data: Optional[dict] = None if job["image"] is None else job
+        extension, image_file = _image_file(dataset, name, data)
+        job["files"]["image" + extension] = image_file
+    return job
+
+
+def _scene_geometry(
+    scene: tuple[str, dict],
+    settings: dict,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
+    scale: Optional[float] = None,
+) -> tuple[list[tuple[str, np.ndarray]], tuple[int, int]]:
+    """
+    Geometry stage of the pipeline, calculated inside an export worker.
+    :param scene: Name and annotations of a scene
+    :param settings: Dict of RailLabel settings
+    :param roi: x, y, width and height of the exported region
+    :param size: Width and height of the written labels and images
+    :param scale: Factor from the native region to the written labels
+    :return: Track polygons in label coordinates and label size
+    """
+    name, annotations = scene
+    dataset: DataSet = worker_dataset()
+    if scale is not None:
+        region_size: tuple[int, int] = roi[2:] if roi else dataset.image_size(name)
+        size = (round(region_size[0] * scale), round(region_size[1] * scale))
+    segmentation_label: SegmentationLabel = SegmentationLabel(
+        geometry_scene(dataset, name, annotations),
+        settings,
+        worker_camera(),
+        roi,
+        size,
+    )
+    return segmentation_label.polygons, segmentation_label.size
+
+
+def _geometry_payload(job: dict) -> Optional[tuple[str, dict]]:
+    """
+    :return: Name and annotations of a scene to calculate the geometry
+             of, None if the job is skipped
+    """
+    return (job["name"], job["annotations"]) if _active(job) else None
+
+
+def _merge_geometry(job: dict, geometry: tuple) -> dict:
+    job["polygons"], job["size"] = geometry
+    return job
+
+
+def _render_job(
+    job: dict,
+    dataset: DataSet,
+    targets: list[str],
+    yolo_labels: str,
+    images: bool,
+    transformed: bool,
+    roi: Optional[tuple[int, int, int, int]],
+    tile_height: Optional[int],
+) -> dict:
+    """
+    Render stage of the pipeline. Rasterizes labels and writes COCO
+    and YOLO labels of a job.
+    :param transformed: Images are cropped or resized, so they are
+                        encoded again instead of copied by the read stage
+    :return: Job with arrays to encode
+    """
+    if not _active(job):
+        return job
+    name: str = job["name"]
+    view: Optional[np.ndarray] = None
+    if job["image"] is not None:
+        scale: int = dataset.decode_scale
+        height, width = job["image"].shape[:2]
+        region: tuple[int, int, int, int] = roi or (
+            0,
+            0,
+            width * scale,
+            height * scale,
+        )
+        view = view_image(job["image"], scale, region, job["size"])
+        job["image"] = None
+        if images and transformed:
+            job["arrays"]["image"] = view
+    for target in targets:
+        if target in RASTER_TARGETS:
+            shape: tuple[int, ...] = (job["size"][1], job["size"][0])
+            if target in ["human", "overlay"]:
+                shape += view.shape[2:]
+            image: Optional[np.ndarray] = view if target == "overlay" else None
+            job["arrays"][target] = rasterize(
+                job["polygons"], shape, target, image, tile_height
+            )
+    if "coco" in targets:
+        width, height = job["size"]
+        suffix: str = dataset.image_path(name).suffix
+        coco: dict = {
+            "image": {
+                "file_name": name + (suffix if suffix in IMAGE_EXTENSIONS else ".png"),
+                "width": width,
+                "height": height,
+            },
+            "annotations": scene_instances(job["polygons"], width, height),
+        }
+        job["files"]["coco.json"] = json.dumps(coco, separators=(",", ":")).encode()
+    if "yolo" in targets:
+        width, height = dataset.image_size(name)
+        boxes: np.ndarray = yolo_boxes(
+            yolo_labels, job["annotations"], width, height, roi
+        )
+        job["files"]["yolo.txt"] = "\n".join(yolo_lines(boxes)).encode()
+    return job
+
+
+def _encode_job(job: dict, encoders: dict[str, Encoder]) -> dict:
+    """
+    Encode stage of the pipeline.
+    :param encoders: Encoder per raster target and of the image
+    :return: Job with encoded files
+    """
+    for key, array in job["arrays"].items():
+        encoder: Encoder = encoders[key]
+        job["files"][key + encoder.extension] = encoder.encode(array)
+    job["arrays"] = {}
+    return job
+
+
+def _write_job(job: dict, sink: Sink, verbose: bool = False) -> dict:
+    """
+    Write stage of the pipeline.
+    :return: Job with the paths of the written outputs
+    """
+    if not _active(job):
+        return job
+    job["outputs"] = sink.write(job["name"], job["files"])
+    job["files"] = {}
+    msg: str = f'Created labels of "{job["name"]}".'
+    print(msg) if verbose else None
+    return job
+
+
+def export_pipeline(
+    dataset: DataSet,
+    sink: Sink,
+    settings: dict,
+    targets: list[str],
+    manifest: Optional[ExportManifest] = None,
+    yolo_labels: str = "both",
+    images: bool = False,
+    verbose: bool = False,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
+    scale: Optional[float] = None,
+    stage_workers: Optional[dict[str, int]] = None,
+    samples: Optional[collections.Counter] = None,
+    commit_interval: int = 256,
+    encoders: Optional[dict[str, Encoder]] = None,
+    stats: Optional[dict] = None,
+    backend: str = "process",
+    fail_fast: bool = True,
+) -> tuple[int, int, int]:
+    """
+    Export all annotated scenes in a staged pipeline instead of one
+    worker per scene. Scenes are read, their geometry calculated,
+    rendered, encoded and written by separate pools connected by
+    bounded queues, so reading and writing overlap with computing.
+    Geometry runs in worker processes, all other stages in threads of
+    this process, as file I/O and OpenCV release the GIL.
+    :param dataset: Data set to export
+    :param sink: Destination of the written files
+    :param settings: Dict of RailLabel settings
+    :param targets: Targets to write, subset of TARGETS
+    :param manifest: Manifest of the export, export all if None
+    :param yolo_labels: Option of ["kind", "direction", "both"]
+    :param images: Write the image of the scene along with its labels
+    :param verbose: Verbose std out, including the stage utilization
+    :param roi: x, y, width and height of the exported region in
+                native image coordinates, the whole image if None
+    :param size: Width and height of the written labels and images
+    :param scale: Factor from the native region to the written labels
+                  and images, instead of size
+    :param stage_workers: Number of workers by stage name, overriding
+                          STAGE_WORKERS
+    :param samples: Counter of scenes per written file, e.g. shard
+    :param commit_interval: Number of exported scenes per manifest commit
+    :param encoders: Encoder per raster target, the default encoder of
+                     its color type if not given
+    :param stats: Dict to store statistics like map_scenes
+    :param backend: Option of ['process', 'thread', 'serial'], runs the
+                    geometry in threads or every stage in this thread
+                    one scene after another without processes
+    :param fail_fast: Raise the first exception of a scene, otherwise
+                      collect failed scenes in the stats and go on
+    :return: Number of exported, skipped and removed scenes
+    """
+    stage_workers = {**STAGE_WORKERS, **(stage_workers or {})}
+    if not set(stage_workers) <= set(STAGE_WORKERS):
+        msg = f"Expected stages to be in {list(STAGE_WORKERS)}, got"
+        msg += f" {list(stage_workers)}"
+        raise ValueError(msg)
+    transformed: bool = roi is not None or size is not None or scale is not None
+    raster: bool = bool(set(targets) & set(RASTER_TARGETS))
+    encoders = {
+        "image": parse_encoder("png"),
+        **{target: label_encoder(target) for target in RASTER_TARGETS},
+        **(encoders or {}),
+    }
+    stages: list[Stage] = [
+        Stage(
+            "read",
+            functools.partial(
+                _read_job,
+                dataset=dataset,
+                manifest=manifest,
+                decode=raster or (images and transformed),
+                images=images,
+                transformed=transformed,
+            ),
+            stage_workers["read"],
+        )
+    ]
+    if raster or "coco" in targets or (images and transformed):
+        stages.append(
+            Stage(
+                "geometry",
+                functools.partial(
+                    _scene_geometry, settings=settings, roi=roi, size=size, scale=scale
+                ),
+                stage_workers["geometry"],
+                processes=True,
+                payload=_geometry_payload,
+                merge=_merge_geometry,
+            )
+        )
+    stages += [
+        Stage(
+            "render",
+            functools.partial(
+                _render_job,
+                dataset=dataset,
+                targets=targets,
+                yolo_labels=yolo_labels,
+                images=images,
+                transformed=transformed,
+                roi=roi,
+                tile_height=settings.get("tile_height"),
+            ),
+            stage_workers["render"],
+        ),
+        Stage(
+            "encode",
+            functools.partial(_encode_job, encoders=encoders),
+            stage_workers["encode"],
+        ),
+        Stage(
+            "write",
+            functools.partial(_write_job, sink=sink, verbose=verbose),
+            stage_workers["write"],
+        ),
+    ]
+    pipeline: Pipeline = Pipeline(
+        stages,
+        initializer=init_worker,
+        initargs=(dataset, settings),
+        backend=backend,
+        fail_fast=fail_fast,
+        key=_job_name,
+    )
+
+    names = dataset.iter_names(predicate=dataset.is_annotated)
+    annotated: set[str] = set()
+
+    def collect_names():
+        for name in names:
+            annotated.add(name)
+            yield name
+
+    stats = {} if stats is None else stats
+    exported: int = 0
+    skipped: int = 0
+    start: float = time.perf_counter()
+    try:
+        for job in pipeline.run(collect_names()):
+            if job["skip"]:
+                skipped += 1
+                continue
+            exported += 1
+            if samples is not None:
+                samples.update(output.name for output in job["outputs"])
+            if manifest is not None:
+                manifest.record(job["name"], job["hash"], job["outputs"])
+                if exported % commit_interval == 0:
+                    manifest.commit()
+    finally:
+        # Keep the scenes exported before an error up to date
+        if manifest is not None:
+            manifest.commit()
+        stats.update(
+            peak_memory=peak_memory(),
+            process_workers=False,
+            scenes=exported + skipped + len(pipeline.failures),
+            elapsed=time.perf_counter() - start,
+            failures=pipeline.failures,
+        )
+    pipeline.print_report() if verbose else None
+    if manifest is None:
+        return exported, skipped, 0
+    return exported, skipped, len(manifest.prune(annotated))
+
+
+def export_labels(
+    data_set_path: Union[str, pathlib.Path],
+    output_path: Union[str, pathlib.Path],
+    settings: dict,
+    targets: list[str],
+    yolo_labels: str = "both",
+    verbose: bool = False,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    force: bool = False,
+    shards: bool = False,
+    shard_size: int = 2**30,
+    shard_samples: int = 10000,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
+    scale: Optional[float] = None,
+    pipeline: bool = False,
+    stage_workers: Optional[dict[str, int]] = None,
+    backend: str = "process",
+    fail_fast: bool = False,
+    encoders: Optional[dict[str, str]] = None,
+) -> None:
+    """
+    Export several targets in a single pass over the data set.
+    Every target is written to its own directory in the output path,
+    COCO files of all scenes are merged into 'coco.json'.
+    Alternatively images and labels are streamed into tar shards in
+    WebDataset layout, every worker appends to its own shards. Sharded
+    exports always export all scenes and replace previous shards.
+    :param data_set_path: Path to dataset root directory
+    :param output_path: Path to store a directory per target or shards
+    :param settings: Dict of RailLabel settings
+    :param targets: Targets to write, subset of TARGETS
+    :param yolo_labels: Option of ["kind", "direction", "both"]
+    :param verbose: Verbose std out
+    :param workers: Number of worker processes, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param force: Export all scenes even if they are up to date
+    :param shards: Write images and labels to tar shards
+    :param shard_size: Size budget per shard in bytes
+    :param shard_samples: Number of scenes per shard
+    :param roi: x, y, width and height of the exported region in
+                native image coordinates, the whole image if None
+    :param size: Width and height of the written labels and images
+    :param scale: Factor from the native region to the written labels
+                  and images, instead of size
+    :param pipeline: Export in a staged pipeline, see export_pipeline
+    :param stage_workers: Number of workers by pipeline stage
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Stop at the first failed scene, otherwise report
+                      all failed scenes at the end
+    :param encoders: Encoder like 'png:9' per raster target, see
+                     export.encoders.ENCODERS, PNG for segmentation
+                     and JPEG otherwise if not given
+    """
+    targets = list(dict.fromkeys(targets))
+    if not targets or not set(targets) <= set(TARGETS):
+        msg = f"Expected targets to be in {TARGETS}, got {targets}"
+        raise ValueError(msg)
+    if yolo_labels not in LABEL_NAMES:
+        msg = f"Expected labels to be one of {list(LABEL_NAMES)}"
+        msg += f", got {yolo_labels}"
+        raise ValueError(msg)
+    if size is not None and scale is not None:
+        msg = f"Expected either size or scale, got {size} and {scale}"
+        raise ValueError(msg)
+    if not set(encoders or {}) <= set(RASTER_TARGETS):
+        msg = f"Expected encoders of targets in {RASTER_TARGETS}, got"
+        msg += f" {list(encoders)}"
+        raise ValueError(msg)
+    target_encoders: dict[str, Encoder] = {
+        target: label_encoder(target, (encoders or {}).get(target))
+        for target in RASTER_TARGETS
+        if target in targets
+    }
+    data_set_path = pathlib.Path(data_set_path)
+    output_path = pathlib.Path(output_path)
+    dataset: DataSet = load_data_set(data_set_path, settings)
+    if not dataset:
+        print(f'Dataset in directory "{str(data_set_path.absolute())}" is empty.')
+
+    sink: Sink
+    if shards:
+        sink = ShardSink(output_path, shard_size, shard_samples)
+        sink.clear()
+    else:
+        sink = DirectorySink(output_path)
+    function = functools.partial(
+        export_scene,
+        targets=targets,
+        sink=sink,
+        settings=settings,
+        yolo_labels=yolo_labels,
+        images=shards,
+        verbose=verbose,
+        roi=roi,
+        size=size,
+        scale=scale,
+        encoders=target_encoders,
+    )
+    stats: dict = {}
+    if pipeline and workers:
+        stage_workers = {"geometry": workers, **(stage_workers or {})}
+    options: dict = dict(
+        yolo_labels=yolo_labels,
+        images=shards,
+        verbose=verbose,
+        roi=roi,
+        size=size,
+        scale=scale,
+        encoders=target_encoders,
+    )
+    if shards:
+        samples: collections.Counter = collections.Counter()
+        if pipeline:
+            try:
+                export_pipeline(
+                    dataset,
+                    sink,
+                    settings,
+                    targets,
+                    stage_workers=stage_workers,
+                    samples=samples,
+                    stats=stats,
+                    backend=backend,
+                    fail_fast=fail_fast,
+                    **options,
+                )
+            finally:
+                sink.close()
+        else:
+            names = dataset.iter_names(predicate=dataset.is_annotated)
+            for outputs in map_scenes(
+                function,
+                names,
+                dataset,
+                settings,
+                workers,
+                chunksize,
+                stats,
+                backend,
+                fail_fast,
+            ):
+                samples.update(output.name for output in outputs)
+            close_shard_sinks()
+            # Thread and serial workers write to this sink
+            sink.close()
+        sink.write_index(samples)
+        if verbose:
+            print(f"Exported {sum(samples.values())} scenes", end="")
+            print(f" to {len(samples)} shards.")
+    else:
+        manifest: ExportManifest = ExportManifest(
+            output_path,
+            f"targets/{'+'.join(sorted(targets))}",
+            file_hash(dataset.camera_yml),
+            settings_hash(
+                settings,
+                targets=sorted(targets),
+                yolo_labels=yolo_labels,
+                roi=roi,
+                size=size,
+                scale=scale,
+                **({"encoders": encoders} if encoders else {}),
+            ),
+        )
+        try:
+            if force:
+                manifest.clear()
+            if pipeline:
+                exported, skipped, removed = export_pipeline(
+                    dataset,
+                    sink,
+                    settings,
+                    targets,
+                    manifest,
+                    stage_workers=stage_workers,
+                    stats=stats,
+                    backend=backend,
+                    fail_fast=fail_fast,
+                    **options,
+                )
+            else:
+                exported, skipped, removed = export_scenes(
+                    function,
+                    dataset,
+                    settings,
+                    manifest,
+                    workers,
+                    chunksize,
+                    stats=stats,
+                    backend=backend,
+                    fail_fast=fail_fast,
+                )
+        finally:
+            manifest.close()
+        if verbose:
+            print(f"Exported {exported}, skipped {skipped} up to date", end="")
+            print(f" and removed {removed} outdated scenes.")
+    print_report(stats, verbose)
+
+    if "coco" in targets and not shards:
+        merge_coco(output_path / "coco", output_path / "coco.json")
+    if "yolo" in targets:
+        (output_path / "yolo").mkdir(parents=True, exist_ok=True)
+        with open(output_path / "yolo" / "labels.txt", "w") as file_pointer:
+            file_pointer.write("\n".join(LABEL_NAMES[yolo_labels]))
+
+
+def parse_yaml(yaml_path: pathlib.Path) -> dict:
+    """
+    Parse configuration from YAML.
+    :param yaml_path: Path to settings file
+    :return:
+    """
+    with open(yaml_path) as file_pointer:
+        yaml_args = yaml.load(file_pointer, yaml.Loader)
+    return yaml_args
+
+
+def parse_cli() -> dict:
+    """
+    Parse CLI arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--dataset_path",
+        type=str,
+        help="Path to the directory containing a dataset",
+        required=True,
+    )
+    parser.add_argument(
+        "-o",
+        "--output_path",
+        type=str,
+        help="Path to save a directory of labels per target",
+        required=True,
+    )
+    parser.add_argument(
+        "-t",
+        "--targets",
+        type=str,
+        nargs="+",
+        choices=TARGETS,
+        help="Targets to export in one pass",
+        required=True,
+    )
+    parser.add_argument(
+        "--yolo_labels",
+        type=str,
+        choices=list(LABEL_NAMES),
+        default="both",
+        help="Label option of YOLO labels",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="Verbose std out",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings_path",
+        type=str,
+        help="Path to settings YAML-file for RailLabel.",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        help="Export all scenes even if they are up to date",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--shards",
+        help="Write images and labels to tar shards in WebDataset layout",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--shard_size_mb",
+        type=int,
+        default=1024,
+        help="Size budget per shard in MB",
+    )
+    parser.add_argument(
+        "--shard_samples",
+        type=int,
+        default=10000,
+        help="Number of scenes per shard",
+    )
+    parser.add_argument(
+        "--roi",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help="Region of interest in native image coordinates",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs=2,
+        metavar=("WIDTH", "HEIGHT"),
+        help="Size of written labels and images, e.g. the training resolution",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        help="Scale of written labels and images relative to the native region",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=16,
+        help="Number of scenes sent to a worker at once",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="process",
+        help="Run workers as processes, threads or serially for debugging",
+    )
+    parser.add_argument(
+        "--fail_fast",
+        help="Stop at the first failed scene instead of reporting all failures",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--encoders",
+        type=str,
+        nargs="+",
+        metavar="TARGET=ENCODER",
+        help=f"Encoder like 'segmentation=png:9' per target, formats {list(ENCODERS)}",
+    )
+    parser.add_argument(
+        "--pipeline",
+        help="Export in a staged read, geometry, render, encode and write pipeline",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--stage_workers",
+        type=str,
+        nargs="+",
+        metavar="STAGE=WORKERS",
+        help=f"Number of workers per pipeline stage of {list(STAGE_WORKERS)}",
+    )
+    return vars(parser.parse_args())
+
+
+def parse_settings() -> dict[str, pathlib.Path]:
+    """
+    Get configuration for label tool. Standard configuration is in YAML file.
+    These are overwritten by CLI arguments.
+    :return: Dictionary containing paths
+    """
+    # Parse CLI arguments
+    cli_args = parse_cli()
+    if cli_args["settings_path"]:
+        yaml_path = cli_args["settings_path"]
+    else:
+        yaml_path = pathlib.Path("settings.yml")
+    yaml_args = parse_yaml(yaml_path)
+    settings = {**yaml_args, **cli_args}
+    return settings
+
+
+def parse_stage_workers(values: Optional[list[str]]) -> dict[str, int]:
+    """
+    :param values: Stage names and numbers of workers, e.g. 'encode=8'
+    :return: Number of workers by stage name
+    """
+    stage_workers: dict[str, int] = {}
+    for value in values or []:
+        stage, _, workers = value.partition("=")
+        if not workers.isdigit():
+            msg = f"Expected stage workers like 'encode=8', got {value}"
+            raise ValueError(msg)
+        stage_workers[stage] = int(workers)
+    return stage_workers
+
+
+def parse_encoders(values: Optional[list[str]]) -> dict[str, str]:
+    """
+    :param values: Targets and encoders, e.g. 'segmentation=png:9'
+    :return: Encoder by target
+    """
+    encoders: dict[str, str] = {}
+    for value in values or []:
+        target, _, encoder = value.partition("=")
+        if not encoder:
+            msg = f"Expected encoders like 'segmentation=png:9', got {value}"
+            raise ValueError(msg)
+        encoders[target] = encoder
+    return encoders
+
+
+def main():
+    settings = parse_settings()
+
+    export_labels(
+        settings["dataset_path"],
+        settings["output_path"],
+        settings,
+        settings["targets"],
+        settings["yolo_labels"],
+        settings["verbose"],
+        force=settings["force"],
+        shards=settings["shards"],
+        shard_size=settings["shard_size_mb"] * 2**20,
+        shard_samples=settings["shard_samples"],
+        roi=settings["roi"],
+        size=settings["size"],
+        scale=settings["scale"],
+        pipeline=settings["pipeline"],
+        stage_workers=parse_stage_workers(settings["stage_workers"]),
+        workers=settings["workers"],
+        chunksize=settings["chunksize"],
+        backend=settings["backend"],
+        fail_fast=settings["fail_fast"],
+        encoders=parse_encoders(settings["encoders"]),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+import os
+import json
+import hashlib
+import pathlib
+import sqlite3
+import functools
+import threading
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from data.annotation_writer import annotation_hash
+from data.data_set import DataSet
+from export.job_queue import JobQueue, worker_id
+from export.pool import map_scenes, worker_dataset
+
+# Settings which select what and how to run, but not the exported labels
+RUN_SETTINGS: tuple[str, ...] = (
+    "dataset_path",
+    "output_path",
+    "settings_path",
+    "verbose",
+    "force",
+    "annotations_only",
+    "dataset_manifest",
+    "annotation_store",
+    "annotation_encoding",
+    "frame_cache_path",
+    "frame_cache_size_gb",
+    "targets",
+    "yolo_labels",
+    "shards",
+    "shard_size_mb",
+    "shard_samples",
+    "pipeline",
+    "stage_workers",
+    "workers",
+    "chunksize",
+    "backend",
+    "fail_fast",
+    "queue_path",
+    "coordinator",
+    "lease_time",
+    "color_type",
+    "encoder",
+    "encoders",
+    "benchmark",
+    "benchmark_scenes",
+)
+
+
+def file_hash(path: Union[pathlib.Path, str]) -> str:
+    """
+    :param path: Path of a file, e.g. the camera calibration
+    :return: Hex digest of the file content
+    """
+    with open(path, "rb") as file_pointer:
+        return hashlib.sha1(file_pointer.read()).hexdigest()
+
+
+def settings_hash(settings: dict, **options) -> str:
+    """
+    Hash of all settings and options which change exported labels.
+    :param settings: Dict of RailLabel settings
+    :param options: Options of the exporter, e.g. the color type
+    :return: Hex digest of settings and options
+    """
+    relevant: dict = {
+        key: value for key, value in settings.items() if key not in RUN_SETTINGS
+    }
+    serialized: str = json.dumps(
+        {"settings": relevant, "options": options}, sort_keys=True, default=str
+    )
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+class ExportManifest:
+    """
+    Record of exported outputs per scene and export type.
+
+    An output is up to date if annotations, camera calibration and
+    settings hash as they did when it was written. Outputs are
+    recorded after they are written, so an interrupted export resumes
+    with the scenes that were not recorded yet. The manifest is an
+    SQLite file in the output directory. Every thread gets its own
+    connection and the manifest may be pickled to worker processes,
+    which only read from it.
+    """
+
+    def __init__(
+        self,
+        output_path: Union[pathlib.Path, str],
+        export_type: str,
+        camera_hash: str,
+        settings_hash: str,
+        journal_mode: str = "WAL",
+    ) -> None:
+        """
+        :param output_path: Directory of the exported outputs
+        :param export_type: Name of the export, e.g. 'segmentation'
+        :param camera_hash: Hash of the camera calibration
+        :param settings_hash: Hash of settings and exporter options
+        :param journal_mode: SQLite journal mode, 'DELETE' if hosts
+                             share the manifest over a network file
+                             system, as WAL works on a single host only
+        """
+        self._output_path: pathlib.Path = pathlib.Path(output_path)
+        self._export_type: str = export_type
+        self._camera_hash: str = camera_hash
+        self._settings_hash: str = settings_hash
+        self._journal_mode: str = journal_mode
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._connect()
+
+    def __getstate__(self) -> dict:
+        state: dict = self.__dict__.copy()
+        # Workers open their own connections
+        for key in ["_local", "_connections", "_lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> pathlib.Path:
+        return self._output_path / ".export_manifest.sqlite"
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        :return: Connection of this thread, opened on first use
+        """
+        connection: Optional[sqlite3.Connection]
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self._output_path.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(
+                self.manifest_path, timeout=60, check_same_thread=False
+            )
+            connection.execute(f"PRAGMA journal_mode={self._journal_mode}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS exports "
+                "(name TEXT NOT NULL, export_type TEXT NOT NULL, "
+                "annotation_hash TEXT NOT NULL, camera_hash TEXT NOT NULL, "
+                "settings_hash TEXT NOT NULL, outputs TEXT NOT NULL, "
+                "PRIMARY KEY (name, export_type))"
+            )
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def names(self) -> list[str]:
+        """
+        :return: Names of all scenes recorded for the export type
+        """
+        rows = self._connect().execute(
+            "SELECT name FROM exports WHERE export_type = ?", (self._export_type,)
+        )
+        return [name for (name,) in rows]
+
+    def outputs(self, name: str) -> list[pathlib.Path]:
+        """
+        :param name: Scene name
+        :return: Recorded outputs of the scene
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT outputs FROM exports WHERE name = ? AND export_type = ?",
+                (name, self._export_type),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return []
+        return [self._output_path / output for output in json.loads(row[0])]
+
+    def is_current(self, name: str, scene_hash: str) -> bool:
+        """
+        :param name: Scene name
+        :param scene_hash: Hash of the actual annotations of the scene
+        :return: True if the recorded outputs are up to date
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT annotation_hash, camera_hash, settings_hash FROM exports "
+                "WHERE name = ? AND export_type = ?",
+                (name, self._export_type),
+            )
+            .fetchone()
+        )
+        return row == (scene_hash, self._camera_hash, self._settings_hash)
+
+    def record(self, name: str, scene_hash: str, outputs: list[pathlib.Path]) -> None:
+        """
+        Record written outputs of a scene and delete its previous
+        outputs which were not written again.
+        :param name: Scene name
+        :param scene_hash: Hash of the exported annotations
+        :param outputs: Paths of the written outputs
+        """
+        outputs = [pathlib.Path(output) for output in outputs]
+        for stale_output in set(self.outputs(name)) - set(outputs):
+            stale_output.unlink(missing_ok=True)
+        relative: list[str] = [
+            pathlib.Path(os.path.relpath(output, self._output_path)).as_posix()
+            for output in outputs
+        ]
+        self._connect().execute(
+            "INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                name,
+                self._export_type,
+                scene_hash,
+                self._camera_hash,
+                self._settings_hash,
+                json.dumps(relative),
+            ),
+        )
+
+    def remove(self, name: str) -> None:
+        """
+        Delete outputs and record of a scene.
+        :param name: Scene name
+        """
+        for output in self.outputs(name):
+            output.unlink(missing_ok=True)
+        self._connect().execute(
+            "DELETE FROM exports WHERE name = ? AND export_type = ?",
+            (name, self._export_type),
+        )
+
+    def prune(self, names: set[str]) -> list[str]:
+        """
+        Delete outputs of scenes which are not annotated anymore.
+        :param names: Names of all annotated scenes
+        :return: Names of the removed scenes
+        """
+        removed: list[str] = [name for name in self.names() if name not in names]
+        for name in removed:
+            self.remove(name)
+        self.commit()
+        return removed
+
+    def clear(self) -> None:
+        """
+        Forget all records of the export type, so all scenes are
+        exported again. Outputs are kept and overwritten.
+        """
+        self._connect().execute(
+            "DELETE FROM exports WHERE export_type = ?", (self._export_type,)
+        )
+        self.commit()
+
+    def commit(self) -> None:
+        self._connect().commit()
+
+    def close(self) -> None:
+        """
+        Commit and close the connections of all threads.
+        """
+        with self._lock:
+            for connection in self._connections:
+                connection.commit()
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def _export_scene(
+    name: str, function: Callable, manifest: Optional[ExportManifest]
+) -> tuple[str, str, Optional[list[pathlib.Path]]]:
+    """
+    Export a scene inside an export worker unless it is up to date.
+    :param name: Scene name
+    :param function: Picklable function taking a scene name and
+                     returning the paths of the written outputs
+    :param manifest: Manifest of the export, export all if None
+    :return: Name, annotation hash and outputs, which are None if the
+             scene is up to date
+    """
+    scene_hash: str = annotation_hash(worker_dataset().read_annotations(name))
+    if manifest is not None and manifest.is_current(name, scene_hash):
+        return name, scene_hash, None
+    return name, scene_hash, function(name)
+
+
+def export_scenes(
+    function: Callable,
+    dataset: DataSet,
+    settings: dict,
+    manifest: Optional[ExportManifest] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    commit_interval: int = 256,
+    stats: Optional[dict] = None,
+    backend: str = "process",
+    fail_fast: bool = True,
+    job_queue: Optional[JobQueue] = None,
+    coordinator: bool = False,
+) -> tuple[int, int, int]:
+    """
+    Export all annotated scenes of a data set in worker processes.
+    With a manifest only outdated scenes are exported and outputs of
+    scenes which are not annotated anymore are deleted. Failed scenes
+    are not recorded, so they are exported again by the next run.
+    With a job queue the scenes are pulled from the queue, so several
+    hosts export one data set together. The coordinator fills the
+    queue and deletes outputs of scenes not annotated anymore, all
+    other hosts export their claimed scenes only.
+    :param function: Picklable function taking a scene name and
+                     returning the paths of the written outputs
+    :param dataset: Data set to export
+    :param settings: Dict of RailLabel settings
+    :param manifest: Manifest of the export, export all if None
+    :param workers: Number of worker processes, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param commit_interval: Number of exported scenes per manifest commit
+    :param stats: Dict to store statistics of the workers, see map_scenes
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Raise the first exception of a scene, otherwise
+                      collect failed scenes in the stats and go on
+    :param job_queue: Queue shared by the hosts of a distributed export
+    :param coordinator: Fill the job queue before pulling scenes
+    :return: Number of exported, skipped and removed scenes
+    """
+    names = dataset.iter_names(predicate=dataset.is_annotated)
+    exported: int = 0
+    skipped: int = 0
+    stats = {} if stats is None else stats
+    if manifest is None and job_queue is None:
+        for _ in map_scenes(
+            function,
+            names,
+            dataset,
+            settings,
+            workers,
+            chunksize,
+            stats,
+            backend,
+            fail_fast,
+        ):
+            exported += 1
+        return exported, skipped, 0
+
+    annotated: set[str] = set()
+    removed: list[str] = []
+    stats.update(peak_memory=0, scenes=0, elapsed=0.0, failures=[])
+    stats["process_workers"] = backend == "process"
+
+    def collect_names(names: Iterable[str]) -> Iterator[str]:
+        for name in names:
+            annotated.add(name)
+            yield name
+
+    def export(names: Iterable[str]) -> None:
+        nonlocal exported, skipped
+        round_stats: dict = dict(peak_memory=0, scenes=0, elapsed=0.0, failures=[])
+        results = map_scenes(
+            functools.partial(_export_scene, function=function, manifest=manifest),
+            collect_names(names),
+            dataset,
+            settings,
+            workers,
+            chunksize,
+            round_stats,
+            backend,
+            fail_fast,
+        )
+        released: int = 0
+        try:
+            for name, scene_hash, outputs in results:
+                if outputs is None:
+                    skipped += 1
+                else:
+                    if manifest is not None:
+                        manifest.record(name, scene_hash, outputs)
+                    exported += 1
+                    if manifest is not None and exported % commit_interval == 0:
+                        manifest.commit()
+                if job_queue is not None:
+                    job_queue.complete([name])
+                    # Failed scenes may be claimed again
+                    for failure in round_stats["failures"][released:]:
+                        job_queue.fail(*failure)
+                    released = len(round_stats["failures"])
+        finally:
+            stats["peak_memory"] = max(stats["peak_memory"], round_stats["peak_memory"])
+            stats["scenes"] += round_stats["scenes"]
+            stats["elapsed"] += round_stats["elapsed"]
+            stats["failures"] += round_stats["failures"]
+        if job_queue is not None:
+            for failure in round_stats["failures"][released:]:
+                job_queue.fail(*failure)
+
+    if job_queue is None:
+        export(names)
+    else:
+        owner: str = worker_id()
+        if coordinator:
+            # Keep workers of this run from seeing the previous run
+            job_queue.reset()
+            annotated.update(names)
+            job_queue.fill(sorted(annotated))
+            removed = manifest.prune(annotated) if manifest is not None else []
+        # Claims run ahead of the workers and scenes may take longer
+        # than a lease, so all leases of this worker are renewed
+        with job_queue.keep_leases(owner):
+            export(job_queue.pull(owner, chunksize))
+            while job_queue.wait(owner):
+                export(job_queue.pull(owner, chunksize))
+    if manifest is not None:
+        manifest.commit()
+        if job_queue is None:
+            removed = manifest.prune(annotated)
+    return exported, skipped, len(removed)
@@ -0,0 +1,291 @@
+import os
+import time
+import socket
+import pathlib
+import sqlite3
+import threading
+import contextlib
+from typing import Iterable, Iterator, Optional, Union
+
+
+def worker_id() -> str:
+    """
+    :return: Name of this export worker, unique across hosts
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Queue of scenes shared by export workers on several hosts.
+
+    A coordinator fills the queue with all scenes of a data set, any
+    number of workers claim scenes in small batches with time-limited
+    leases and mark them done once their outputs are written. Leases
+    of crashed workers expire and their scenes are claimed again, a
+    scene failing or expiring 'max_attempts' times is marked failed.
+    Workers renew the leases of the scenes they are exporting. The
+    coordinator resets the queue when it starts, so it has to start
+    before the other workers of a run.
+
+    The queue is an SQLite file next to the data set, e.g. on NFS.
+    SQLite relies on file locks over network file systems, so the
+    file system has to support POSIX locks, as NFSv4 does, and hosts
+    need synchronized clocks for the lease times. WAL mode is not
+    used as it needs shared memory on a single host.
+    """
+
+    def __init__(
+        self,
+        queue_path: Union[pathlib.Path, str],
+        lease_time: float = 600.0,
+        max_attempts: int = 3,
+        poll_interval: float = 10.0,
+    ) -> None:
+        """
+        :param queue_path: Path of the SQLite file
+        :param lease_time: Seconds a worker may take for the scenes it
+                           claimed before they are claimed again, unless
+                           it renews their leases
+        :param max_attempts: Number of leases per scene before it is
+                             marked failed
+        :param poll_interval: Seconds to wait if no scene is available
+        """
+        self._queue_path: pathlib.Path = pathlib.Path(queue_path)
+        self._lease_time: float = lease_time
+        self._max_attempts: int = max_attempts
+        self._poll_interval: float = poll_interval
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __getstate__(self) -> dict:
+        state: dict = self.__dict__.copy()
+        # Workers open their own connection
+        state["_connection"] = None
+        return state
+
+    @property
+    def queue_path(self) -> pathlib.Path:
+        return self._queue_path
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        :return: Connection in autocommit mode, opened on first use
+        """
+        if self._connection is None:
+            self._queue_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self._queue_path, timeout=600, isolation_level=None
+            )
+            self._connection.execute("PRAGMA journal_mode=DELETE")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs "
+                "(name TEXT PRIMARY KEY, state TEXT NOT NULL, owner TEXT, "
+                "expires REAL, attempts INTEGER NOT NULL, error TEXT)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS queue (key TEXT PRIMARY KEY, value TEXT)"
+            )
+        return self._connection
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Write transaction locking the queue against all other workers.
+        """
+        connection: sqlite3.Connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def reset(self) -> None:
+        """
+        Delete all jobs of a previous run, so workers wait for the
+        coordinator to fill the queue again.
+        """
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM jobs")
+            connection.execute("DELETE FROM queue WHERE key = 'filled'")
+
+    def fill(self, names: Iterable[str]) -> int:
+        """
+        Replace all jobs by pending jobs of the given scenes.
+        :param names: Names of all scenes to export
+        :return: Number of jobs
+        """
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM jobs")
+            connection.executemany(
+                "INSERT OR IGNORE INTO jobs VALUES (?, 'pending', NULL, NULL, 0, NULL)",
+                ((name,) for name in names),
+            )
+            connection.execute("INSERT OR REPLACE INTO queue VALUES ('filled', '1')")
+            (count,) = connection.execute("SELECT COUNT(*) FROM jobs").fetchone()
+        return count
+
+    @property
+    def filled(self) -> bool:
+        """
+        :return: True once a coordinator filled the queue
+        """
+        row = (
+            self._connect()
+            .execute("SELECT value FROM queue WHERE key = 'filled'")
+            .fetchone()
+        )
+        return row is not None
+
+    def claim(self, owner: str, count: int = 16) -> list[str]:
+        """
+        Lease pending scenes and scenes with expired leases.
+        :param owner: Name of the claiming worker
+        :param count: Maximal number of scenes to claim
+        :return: Names of the claimed scenes
+        """
+        now: float = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', error = 'Lease expired' "
+                "WHERE state = 'leased' AND expires < ? AND attempts >= ?",
+                (now, self._max_attempts),
+            )
+            names: list[str] = [
+                name
+                for (name,) in connection.execute(
+                    "SELECT name FROM jobs WHERE state = 'pending' "
+                    "OR (state = 'leased' AND expires < ?) ORDER BY rowid LIMIT ?",
+                    (now, count),
+                )
+            ]
+            connection.executemany(
+                "UPDATE jobs SET state = 'leased', owner = ?, expires = ?, "
+                "attempts = attempts + 1 WHERE name = ?",
+                ((owner, now + self._lease_time, name) for name in names),
+            )
+        return names
+
+    def renew(self, owner: str) -> None:
+        """
+        Extend all leases of a worker by the lease time.
+        :param owner: Name of the worker
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET expires = ? WHERE state = 'leased' AND owner = ?",
+                (time.time() + self._lease_time, owner),
+            )
+
+    @contextlib.contextmanager
+    def keep_leases(self, owner: str) -> Iterator[None]:
+        """
+        Renew the leases of a worker in a background thread every third
+        of the lease time, so scenes in flight are not claimed again.
+        Leases of a crashed worker expire as before.
+        :param owner: Name of the worker
+        """
+        stop: threading.Event = threading.Event()
+
+        def renew() -> None:
+            # SQLite connections are bound to their thread
+            job_queue: JobQueue = JobQueue(
+                self._queue_path, self._lease_time, self._max_attempts
+            )
+            try:
+                while not stop.wait(self._lease_time / 3):
+                    job_queue.renew(owner)
+            finally:
+                job_queue.close()
+
+        thread: threading.Thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, names: Iterable[str]) -> None:
+        """
+        :param names: Names of scenes whose outputs are written
+        """
+        with self._transaction() as connection:
+            connection.executemany(
+                "UPDATE jobs SET state = 'done', expires = NULL WHERE name = ?",
+                ((name,) for name in names),
+            )
+
+    def fail(self, name: str, error: str) -> None:
+        """
+        Release a failed scene to be claimed again unless it failed
+        'max_attempts' times.
+        :param name: Scene name
+        :param error: Traceback of the failure
+        """
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' "
+                "ELSE 'pending' END, expires = NULL, error = ? WHERE name = ?",
+                (self._max_attempts, error, name),
+            )
+
+    def counts(self) -> dict[str, int]:
+        """
+        :return: Number of jobs by state of ['pending', 'leased',
+                 'done', 'failed']
+        """
+        rows = self._connect().execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+        )
+        return {"pending": 0, "leased": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def _leased_by_others(self, owner: str) -> int:
+        """
+        :param owner: Name of a worker
+        :return: Number of scenes leased by other workers
+        """
+        (count,) = (
+            self._connect()
+            .execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'leased' AND owner != ?",
+                (owner,),
+            )
+            .fetchone()
+        )
+        return count
+
+    def pull(self, owner: str, count: int = 16) -> Iterator[str]:
+        """
+        Claim scenes batch by batch until no scene is available. Never
+        waits, so the caller can complete its scenes in flight before
+        calling wait.
+        :param owner: Name of the claiming worker
+        :param count: Number of scenes claimed at once
+        :return: Names of the claimed scenes
+        """
+        while True:
+            names: list[str] = self.claim(owner, count)
+            if not names:
+                return
+            yield from names
+
+    def wait(self, owner: str) -> bool:
+        """
+        Wait for the coordinator to fill the queue or for leases of
+        other workers to be completed or to expire.
+        :param owner: Name of the waiting worker
+        :return: False without waiting if all scenes are done, failed or
+                 leased by this worker
+        """
+        if self.filled and not self.counts()["pending"]:
+            if not self._leased_by_others(owner):
+                return False
+        time.sleep(self._poll_interval)
+        return True
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
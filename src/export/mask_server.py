@@ -0,0 +1,584 @@
+import json
+import time
+import socket
+import asyncio
+import pathlib
+import argparse
+import mimetypes
+import http.client
+import collections
+import urllib.parse
+import concurrent.futures
+from http import HTTPStatus
+from typing import Optional, Union
+
+import yaml
+
+from data.data_set import DataSet
+from data.loader import load_data_set
+from export.export_labels import RASTER_TARGETS, geometry_scene
+from export.pool import init_worker, worker_camera, worker_dataset, worker_settings
+from scene.track.segmentation_label import SegmentationLabel, label_encoder
+
+# Workers rendering labels, serial rendering would block all clients
+SERVER_BACKENDS: list[str] = ["process", "thread"]
+# Scene name, target, size, region of interest and encoder of a label
+LabelKey = tuple[
+    str,
+    str,
+    Optional[tuple[int, int]],
+    Optional[tuple[int, int, int, int]],
+    Optional[str],
+]
+
+
+class LabelCache:
+    """
+    Least recently used encoded labels up to a memory budget. Labels
+    larger than the budget are not cached.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """
+        :param max_bytes: Budget of all cached labels in bytes
+        """
+        self._max_bytes: int = max_bytes
+        self._labels: collections.OrderedDict = collections.OrderedDict()
+        self._bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, key: LabelKey) -> Optional[bytes]:
+        """
+        :param key: Key of the label
+        :return: Encoded label or None if not cached
+        """
+        label: Optional[bytes] = self._labels.get(key)
+        if label is None:
+            self.misses += 1
+            return None
+        self._labels.move_to_end(key)
+        self.hits += 1
+        return label
+
+    def put(self, key: LabelKey, label: bytes) -> None:
+        """
+        Cache a label and evict the least recently used labels beyond
+        the budget.
+        :param key: Key of the label
+        :param label: Encoded label
+        """
+        if len(label) > self._max_bytes:
+            return
+        if key in self._labels:
+            self._bytes -= len(self._labels.pop(key))
+        self._labels[key] = label
+        self._bytes += len(label)
+        while self._bytes > self._max_bytes:
+            _, evicted = self._labels.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        :return: Number of cached labels, their bytes, the budget, hits,
+                 misses and evictions
+        """
+        return {
+            "labels": len(self._labels),
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+
+def _int_tuple(value: Optional[str], length: int, key: str) -> Optional[tuple]:
+    """
+    :param value: Comma separated integers of a query parameter
+    :param length: Number of expected integers
+    :param key: Name of the query parameter
+    :return: Integers or None if not given
+    """
+    if value is None:
+        return None
+    try:
+        numbers: tuple[int, ...] = tuple(int(number) for number in value.split(","))
+    except ValueError:
+        numbers = ()
+    if len(numbers) != length or min(numbers) < 0:
+        msg = f"Expected {length} comma separated integers for {key}, got {value}"
+        raise ValueError(msg)
+    return numbers
+
+
+def parse_label_request(target: str) -> LabelKey:
+    """
+    Parse the target of a request like
+    '/labels/<name>?target=segmentation&size=640,360&encoder=png'.
+    Target defaults to 'segmentation', size to the decoded image, roi
+    as x,y,width,height to the whole image and encoder to the default
+    of the target.
+    :param target: Path and query of the request
+    :return: Key of the requested label
+    """
+    url: urllib.parse.SplitResult = urllib.parse.urlsplit(target)
+    prefix: str = "/labels/"
+    if not url.path.startswith(prefix) or len(url.path) == len(prefix):
+        msg = f"Expected path like {prefix}<name>, got {url.path}"
+        raise ValueError(msg)
+    query: dict[str, str] = dict(urllib.parse.parse_qsl(url.query))
+    color_type: str = query.get("target", "segmentation")
+    if color_type not in RASTER_TARGETS:
+        msg = f"Expected target to be in {RASTER_TARGETS}, got {color_type}"
+        raise ValueError(msg)
+    size: Optional[tuple] = _int_tuple(query.get("size"), 2, "size")
+    roi: Optional[tuple] = _int_tuple(query.get("roi"), 4, "roi")
+    if (size is not None and not min(size)) or (roi is not None and not min(roi[2:])):
+        msg = f"Expected label size and roi size above zero, got {size} and {roi}"
+        raise ValueError(msg)
+    encoder: Optional[str] = query.get("encoder")
+    # Unknown encoders are bad requests, not failures of the workers
+    label_encoder(color_type, encoder)
+    return (
+        urllib.parse.unquote(url.path[len(prefix) :]),
+        color_type,
+        size,
+        roi,
+        encoder,
+    )
+
+
+def render_label(key: LabelKey) -> bytes:
+    """
+    Render and encode a label inside a worker. Only overlays decode
+    the image, other targets are rasterized from the annotations and
+    the image size. Scenes without annotations give empty labels.
+    :param key: Key of the label
+    :return: Encoded label
+    """
+    name, color_type, size, roi, encoder = key
+    dataset: DataSet = worker_dataset()
+    data: dict
+    if color_type == "overlay":
+        data = dataset.read_scene(name)
+    else:
+        data = geometry_scene(
+            dataset, name, dataset.read_annotations(name, arrays=True)
+        )
+    data["annotations"] = data["annotations"] or {}
+    settings: dict = worker_settings()
+    segmentation_label: SegmentationLabel = SegmentationLabel(
+        data, settings, worker_camera(), roi, size
+    )
+    label = segmentation_label.label(color_type, settings.get("tile_height"))
+    return label_encoder(color_type, encoder).encode(label)
+
+
+class MaskServer:
+    """
+    Serve labels of a data set on demand over HTTP on localhost or a
+    Unix socket, e.g. to training jobs instead of exported masks.
+
+    An asyncio front end handles any number of concurrent clients and
+    keep-alive connections, while a pool of workers, opened once by
+    the pool initializer, renders labels. Concurrent requests of the
+    same label are rendered once. Labels are cached by scene name,
+    target, size, region of interest and encoder and never invalidated,
+    so the server serves the annotations as they were when rendered.
+    """
+
+    def __init__(
+        self,
+        dataset_path: Union[pathlib.Path, str],
+        settings: dict,
+        workers: Optional[int] = None,
+        backend: str = "process",
+        cache_bytes: int = 2**30,
+        verbose: bool = False,
+    ) -> None:
+        """
+        :param dataset_path: Path to dataset root directory
+        :param settings: Dict of RailLabel settings
+        :param workers: Number of workers, all cores if None
+        :param backend: Workers of SERVER_BACKENDS
+        :param cache_bytes: Memory budget of cached labels in bytes
+        :param verbose: Print every request
+        """
+        if backend not in SERVER_BACKENDS:
+            msg = f"Expected backend to be in {SERVER_BACKENDS}, got {backend}"
+            raise ValueError(msg)
+        self._dataset_path: pathlib.Path = pathlib.Path(dataset_path)
+        self._settings: dict = settings
+        self._workers: Optional[int] = workers
+        self._backend: str = backend
+        self._verbose: bool = verbose
+        self._dataset: Optional[DataSet] = None
+        self.cache: LabelCache = LabelCache(cache_bytes)
+        self._rendering: dict[LabelKey, asyncio.Future] = {}
+        self._executor: Optional[concurrent.futures.Executor] = None
+        self.requests: int = 0
+
+    def _open_executor(self) -> concurrent.futures.Executor:
+        self._dataset = load_data_set(self._dataset_path, self._settings)
+        if self._backend == "process":
+            return concurrent.futures.ProcessPoolExecutor(
+                self._workers,
+                initializer=init_worker,
+                initargs=(self._dataset, self._settings),
+            )
+        init_worker(self._dataset, self._settings)
+        return concurrent.futures.ThreadPoolExecutor(self._workers)
+
+    async def label(self, key: LabelKey) -> bytes:
+        """
+        :param key: Key of the label
+        :return: Encoded label from the cache or rendered by a worker
+        """
+        label: Optional[bytes] = self.cache.get(key)
+        if label is not None:
+            return label
+        if key in self._rendering:
+            return await asyncio.shield(self._rendering[key])
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.run_in_executor(self._executor, render_label, key)
+        self._rendering[key] = future
+        try:
+            label = await asyncio.shield(future)
+        finally:
+            del self._rendering[key]
+        self.cache.put(key, label)
+        return label
+
+    def stats(self) -> dict:
+        """
+        :return: Number of requests, labels being rendered and cache
+                 statistics
+        """
+        return {
+            "requests": self.requests,
+            "rendering": len(self._rendering),
+            "cache": self.cache.stats(),
+        }
+
+    async def _respond(self, target: str) -> tuple[HTTPStatus, str, bytes]:
+        """
+        :param target: Path and query of a GET request
+        :return: Status, content type and body of the response
+        """
+        if target == "/stats":
+            body: bytes = json.dumps(self.stats()).encode()
+            return HTTPStatus.OK, "application/json", body
+        try:
+            key: LabelKey = parse_label_request(target)
+            # Errors of the workers are failures, not bad requests
+            self._dataset.index(key[0])
+        except KeyError as error:
+            body = str(error.args[0] if error.args else error).encode()
+            return HTTPStatus.NOT_FOUND, "text/plain", body
+        except ValueError as error:
+            return HTTPStatus.BAD_REQUEST, "text/plain", str(error).encode()
+        try:
+            label: bytes = await self.label(key)
+        except Exception as error:
+            body = f"{type(error).__name__}: {error}".encode()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain", body
+        extension: str = label_encoder(key[1], key[4]).extension
+        content_type: str = (
+            mimetypes.guess_type(f"label{extension}")[0] or "application/octet-stream"
+        )
+        return HTTPStatus.OK, content_type, label
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Answer GET requests of a client until it closes the connection.
+        """
+        try:
+            while True:
+                request_line: bytes = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers: dict[str, str] = {}
+                while True:
+                    line: bytes = await reader.readline()
+                    if not line.strip():
+                        break
+                    header, _, value = line.decode("latin-1").partition(":")
+                    headers[header.strip().lower()] = value.strip().lower()
+                start: float = time.perf_counter()
+                self.requests += 1
+                parts: list[str] = request_line.decode("latin-1").split()
+                if len(parts) != 3 or parts[0] != "GET":
+                    status, content_type, body = (
+                        HTTPStatus.BAD_REQUEST,
+                        "text/plain",
+                        b"Expected a GET request",
+                    )
+                else:
+                    status, content_type, body = await self._respond(parts[1])
+                keep_alive: bool = parts[-1:] == ["HTTP/1.1"]
+                keep_alive = keep_alive and headers.get("connection") != "close"
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode("latin-1")
+                )
+                writer.write(body)
+                await writer.drain()
+                if self._verbose:
+                    elapsed: float = 1000 * (time.perf_counter() - start)
+                    print(f"{status.value} {' '.join(parts[1:2])} {elapsed:.1f} ms")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Lost connections and request lines beyond the stream limit
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8008,
+        socket_path: Optional[Union[pathlib.Path, str]] = None,
+    ) -> None:
+        """
+        Serve until cancelled.
+        :param host: Address to listen on, localhost only by default
+        :param port: Port to listen on
+        :param socket_path: Unix socket to listen on instead of a port
+        """
+        self._executor = self._open_executor()
+        server: asyncio.AbstractServer
+        if socket_path is not None:
+            pathlib.Path(socket_path).unlink(missing_ok=True)
+            server = await asyncio.start_unix_server(self._handle, str(socket_path))
+            address: str = str(socket_path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            address = f"http://{host}:{port}"
+        print(f'Serving labels of "{self._dataset_path}" on {address}.')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+            if socket_path is not None:
+                pathlib.Path(socket_path).unlink(missing_ok=True)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    """
+    HTTP connection over a Unix socket.
+    """
+
+    def __init__(self, socket_path: Union[pathlib.Path, str], timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path: str = str(socket_path)
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+
+class MaskClient:
+    """
+    Client of a MaskServer keeping its connection open. Clients are
+    not thread safe, so every data loader worker needs its own.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8008,
+        socket_path: Optional[Union[pathlib.Path, str]] = None,
+        timeout: float = 600.0,
+    ) -> None:
+        """
+        :param host: Address of the server
+        :param port: Port of the server
+        :param socket_path: Unix socket of the server instead of a port
+        :param timeout: Seconds to wait for a label
+        """
+        self._connection: http.client.HTTPConnection
+        if socket_path is not None:
+            self._connection = _UnixConnection(socket_path, timeout)
+        else:
+            self._connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _get(self, target: str) -> bytes:
+        self._connection.request("GET", target)
+        response: http.client.HTTPResponse = self._connection.getresponse()
+        body: bytes = response.read()
+        if response.status == HTTPStatus.NOT_FOUND:
+            raise KeyError(body.decode())
+        if response.status != HTTPStatus.OK:
+            msg = f"Mask server answered {response.status}: {body.decode()}"
+            raise ValueError(msg)
+        return body
+
+    def label(
+        self,
+        name: str,
+        target: str = "segmentation",
+        size: Optional[tuple[int, int]] = None,
+        roi: Optional[tuple[int, int, int, int]] = None,
+        encoder: Optional[str] = None,
+    ) -> bytes:
+        """
+        :param name: Scene name
+        :param target: Label type of RASTER_TARGETS
+        :param size: Width and height of the label, the decoded image
+                     size if None
+        :param roi: x, y, width and height of the labeled region in
+                    native image coordinates, the whole image if None
+        :param encoder: Encoder like 'png:9' or 'npy', the default of
+                        the target if None
+        :return: Encoded label
+        """
+        query: dict[str, str] = {"target": target}
+        if size is not None:
+            query["size"] = ",".join(str(value) for value in size)
+        if roi is not None:
+            query["roi"] = ",".join(str(value) for value in roi)
+        if encoder is not None:
+            query["encoder"] = encoder
+        path: str = "/labels/" + urllib.parse.quote(name)
+        return self._get(f"{path}?{urllib.parse.urlencode(query)}")
+
+    def stats(self) -> dict:
+        """
+        :return: Statistics of the server
+        """
+        return json.loads(self._get("/stats"))
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def parse_yaml(yaml_path: pathlib.Path) -> dict:
+    """
+    Parse configuration from YAML.
+    :param yaml_path: Path to settings file
+    :return:
+    """
+    with open(yaml_path) as file_pointer:
+        yaml_args = yaml.load(file_pointer, yaml.Loader)
+    return yaml_args
+
+
+def parse_cli() -> dict:
+    """
+    Parse CLI arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--dataset_path",
+        type=str,
+        help="Path to the directory containing a dataset",
+        required=True,
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to listen on",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=8008,
+        help="Port to listen on",
+    )
+    parser.add_argument(
+        "--socket_path",
+        type=str,
+        help="Unix socket to listen on instead of a port",
+    )
+    parser.add_argument(
+        "--cache_mb",
+        type=int,
+        default=1024,
+        help="Memory budget of cached labels in MB",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="Print every request",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings_path",
+        type=str,
+        help="Path to settings YAML-file for RailLabel.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=SERVER_BACKENDS,
+        default="process",
+        help="Render labels in worker processes or threads",
+    )
+    return vars(parser.parse_args())
+
+
+def parse_settings() -> dict[str, pathlib.Path]:
+    """
+    Get configuration for label tool. Standard configuration is in YAML file.
+    These are overwritten by CLI arguments.
+    :return: Dictionary containing paths
+    """
+    # Parse CLI arguments
+    cli_args = parse_cli()
+    if cli_args["settings_path"]:
+        yaml_path = cli_args["settings_path"]
+    else:
+        yaml_path = pathlib.Path("settings.yml")
+    yaml_args = parse_yaml(yaml_path)
+    settings = {**yaml_args, **cli_args}
+    return settings
+
+
+def main():
+    settings = parse_settings()
+
+    mask_server: MaskServer = MaskServer(
+        settings["dataset_path"],
+        settings,
+        settings["workers"],
+        settings["backend"],
+        settings["cache_mb"] * 2**20,
+        settings["verbose"],
+    )
+    try:
+        asyncio.run(
+            mask_server.serve(
+                settings["host"], settings["port"], settings["socket_path"]
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import time
+import queue
+import threading
+import traceback
+import concurrent.futures
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from tabulate import tabulate
+
+# Marks the end of the items in a queue
+_END = object()
+# Process stages run in worker processes, in threads or all stages in
+# the consuming thread one item after another
+PIPELINE_BACKENDS: list[str] = ["process", "thread", "serial"]
+
+
+class Stage:
+    """
+    One step of a pipeline, run by a pool of threads or processes.
+
+    Thread stages suit I/O and OpenCV functions, which release the
+    GIL. Process stages suit pure Python computations. Their items
+    are sent to the processes, so 'payload' may select the part of an
+    item a process needs and 'merge' combines its result with the
+    item again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Callable,
+        workers: int = 1,
+        processes: bool = False,
+        payload: Optional[Callable] = None,
+        merge: Optional[Callable] = None,
+    ) -> None:
+        """
+        :param name: Name of the stage in the report
+        :param function: Function taking and returning an item, picklable
+                         for process stages
+        :param workers: Number of threads or processes
+        :param processes: Run function in worker processes
+        :param payload: Part of an item sent to a process, the item if None.
+                        Items with a payload of None pass unchanged
+        :param merge: Item from item and result of a process, the result
+                      if None
+        """
+        if workers < 1:
+            msg = f'Expected at least one worker for stage "{name}", got {workers}'
+            raise ValueError(msg)
+        self.name: str = name
+        self.function: Callable = function
+        self.workers: int = workers
+        self.processes: bool = processes
+        self.payload: Callable = payload or (lambda item: item)
+        self.merge: Callable = merge or (lambda item, result: result)
+        self.items: int = 0
+        self.busy: float = 0.0
+
+
+class Pipeline:
+    """
+    Run items through stages connected by bounded queues, so all
+    stages work concurrently on different items while at most
+    'queue_size' items wait between two stages.
+
+    Items leave the pipeline in order of completion. The first
+    exception of any stage stops the pipeline and is raised to the
+    consumer, unless failed items are collected instead.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        queue_size: int = 8,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        backend: str = "process",
+        fail_fast: bool = True,
+        key: Optional[Callable] = None,
+    ) -> None:
+        """
+        :param stages: Stages in order
+        :param queue_size: Number of items waiting between two stages
+        :param initializer: Called once in every worker process, or
+                            once in this process without processes
+        :param initargs: Arguments of the initializer
+        :param backend: Backend of PIPELINE_BACKENDS
+        :param fail_fast: Raise the first exception of any stage,
+                          otherwise drop failed items and collect them
+                          in 'failures'
+        :param key: Name of an item in 'failures', the item if None
+        """
+        if backend not in PIPELINE_BACKENDS:
+            msg = f"Expected backend to be in {PIPELINE_BACKENDS}, got {backend}"
+            raise ValueError(msg)
+        self._stages: list[Stage] = stages
+        self._queue_size: int = queue_size
+        self._initializer: Optional[Callable] = initializer
+        self._initargs: tuple = initargs
+        self._backend: str = backend
+        self._fail_fast: bool = fail_fast
+        self._key: Callable = key or (lambda item: item)
+        # Key and traceback of the failed items of the last run
+        self.failures: list[tuple[Any, str]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._elapsed: float = 0.0
+
+    def _get(self, inbox: queue.Queue) -> Any:
+        """
+        :return: Next item or end mark if the pipeline stopped
+        """
+        while not self._stop.is_set():
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END
+
+    def _put(self, outbox: queue.Queue, item: Any) -> None:
+        """
+        Put an item unless the pipeline stopped.
+        """
+        while not self._stop.is_set():
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _fail(self, error: BaseException) -> None:
+        """
+        Stop the pipeline on its first error.
+        """
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _apply(
+        self,
+        stage: Stage,
+        item: Any,
+        executor: Optional[concurrent.futures.Executor],
+    ) -> Any:
+        """
+        Apply a stage to an item, process stages in a worker process if
+        an executor is given.
+        :param executor: Process pool of process stages
+        :return: Processed item
+        """
+        if not stage.processes:
+            return stage.function(item)
+        payload = stage.payload(item)
+        if payload is None:
+            return item
+        if executor is None:
+            return stage.merge(item, stage.function(payload))
+        future = executor.submit(stage.function, payload)
+        return stage.merge(item, future.result())
+
+    def _failed(self, item: Any) -> bool:
+        """
+        Handle the exception of a stage raised for an item.
+        :return: True if the failed item is dropped and the pipeline
+                 goes on
+        """
+        if self._fail_fast:
+            return False
+        with self._lock:
+            self.failures.append((self._key(item), traceback.format_exc()))
+        return True
+
+    def _feed(self, items: Iterable, outbox: queue.Queue) -> None:
+        try:
+            for item in items:
+                self._put(outbox, item)
+                if self._stop.is_set():
+                    return
+        except BaseException as error:
+            self._fail(error)
+        self._put(outbox, _END)
+
+    def _work(
+        self,
+        stage: Stage,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        remaining: list[int],
+        executor: Optional[concurrent.futures.Executor],
+    ) -> None:
+        """
+        Process items of one stage until the end mark.
+        :param remaining: Number of running workers of the stage
+        :param executor: Process pool of process stages
+        """
+        while True:
+            item = self._get(inbox)
+            if item is _END:
+                # Let the other workers of the stage see the end too
+                self._put(inbox, _END)
+                with self._lock:
+                    remaining[0] -= 1
+                    last: bool = remaining[0] == 0
+                if last:
+                    self._put(outbox, _END)
+                return
+            start: float = time.perf_counter()
+            try:
+                result = self._apply(stage, item, executor)
+            except Exception as error:
+                if not self._failed(item):
+                    self._fail(error)
+                continue
+            except BaseException as error:
+                self._fail(error)
+                continue
+            finally:
+                with self._lock:
+                    stage.busy += time.perf_counter() - start
+                    stage.items += 1
+            self._put(outbox, result)
+
+    def run(self, items: Iterable) -> Iterator:
+        """
+        :param items: Items to process, consumed lazily
+        :return: Processed items in order of completion
+        """
+        self._stop.clear()
+        self._error = None
+        self.failures = []
+        for stage in self._stages:
+            stage.items = 0
+            stage.busy = 0.0
+        if self._backend != "process" and self._initializer is not None:
+            self._initializer(*self._initargs)
+        if self._backend == "serial":
+            yield from self._run_serial(items)
+            return
+        queues: list[queue.Queue] = [
+            queue.Queue(self._queue_size) for _ in range(len(self._stages) + 1)
+        ]
+        executors: list[concurrent.futures.Executor] = []
+        threads: list[threading.Thread] = [
+            threading.Thread(target=self._feed, args=(items, queues[0]), daemon=True)
+        ]
+        for position, stage in enumerate(self._stages):
+            executor: Optional[concurrent.futures.Executor] = None
+            if stage.processes and self._backend == "process":
+                executor = concurrent.futures.ProcessPoolExecutor(
+                    stage.workers,
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+                executors.append(executor)
+            remaining: list[int] = [stage.workers]
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(
+                            stage,
+                            queues[position],
+                            queues[position + 1],
+                            remaining,
+                            executor,
+                        ),
+                        daemon=True,
+                    )
+                )
+        start: float = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _END:
+                    break
+                yield item
+        finally:
+            # Stops all threads if the consumer quits early
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                executor.shutdown(cancel_futures=True)
+            self._elapsed = time.perf_counter() - start
+        if self._error is not None:
+            raise self._error
+
+    def _run_serial(self, items: Iterable) -> Iterator:
+        """
+        Pass every item through all stages before reading the next one,
+        e.g. for debugging.
+        :param items: Items to process, consumed lazily
+        :return: Processed items in order
+        """
+        start: float = time.perf_counter()
+        try:
+            for item in items:
+                for stage in self._stages:
+                    stage_start: float = time.perf_counter()
+                    try:
+                        item = self._apply(stage, item, None)
+                    except Exception:
+                        if not self._failed(item):
+                            raise
+                        item = _END
+                        break
+                    finally:
+                        stage.busy += time.perf_counter() - stage_start
+                        stage.items += 1
+                if item is not _END:
+                    yield item
+        finally:
+            self._elapsed = time.perf_counter() - start
+
+    def report(self) -> list[dict]:
+        """
+        Utilization of a stage is its busy time relative to the time
+        all its workers were available. The stage with the highest
+        utilization is the bottleneck.
+        :return: Name, workers, items, busy seconds and utilization
+                 per stage of the last run
+        """
+        elapsed: float = self._elapsed or float("inf")
+        return [
+            {
+                "stage": stage.name,
+                "workers": stage.workers,
+                "items": stage.items,
+                "busy [s]": round(stage.busy, 2),
+                "utilization": round(stage.busy / (stage.workers * elapsed), 3),
+            }
+            for stage in self._stages
+        ]
+
+    def print_report(self) -> None:
+        print(tabulate(self.report(), headers="keys"))
@@ -0,0 +1,199 @@
+import os
+import sys
+import time
+import pathlib
+import itertools
+import traceback
+import functools
+import collections
+import concurrent.futures
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from tabulate import tabulate
+
+from data.data_set import DataSet
+from data.loader import load_data_set
+from scene.camera.camera import Camera
+
+# Objects opened once per worker process by init_worker
+_worker_state: dict = {}
+# Thread and serial backends share the objects of this process
+BACKENDS: list[str] = ["process", "thread", "serial"]
+
+
+def init_worker(dataset: Union[DataSet, pathlib.Path, str], settings: dict) -> None:
+    """
+    Open data set and camera once per worker process.
+    :param dataset: Data set, pickled with its options for process
+                    workers, or path to dataset root directory to open
+                    as configured in the settings
+    :param settings: Dict of RailLabel settings
+    """
+    if not isinstance(dataset, DataSet):
+        dataset = load_data_set(dataset, settings)
+    _worker_state["dataset"] = dataset
+    _worker_state["camera"] = Camera(dataset.camera_yml, dataset.decode_scale)
+    _worker_state["settings"] = settings
+
+
+def worker_dataset() -> DataSet:
+    """
+    :return: Data set opened by the initializer of this worker
+    """
+    return _worker_state["dataset"]
+
+
+def worker_camera() -> Camera:
+    """
+    :return: Camera opened by the initializer of this worker
+    """
+    return _worker_state["camera"]
+
+
+def worker_settings() -> dict:
+    """
+    :return: Settings given to the initializer of this worker
+    """
+    return _worker_state["settings"]
+
+
+def peak_memory() -> int:
+    """
+    :return: Peak resident memory of this process in bytes, 0 on
+             platforms without the resource module like Windows
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_chunk(
+    function: Callable, names: list[str], fail_fast: bool = True
+) -> tuple[list, list[tuple[str, str]], int]:
+    """
+    Apply function to a chunk of scene names inside a worker.
+    :param function: Picklable function taking a scene name
+    :param names: Scene names
+    :param fail_fast: Raise the first exception instead of collecting
+    :return: Results in order of the names without failed scenes,
+             name and traceback of failed scenes and peak memory of
+             the worker
+    """
+    results: list = []
+    failures: list[tuple[str, str]] = []
+    for name in names:
+        try:
+            results.append(function(name))
+        except Exception:
+            if fail_fast:
+                raise
+            failures.append((name, traceback.format_exc()))
+    return results, failures, peak_memory()
+
+
+def map_scenes(
+    function: Callable,
+    names: Iterable[str],
+    dataset: Union[DataSet, pathlib.Path, str],
+    settings: dict,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    stats: Optional[dict] = None,
+    backend: str = "process",
+    fail_fast: bool = True,
+) -> Iterator:
+    """
+    Apply function to scenes in workers which load their scenes
+    themselves. Only scene names are sent to the workers and at most
+    two chunks per worker are queued at any time.
+    Process workers are initialized by init_worker. Thread workers
+    and the serial backend share the data set and camera of this
+    process, which suits debugging and functions releasing the GIL.
+    :param function: Picklable function taking a scene name, may use
+                     worker_dataset and worker_camera
+    :param names: Scene names, consumed lazily
+    :param dataset: Data set, keeping its options in the workers, or
+                    path to dataset root directory
+    :param settings: Dict of RailLabel settings
+    :param workers: Number of workers, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param stats: Dict to store the highest peak memory of all workers
+                  in bytes as 'peak_memory', which is the peak of this
+                  process unless 'process_workers' is set, the number
+                  of processed
+                  'scenes', the 'elapsed' seconds and name and
+                  traceback of all 'failures'
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Raise the first exception of a scene, otherwise
+                      collect failed scenes in the stats and go on
+    :return: Results in order of the names without failed scenes
+    """
+    if backend not in BACKENDS:
+        msg = f"Expected backend to be in {BACKENDS}, got {backend}"
+        raise ValueError(msg)
+    stats = {} if stats is None else stats
+    stats.update(peak_memory=0, scenes=0, elapsed=0.0, failures=[])
+    stats["process_workers"] = backend == "process"
+    start: float = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    names = iter(names)
+    run_chunk: Callable = functools.partial(_run_chunk, function, fail_fast=fail_fast)
+
+    def collect(chunk_result: tuple[list, list, int]) -> list:
+        results, failures, peak = chunk_result
+        stats["peak_memory"] = max(stats["peak_memory"], peak)
+        stats["scenes"] += len(results) + len(failures)
+        stats["failures"] += failures
+        stats["elapsed"] = time.perf_counter() - start
+        return results
+
+    executor: concurrent.futures.Executor
+    if backend == "process":
+        executor = concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=init_worker, initargs=(dataset, settings)
+        )
+    else:
+        init_worker(dataset, settings)
+        if backend == "serial":
+            for chunk in iter(lambda: list(itertools.islice(names, chunksize)), []):
+                yield from collect(run_chunk(chunk))
+            return
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    pending: collections.deque = collections.deque()
+    with executor:
+        while True:
+            chunk: list[str] = list(itertools.islice(names, chunksize))
+            if chunk:
+                pending.append(executor.submit(run_chunk, chunk))
+            if pending and (not chunk or len(pending) >= 2 * workers):
+                yield from collect(pending.popleft().result())
+            elif not chunk:
+                break
+
+
+def print_report(stats: dict, verbose: bool = False) -> None:
+    """
+    Print failed scenes with their tracebacks and, if verbose, the
+    throughput and peak memory of an export.
+    :param stats: Statistics of map_scenes
+    :param verbose: Print throughput and peak memory too
+    """
+    if verbose:
+        elapsed: float = stats["elapsed"] or float("inf")
+        print(f"Processed {stats['scenes']} scenes in {stats['elapsed']:.1f} s", end="")
+        print(f" ({stats['scenes'] / elapsed:.1f} scenes/s).")
+        scope: str = "per worker" if stats["process_workers"] else "of this process"
+        print(f"Peak memory {scope}: {stats['peak_memory'] / 2**20:.0f} MB")
+    if not stats["failures"]:
+        return
+    print(f"{len(stats['failures'])} scenes failed:")
+    rows: list[tuple[str, str]] = [
+        (name, failure.strip().splitlines()[-1]) for name, failure in stats["failures"]
+    ]
+    print(tabulate(rows, headers=["scene", "error"]))
+    for name, failure in stats["failures"]:
+        print(f'\nTraceback of "{name}":\n{failure}', end="")
@@ -0,0 +1,198 @@
+import io
+import os
+import json
+import time
+import tarfile
+import pathlib
+import threading
+from multiprocessing import util
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+
+class Sink(ABC):
+    """
+    Destination of exported files. Every scene is written as a set of
+    files keyed by target and extension, e.g. 'segmentation.png'.
+    """
+
+    @abstractmethod
+    def write(self, name: str, files: dict[str, bytes]) -> list[pathlib.Path]:
+        """
+        :param name: Scene name
+        :param files: Encoded files by key '<target>.<extension>'
+        :return: Paths of the written outputs
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class DirectorySink(Sink):
+    """
+    Write every file of a scene to the directory of its target, e.g.
+    'segmentation.png' of scene 'a' to '<output>/segmentation/a.png'.
+    """
+
+    def __init__(self, output_path: Union[pathlib.Path, str]) -> None:
+        """
+        :param output_path: Path to store a directory per target
+        """
+        self._output_path: pathlib.Path = pathlib.Path(output_path)
+
+    def write(self, name: str, files: dict[str, bytes]) -> list[pathlib.Path]:
+        outputs: list[pathlib.Path] = []
+        for key, data in files.items():
+            target, _, extension = key.partition(".")
+            output: pathlib.Path = self._output_path / target / f"{name}.{extension}"
+            output.parent.mkdir(parents=True, exist_ok=True)
+            output.write_bytes(data)
+            outputs.append(output)
+        return outputs
+
+
+# Shard sinks of this process by output path, see ShardSink.__reduce__
+_shard_sinks: dict[tuple, "ShardSink"] = {}
+
+
+def _process_shard_sink(
+    output_path: pathlib.Path, max_bytes: int, max_samples: int
+) -> "ShardSink":
+    """
+    :return: Shard sink of this process, created on first use
+    """
+    key: tuple = (output_path, max_bytes, max_samples)
+    if key not in _shard_sinks:
+        _shard_sinks[key] = ShardSink(output_path, max_bytes, max_samples)
+    return _shard_sinks[key]
+
+
+def close_shard_sinks() -> None:
+    """
+    Close all shard sinks opened in this process.
+    """
+    while _shard_sinks:
+        _shard_sinks.popitem()[1].close()
+
+
+class ShardSink(Sink):
+    """
+    Append scenes to sequential tar shards in WebDataset layout.
+
+    All files of a scene are consecutive members named
+    '<scene>.<target>.<extension>' and a scene never spans two shards.
+    A shard is closed once it exceeds its size or sample budget.
+    Shards are written under a temporary name and renamed when they
+    are complete, so interrupted exports leave no truncated shards.
+
+    A pickled sink is restored as the one sink of the receiving
+    process, so every worker appends to its own shards, which are
+    closed when the worker exits. Threads of a process may share a
+    sink.
+    """
+
+    def __init__(
+        self,
+        output_path: Union[pathlib.Path, str],
+        max_bytes: int = 2**30,
+        max_samples: int = 10000,
+    ) -> None:
+        """
+        :param output_path: Directory to store shards and their index
+        :param max_bytes: Size budget per shard
+        :param max_samples: Number of scenes per shard
+        """
+        self._output_path: pathlib.Path = pathlib.Path(output_path)
+        self._max_bytes: int = max_bytes
+        self._max_samples: int = max_samples
+        self._tar: Optional[tarfile.TarFile] = None
+        self._shard_path: Optional[pathlib.Path] = None
+        self._shard_count: int = 0
+        self._samples: int = 0
+        self._finalizer: Optional[util.Finalize] = None
+        # Reentrant, as writing closes full shards
+        self._lock = threading.RLock()
+
+    def __reduce__(self):
+        return (
+            _process_shard_sink,
+            (self._output_path, self._max_bytes, self._max_samples),
+        )
+
+    @property
+    def output_path(self) -> pathlib.Path:
+        return self._output_path
+
+    def _open_shard(self) -> None:
+        """
+        Start the next shard of this process.
+        """
+        self._output_path.mkdir(parents=True, exist_ok=True)
+        self._shard_path = self._output_path / (
+            f"shard-{os.getpid()}-{self._shard_count:06d}.tar"
+        )
+        self._shard_count += 1
+        self._samples = 0
+        self._tar = tarfile.open(self._shard_path.with_suffix(".tar.tmp"), "w")
+        if self._finalizer is None:
+            # Close the last shard when a worker process exits
+            self._finalizer = util.Finalize(None, self.close, exitpriority=10)
+
+    def write(self, name: str, files: dict[str, bytes]) -> list[pathlib.Path]:
+        with self._lock:
+            if self._tar is not None and (
+                self._samples >= self._max_samples
+                or self._tar.offset >= self._max_bytes
+            ):
+                self.close()
+            if self._tar is None:
+                self._open_shard()
+            mtime: float = time.time()
+            for key, data in files.items():
+                info: tarfile.TarInfo = tarfile.TarInfo(f"{name}.{key}")
+                info.size = len(data)
+                info.mtime = mtime
+                self._tar.addfile(info, io.BytesIO(data))
+            self._samples += 1
+            return [self._shard_path]
+
+    def close(self) -> None:
+        """
+        Complete the actual shard.
+        """
+        with self._lock:
+            if self._tar is None:
+                return
+            self._tar.close()
+            os.replace(self._shard_path.with_suffix(".tar.tmp"), self._shard_path)
+            self._tar = None
+
+    def write_index(self, samples: dict[str, int]) -> pathlib.Path:
+        """
+        Write the shard list in the WebDataset index format.
+        :param samples: Number of scenes per shard file name
+        :return: Path of the index file
+        """
+        index: dict = {
+            "__kind__": "wids-shard-index-v1",
+            "wids_version": 1,
+            "shardlist": [
+                {"url": shard, "nsamples": count}
+                for shard, count in sorted(samples.items())
+            ],
+        }
+        index_path: pathlib.Path = self._output_path / "index.json"
+        with open(index_path, "w") as file_pointer:
+            json.dump(index, file_pointer, indent=1)
+        return index_path
+
+    def clear(self) -> None:
+        """
+        Delete shards and index of previous exports.
+        """
+        if not self._output_path.exists():
+            return
+        for path in self._output_path.iterdir():
+            if path.name.startswith("shard-") and path.suffix in (".tar", ".tmp"):
+                path.unlink()
+        (self._output_path / "index.json").unlink(missing_ok=True)
@@ -0,0 +1,383 @@
+import json
+import pathlib
+import argparse
+import functools
+from typing import Optional, Union
+
+import yaml
+import numpy as np
+
+from data.data_set import DataSet
+from data.loader import load_data_set
+from export.export_labels import RASTER_TARGETS, geometry_scene
+from export.pool import (
+    BACKENDS,
+    map_scenes,
+    print_report,
+    worker_camera,
+    worker_dataset,
+)
+from scene.track.segmentation_label import SegmentationLabel
+
+# Memory maps of the stacks opened in this process by path
+_stacks: dict[pathlib.Path, np.ndarray] = {}
+
+
+def stack_shape(target: str, size: tuple[int, int]) -> tuple[int, ...]:
+    """
+    :param target: Raster target or 'image'
+    :param size: Width and height of the samples
+    :return: Shape of one sample of the stack
+    """
+    width, height = size
+    return (height, width) if target == "segmentation" else (height, width, 3)
+
+
+def create_stacks(
+    output_path: Union[pathlib.Path, str],
+    names: list[str],
+    size: tuple[int, int],
+    stacks: list[str],
+) -> pathlib.Path:
+    """
+    Preallocate an uint8 '.npy' file per stack with one sample per
+    scene and write the index of the scene names. The files are sparse
+    until workers fill their samples.
+    :param output_path: Directory of the stacks
+    :param names: Scene names in sample order
+    :param size: Width and height of the samples
+    :param stacks: Raster targets and 'image'
+    :return: Path of the index
+    """
+    output_path = pathlib.Path(output_path)
+    output_path.mkdir(parents=True, exist_ok=True)
+    for stack in stacks:
+        stack_array: np.memmap = np.lib.format.open_memmap(
+            output_path / f"{stack}.npy",
+            mode="w+",
+            dtype=np.uint8,
+            shape=(len(names), *stack_shape(stack, size)),
+        )
+        del stack_array
+    index_path: pathlib.Path = output_path / "index.json"
+    index: dict = {
+        "names": names,
+        "size": list(size),
+        "stacks": {stack: f"{stack}.npy" for stack in stacks},
+        "failed": [],
+    }
+    with open(index_path, "w") as file_pointer:
+        json.dump(index, file_pointer)
+    return index_path
+
+
+def load_stacks(
+    output_path: Union[pathlib.Path, str], mode: str = "r"
+) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    Open stacks for training, samples are read without decoding.
+    :param output_path: Directory of the stacks
+    :param mode: Memory map mode, 'r+' to write samples
+    :return: Index with scene names in sample order and memory mapped
+             stacks by name
+    """
+    output_path = pathlib.Path(output_path)
+    with open(output_path / "index.json") as file_pointer:
+        index: dict = json.load(file_pointer)
+    stacks: dict[str, np.ndarray] = {
+        stack: np.load(output_path / file_name, mmap_mode=mode)
+        for stack, file_name in index["stacks"].items()
+    }
+    return index, stacks
+
+
+def _open_stack(stack_path: pathlib.Path) -> np.ndarray:
+    """
+    :return: Writable memory map of a stack, opened once per process
+    """
+    if stack_path not in _stacks:
+        _stacks[stack_path] = np.load(stack_path, mmap_mode="r+")
+    return _stacks[stack_path]
+
+
+def stack_scene(
+    sample: tuple[int, str],
+    output_path: pathlib.Path,
+    targets: list[str],
+    settings: dict,
+    size: tuple[int, int],
+    images: bool = False,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    verbose: bool = False,
+) -> str:
+    """
+    Rasterize the labels of a scene into its samples of the stacks
+    inside an export worker. Every scene has its own sample, so
+    workers write disjoint parts of the memory maps.
+    :param sample: Index of the sample and scene name
+    :param output_path: Directory of the stacks
+    :param targets: Raster targets to write
+    :param settings: Dict of RailLabel settings
+    :param size: Width and height of the samples
+    :param images: Write the image cropped and resized like the labels
+    :param roi: x, y, width and height of the exported region in
+                native image coordinates, the whole image if None
+    :param verbose: Verbose std out
+    :return: Scene name
+    """
+    slot, name = sample
+    dataset: DataSet = worker_dataset()
+    data: dict
+    if images or "overlay" in targets:
+        data = dataset.read_scene(name)
+    else:
+        data = geometry_scene(
+            dataset, name, dataset.read_annotations(name, arrays=True)
+        )
+    if not data["annotations"]:
+        msg: str = f'No annotations found for "{name}", its samples are empty.'
+        print(msg) if verbose else None
+        return name
+
+    segmentation_label: SegmentationLabel = SegmentationLabel(
+        data, settings, worker_camera(), roi, size
+    )
+    for target in targets:
+        stack: np.ndarray = _open_stack(output_path / f"{target}.npy")
+        segmentation_label.label(target, settings.get("tile_height"), stack[slot])
+    if images:
+        _open_stack(output_path / "image.npy")[slot] = segmentation_label.image
+    msg = f'Stacked {", ".join(targets)} of "{name}".'
+    print(msg) if verbose else None
+    return name
+
+
+def export_stacks(
+    data_set_path: Union[str, pathlib.Path],
+    output_path: Union[str, pathlib.Path],
+    settings: dict,
+    targets: list[str],
+    size: tuple[int, int],
+    images: bool = False,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    verbose: bool = False,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    backend: str = "process",
+    fail_fast: bool = False,
+) -> None:
+    """
+    Export raster labels of all annotated scenes into one memory
+    mapped '.npy' stack per target, e.g. of shape (scenes, height,
+    width) for 'segmentation', and optionally the images into
+    'image.npy'. Scene names in sample order are stored in
+    'index.json' along with the names of failed scenes, whose samples
+    stay empty. Stacks are always exported completely.
+    :param data_set_path: Path to dataset root directory
+    :param output_path: Path to store the stacks and their index
+    :param settings: Dict of RailLabel settings
+    :param targets: Raster targets to write, subset of RASTER_TARGETS
+    :param size: Width and height of all samples
+    :param images: Write images cropped and resized like the labels
+    :param roi: x, y, width and height of the exported region in
+                native image coordinates, the whole image if None
+    :param verbose: Verbose std out
+    :param workers: Number of workers, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Stop at the first failed scene, otherwise report
+                      all failed scenes at the end
+    """
+    targets = list(dict.fromkeys(targets))
+    if not targets or not set(targets) <= set(RASTER_TARGETS):
+        msg = f"Expected targets to be in {RASTER_TARGETS}, got {targets}"
+        raise ValueError(msg)
+    data_set_path = pathlib.Path(data_set_path)
+    output_path = pathlib.Path(output_path)
+    dataset: DataSet = load_data_set(data_set_path, settings)
+    if not dataset:
+        print(f'Dataset in directory "{str(data_set_path.absolute())}" is empty.')
+
+    names: list[str] = list(dataset.iter_names(predicate=dataset.is_annotated))
+    index_path: pathlib.Path = create_stacks(
+        output_path, names, size, targets + (["image"] if images else [])
+    )
+    function = functools.partial(
+        stack_scene,
+        output_path=output_path,
+        targets=targets,
+        settings=settings,
+        size=size,
+        images=images,
+        roi=roi,
+        verbose=verbose,
+    )
+    stats: dict = {}
+    for _ in map_scenes(
+        function,
+        enumerate(names),
+        dataset,
+        settings,
+        workers,
+        chunksize,
+        stats,
+        backend,
+        fail_fast,
+    ):
+        pass
+    # Failures are reported by sample, name them by scene only
+    stats["failures"] = [(name, failure) for (_, name), failure in stats["failures"]]
+    # Thread and serial workers mapped the stacks in this process
+    for stack in _stacks.values():
+        stack.flush()
+    _stacks.clear()
+
+    with open(index_path) as file_pointer:
+        index: dict = json.load(file_pointer)
+    index["failed"] = [name for name, _ in stats["failures"]]
+    with open(index_path, "w") as file_pointer:
+        json.dump(index, file_pointer)
+    if verbose:
+        print(f"Stacked {len(names)} scenes into {output_path}.")
+    print_report(stats, verbose)
+
+
+def parse_yaml(yaml_path: pathlib.Path) -> dict:
+    """
+    Parse configuration from YAML.
+    :param yaml_path: Path to settings file
+    :return:
+    """
+    with open(yaml_path) as file_pointer:
+        yaml_args = yaml.load(file_pointer, yaml.Loader)
+    return yaml_args
+
+
+def parse_cli() -> dict:
+    """
+    Parse CLI arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--dataset_path",
+        type=str,
+        help="Path to the directory containing a dataset",
+        required=True,
+    )
+    parser.add_argument(
+        "-o",
+        "--output_path",
+        type=str,
+        help="Path to save a stack per target and their index",
+        required=True,
+    )
+    parser.add_argument(
+        "-t",
+        "--targets",
+        type=str,
+        nargs="+",
+        choices=RASTER_TARGETS,
+        help="Targets to stack",
+        required=True,
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs=2,
+        metavar=("WIDTH", "HEIGHT"),
+        help="Size of all samples, e.g. the training resolution",
+        required=True,
+    )
+    parser.add_argument(
+        "--images",
+        help="Stack images resized like the labels too",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--roi",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help="Region of interest in native image coordinates",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="Verbose std out",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings_path",
+        type=str,
+        help="Path to settings YAML-file for RailLabel.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=16,
+        help="Number of scenes sent to a worker at once",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="process",
+        help="Run workers as processes, threads or serially for debugging",
+    )
+    parser.add_argument(
+        "--fail_fast",
+        help="Stop at the first failed scene instead of reporting all failures",
+        action="store_true",
+        required=False,
+    )
+    return vars(parser.parse_args())
+
+
+def parse_settings() -> dict[str, pathlib.Path]:
+    """
+    Get configuration for label tool. Standard configuration is in YAML file.
+    These are overwritten by CLI arguments.
+    :return: Dictionary containing paths
+    """
+    # Parse CLI arguments
+    cli_args = parse_cli()
+    if cli_args["settings_path"]:
+        yaml_path = cli_args["settings_path"]
+    else:
+        yaml_path = pathlib.Path("settings.yml")
+    yaml_args = parse_yaml(yaml_path)
+    settings = {**yaml_args, **cli_args}
+    return settings
+
+
+def main():
+    settings = parse_settings()
+
+    export_stacks(
+        settings["dataset_path"],
+        settings["output_path"],
+        settings,
+        settings["targets"],
+        settings["size"],
+        settings["images"],
+        settings["roi"],
+        settings["verbose"],
+        settings["workers"],
+        settings["chunksize"],
+        settings["backend"],
+        settings["fail_fast"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import csv
+import pathlib
+import argparse
+from typing import Iterable, Optional, Union
+
+import yaml
+import numpy as np
+
+from data.data_set import DataSet
+from data.loader import load_data_set
+from export.pool import BACKENDS, map_scenes, print_report, worker_dataset
+from scene.switch.yolo_label import switch_boxes
+
+# Columns of the switch table, boxes in native pixels and relative to
+# the image size like YOLO labels
+COLUMNS: list[str] = [
+    "scene",
+    "switch_id",
+    "kind",
+    "direction",
+    "x_min",
+    "y_min",
+    "x_max",
+    "y_max",
+    "x_center",
+    "y_center",
+    "width",
+    "height",
+]
+# Output formats by file suffix
+TABLE_FORMATS: list[str] = [".csv", ".npz"]
+
+
+def switch_columns(
+    name: str, annotations: dict, width: int, height: int
+) -> dict[str, np.ndarray]:
+    """
+    Columns of all switches of a scene, calculated from its serialized
+    annotations at once. Switches with less than two marks are skipped.
+    :param name: Scene name
+    :param annotations: Serialized scene in native image coordinates
+    :param width: Native image width
+    :param height: Native image height
+    :return: Array per column of COLUMNS
+    """
+    switch_ids: list[str] = [
+        str(switch_id)
+        for switch_id, switch in annotations.get("switches", {}).items()
+        if len(switch["marks"]) == 2
+    ]
+    marks, forks, directions = switch_boxes(annotations)
+    lower: np.ndarray = marks.min(axis=1)
+    upper: np.ndarray = marks.max(axis=1)
+    resolution: np.ndarray = np.array([width, height], dtype=np.float64)
+    # Pixels are discrete values, as in YOLO labels
+    centers: np.ndarray = np.rint(marks.mean(axis=1)) / resolution
+    sizes: np.ndarray = (upper - lower) / resolution
+    return {
+        "scene": np.full(len(switch_ids), name, dtype=object),
+        "switch_id": np.array(switch_ids, dtype=object),
+        "kind": np.where(forks, "fork", "merge").astype(object),
+        "direction": np.where(directions, "right", "left").astype(object),
+        "x_min": lower[:, 0],
+        "y_min": lower[:, 1],
+        "x_max": upper[:, 0],
+        "y_max": upper[:, 1],
+        "x_center": centers[:, 0],
+        "y_center": centers[:, 1],
+        "width": sizes[:, 0],
+        "height": sizes[:, 1],
+    }
+
+
+def scene_switches(name: str) -> dict[str, np.ndarray]:
+    """
+    Read the switches of a scene inside an export worker without
+    decoding its image.
+    :param name: Scene name
+    :return: Array per column of COLUMNS
+    """
+    dataset: DataSet = worker_dataset()
+    width, height = dataset.image_size(name)
+    return switch_columns(name, dataset.read_annotations(name) or {}, width, height)
+
+
+def write_switch_table(
+    tables: Iterable[dict[str, np.ndarray]], output_file: Union[pathlib.Path, str]
+) -> int:
+    """
+    Write the switches of all scenes into one table. CSV rows are
+    streamed scene by scene, NPZ files store an array per column.
+    :param tables: Columns of the switches per scene
+    :param output_file: Path of the table, ending in a TABLE_FORMATS
+    :return: Number of switches
+    """
+    output_file = pathlib.Path(output_file)
+    if output_file.suffix not in TABLE_FORMATS:
+        msg = f"Expected table file ending in {TABLE_FORMATS}, got {output_file}"
+        raise ValueError(msg)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    rows: int = 0
+    if output_file.suffix == ".csv":
+        with open(output_file, "w", newline="") as file_pointer:
+            writer = csv.writer(file_pointer)
+            writer.writerow(COLUMNS)
+            for table in tables:
+                writer.writerows(zip(*(table[column].tolist() for column in COLUMNS)))
+                rows += len(table["scene"])
+        return rows
+
+    columns: dict[str, list[np.ndarray]] = {column: [] for column in COLUMNS}
+    for table in tables:
+        for column in COLUMNS:
+            columns[column].append(table[column])
+        rows += len(table["scene"])
+    arrays: dict[str, np.ndarray] = {}
+    for column, parts in columns.items():
+        array: np.ndarray = np.concatenate(parts) if parts else np.zeros(0)
+        # Unicode arrays load without pickle
+        arrays[column] = array.astype(str) if array.dtype == object else array
+    np.savez_compressed(output_file, **arrays)
+    return rows
+
+
+def export_switch_table(
+    data_set_path: Union[str, pathlib.Path],
+    output_file: Union[str, pathlib.Path],
+    settings: dict,
+    verbose: bool = False,
+    workers: Optional[int] = None,
+    chunksize: int = 256,
+    backend: str = "process",
+    fail_fast: bool = False,
+) -> None:
+    """
+    Export all switches of a data set into one table. Workers read
+    annotations and image sizes from the manifest or image headers,
+    images are never decoded.
+    :param data_set_path: Path to dataset root directory
+    :param output_file: Path of the table, ending in a TABLE_FORMATS
+    :param settings: Dict of RailLabel settings
+    :param verbose: Verbose std out
+    :param workers: Number of workers, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Stop at the first failed scene, otherwise report
+                      all failed scenes at the end
+    """
+    data_set_path = pathlib.Path(data_set_path)
+    dataset: DataSet = load_data_set(data_set_path, settings)
+    if not dataset:
+        print(f'Dataset in directory "{str(data_set_path.absolute())}" is empty.')
+
+    stats: dict = {}
+    tables = map_scenes(
+        scene_switches,
+        dataset.iter_names(predicate=dataset.is_annotated),
+        dataset,
+        settings,
+        workers,
+        chunksize,
+        stats,
+        backend,
+        fail_fast,
+    )
+    rows: int = write_switch_table(tables, output_file)
+    if verbose:
+        print(f"Wrote {rows} switches of {stats['scenes']} scenes to {output_file}.")
+    print_report(stats, verbose)
+
+
+def parse_yaml(yaml_path: pathlib.Path) -> dict:
+    """
+    Parse configuration from YAML.
+    :param yaml_path: Path to settings file
+    :return:
+    """
+    with open(yaml_path) as file_pointer:
+        yaml_args = yaml.load(file_pointer, yaml.Loader)
+    return yaml_args
+
+
+def parse_cli() -> dict:
+    """
+    Parse CLI arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d",
+        "--dataset_path",
+        type=str,
+        help="Path to the directory containing a dataset",
+        required=True,
+    )
+    parser.add_argument(
+        "-o",
+        "--output_file",
+        type=str,
+        help=f"Path of the switch table ending in one of {TABLE_FORMATS}",
+        required=True,
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="Verbose std out",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings_path",
+        type=str,
+        help="Path to settings YAML-file for RailLabel.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=256,
+        help="Number of scenes sent to a worker at once",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="process",
+        help="Run workers as processes, threads or serially for debugging",
+    )
+    parser.add_argument(
+        "--fail_fast",
+        help="Stop at the first failed scene instead of reporting all failures",
+        action="store_true",
+        required=False,
+    )
+    return vars(parser.parse_args())
+
+
+def parse_settings() -> dict[str, pathlib.Path]:
+    """
+    Get configuration for label tool. Standard configuration is in YAML file.
+    These are overwritten by CLI arguments.
+    :return: Dictionary containing paths
+    """
+    # Parse CLI arguments
+    cli_args = parse_cli()
+    if cli_args["settings_path"]:
+        yaml_path = cli_args["settings_path"]
+    else:
+        yaml_path = pathlib.Path("settings.yml")
+    yaml_args = parse_yaml(yaml_path)
+    settings = {**yaml_args, **cli_args}
+    return settings
+
+
+def main():
+    settings = parse_settings()
+
+    export_switch_table(
+        settings["dataset_path"],
+        settings["output_file"],
+        settings,
+        settings["verbose"],
+        settings["workers"],
+        settings["chunksize"],
+        settings["backend"],
+        settings["fail_fast"],
+    )
+
+
+if __name__ == "__main__":
+    main()
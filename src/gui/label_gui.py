@@ -5,6 +5,8 @@ import PySimpleGUI as sg
 from typing import Optional
 from scene.aiming_devices.mouse import Mouse
 from data.data_set import DataSet
+from data.loader import load_data_set
+from data.annotation_writer import AnnotationWriter
 from scene.scene import Scene
 from gui.simple_gui import settings_window_layout
 
@@ -29,13 +31,15 @@ class LabelGui:
         self.cv2_window_name = "Image"
         self.cv_window = cv2.namedWindow(self.cv2_window_name, cv2.WINDOW_NORMAL)
 
-        self.dataset: DataSet = DataSet(dataset_path)
+        self.dataset: DataSet = load_data_set(dataset_path, settings)
         if not self.dataset:
             print(f'Dataset in directory "{str(dataset_path.absolute())}" is empty.')
             return
+        self.annotation_writer = AnnotationWriter(self.dataset)
         self.mouse = Mouse()
         cv2.setMouseCallback(self.cv2_window_name, self.mouse.mouse_callback)
         self.scene: Optional[Scene] = None
+        self.scene_name: Optional[str] = None
         # Initial scene
         self.dataset_counter: int = -1
         self.refresh_simple_gui()
@@ -109,7 +113,7 @@ class LabelGui:
 
     def _prepare_scene_switch(self, direction: str):
         self._write_scene_tags() if self.scene else None
-        self.dataset.write_annotations(self.scene.to_dict()) if self.scene else None
+        self._write_scene() if self.scene else None
         if direction == "next":
             if self.dataset_counter < len(self.dataset) - 1:
                 self.dataset_counter += 1
@@ -123,11 +127,19 @@ class LabelGui:
         else:
             msg = f"Expected value to be in ['previous', 'next'], got '{direction}'"
             raise ValueError(msg)
-        image = self.dataset[self.dataset_counter]["image"]
-        annotations = self.dataset[self.dataset_counter]["annotations"]
-        camera_yml = self.dataset[self.dataset_counter]["camera_yml"]
-        self.scene = Scene(self.cv2_window_name, image, camera_yml, self.settings)
+        data = self.dataset[self.dataset_counter]
+        image = data["image"]
+        # Submits of the scene may not be written yet
+        annotations = self.annotation_writer.pending(data["name"])
+        if annotations is None:
+            annotations = data["annotations"]
+        camera_yml = data["camera_yml"]
+        self.scene_name = data["name"]
+        self.scene = Scene(
+            self.cv2_window_name, image, camera_yml, self.settings, data["scale"]
+        )
         self.scene.from_dict(annotations) if annotations else None
+        self.annotation_writer.mark_clean(self.scene_name, self.scene.to_dict())
         self.scene.tracks_mode = (
             True if self.values["mode.tab"] == "track.tab" else False
         )
@@ -141,6 +153,12 @@ class LabelGui:
         self._refresh_scene_counter()
         self._refresh_scene_name()
 
+    def _write_scene(self) -> None:
+        """
+        Queue annotations of the actual scene for writing if changed.
+        """
+        self.annotation_writer.submit(self.scene_name, self.scene.to_dict())
+
     def _refresh_track_drawing_attributes(self):
         self.splines_tracks()
         self.fill_tracks()
@@ -238,9 +256,7 @@ class LabelGui:
         """
         Refresh the name of the scene.
         """
-        counter = self.dataset_counter
-        scene_name: str = f"{self.dataset[counter]['name']}"
-        self.window["scene.name"].update(scene_name)
+        self.window["scene.name"].update(self.scene_name)
 
     def _refresh_scene_counter(self) -> None:
         """
@@ -339,7 +355,8 @@ class LabelGui:
                 or self.event is None
             ):
                 cv2.destroyAllWindows()
-                self.dataset.write_annotations(self.scene.to_dict())
+                self._write_scene()
+                self.annotation_writer.close()
                 break
             elif self.event == "track.new":
                 self.new_track()
@@ -8,13 +8,22 @@ import numpy as np
 
 
 class Camera:
-    def __init__(self, calib_file: Union[str, pathlib.Path]):
+    def __init__(self, calib_file: Union[str, pathlib.Path], scale: int = 1):
         """
 
         :param calib_file: Path to the camera calibration file.
+        :param scale: Factor the image is reduced by, pixel coordinates
+                      refer to the reduced image.
         """
         self.origin = np.array([0.0, 0.0, 0.0], dtype=float)
         self._read_yaml(calib_file)
+        self.scale: int = scale
+        if scale != 1:
+            # Reduced image scales focal lengths and principal point
+            self.camera_matrix = self.camera_matrix.astype(float)
+            self.camera_matrix[:2] /= scale
+            self.width /= scale
+            self.height /= scale
         self.roll = np.radians(self.roll)
         self.pitch = np.radians(self.pitch)
         self.yaw = np.radians(self.yaw)
@@ -89,7 +98,7 @@ class Camera:
         projection = self._get_projection_matrix()
         world_point1 = np.hstack((world_point, 1))
         world_point1 = np.expand_dims(world_point1, axis=0)
-        uv1 = np.dot(projection, world_point1.T)
+        uv1 = np.dot(projection, world_point1.T)[:, 0]
         uv = np.zeros(2)
         uv[0] = uv1[0] / uv1[2] if uv1[2] > 0 else float("NaN")
         uv[1] = uv1[1] / uv1[2] if uv1[2] > 0 else float("NaN")
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from typeguard import typechecked
-from typing import Union
+from typing import Optional, Union
 import numpy as np
 
 
@@ -10,13 +10,18 @@ class ImagePoint:
     Represents a point in image coordinates aka. pixel coordinates.
     """
 
-    def __init__(self, x: Union[int, float], y: Union[int, float]) -> None:
+    def __init__(
+        self, x: Union[int, float], y: Union[int, float], native: Optional[list] = None
+    ) -> None:
         """
         :param x: X coordinate
         :param y: Y coordinate
+        :param native: Coordinates in the native image if the point was
+                       loaded from a reduced image
         """
         self._point: np.ndarray
         self._point = np.rint(np.array([x, y])).astype(int)
+        self._native: Optional[list] = native
 
     def __eq__(self, other: ImagePoint) -> bool:
         if self.x == other.x and self.y == other.y:
@@ -40,6 +45,17 @@ class ImagePoint:
     def y(self) -> int:
         return self._point[1].item()
 
+    def native_point(self, scale: int = 1) -> list:
+        """
+        Coordinates in the native image. Loaded points keep their native
+        coordinates, others have the precision of the scale factor.
+        :param scale: Factor from this image to the native image
+        :return: Native x and y coordinate
+        """
+        if self._native is not None:
+            return list(self._native)
+        return [self.x * scale, self.y * scale]
+
     def midpoint(self, other: ImagePoint) -> ImagePoint:
         """
         Calculate midpoint between this point and other point.
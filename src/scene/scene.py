@@ -25,12 +25,26 @@ class Scene:
         self,
         window_name: str,
         image: np.ndarray,
-        camera_parameters: pathlib.Path,
+        camera_parameters: Union[pathlib.Path, Camera],
         settings: dict,
+        scale: int = 1,
     ) -> None:
+        """
+        :param window_name: Name of the OpenCV window
+        :param image: Image of the scene
+        :param camera_parameters: Path to the camera calibration file
+                                  or camera already opened at the scale
+        :param settings: Dict of RailLabel settings
+        :param scale: Factor the image is reduced by. Annotations are
+                      stored in native image coordinates.
+        """
         self._settings: dict = settings
         self._window_name: str = window_name
-        self._camera = Camera(camera_parameters)
+        self._scale: int = scale
+        if isinstance(camera_parameters, Camera):
+            self._camera = camera_parameters
+        else:
+            self._camera = Camera(camera_parameters, scale)
 
         # Labeling mode
         self._tracks_mode: bool = True
@@ -80,6 +94,10 @@ class Scene:
     def settings(self) -> dict:
         return self._settings
 
+    @property
+    def scale(self) -> int:
+        return self._scale
+
     @property
     def active_track(self) -> Union[Track, None]:
         return self._active_track
@@ -586,24 +604,40 @@ class Scene:
 
     def to_dict(self) -> dict:
         """
-        Conclude scene annotations to dict.
+        Conclude scene annotations to dict in native image coordinates.
+        Loaded marks keep their native coordinates, marks added on
+        reduced scenes have the precision of the scale factor.
         :return: Annotations as dict
         """
         scene = {
             "tracks": {
-                track_id: track.to_dict() for (track_id, track) in self._tracks.items()
+                track_id: track.to_dict(self._scale)
+                for (track_id, track) in self._tracks.items()
             },
             "switches": {
-                switch_id: switch.to_dict()
+                switch_id: switch.to_dict(self._scale)
                 for (switch_id, switch) in self.switches.items()
             },
             "tags": self.tags,
         }
         return scene
 
+    def _scene_points(self, points: Union[list, np.ndarray]) -> np.ndarray:
+        """
+        Reduce points by the scale of the scene in one bulk operation.
+        :param points: Native points as nested list or array of shape
+                       (n, 2)
+        :return: Points in coordinates of the reduced image, shape (n, 2)
+        """
+        native: np.ndarray = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return np.rint(native / self._scale).astype(int)
+
     def from_dict(self, annotations: dict) -> None:
         """
-        Recreate scene from dict.
+        Recreate scene from dict. Points are given in native image
+        coordinates and reduced by the scale of the scene, either as
+        nested lists or as arrays of shape (n, 2), e.g. from the
+        binary annotation format.
         :param annotations: Annotations as dict
         """
         # Track objects
@@ -612,12 +646,12 @@ class Scene:
                 track_obj = Track(int(track_id), track["relative position"])
                 track_obj.left_rail = Rail(67)
                 track_obj.right_rail = Rail(67)
-                for point in track["left rail"]["points"]:
-                    rail_points = RailPoint(point[0], point[1])
-                    track_obj.left_rail.marks.append(rail_points)
-                for point in track["right rail"]["points"]:
-                    rail_points = RailPoint(point[0], point[1])
-                    track_obj.right_rail.marks.append(rail_points)
+                for side, rail in [
+                    ("left rail", track_obj.left_rail),
+                    ("right rail", track_obj.right_rail),
+                ]:
+                    points = track[side]["points"]
+                    rail.load_marks(self._scene_points(points), points)
                 self._tracks[int(track_id)] = track_obj
             if 0 in self._tracks.keys():
                 self.activate_track(0)
@@ -628,9 +662,10 @@ class Scene:
                 direction = switch["direction"]
                 tracks = switch["tracks"]
                 switch_obj = Switch(int(switch_id), kind, direction, tracks)
-                for mark_list in switch["marks"]:
-                    mark = ImagePoint(mark_list[0], mark_list[1])
-                    switch_obj.add_mark(mark)
+                marks: np.ndarray = self._scene_points(switch["marks"])
+                natives: list = np.asarray(switch["marks"]).reshape(-1, 2).tolist()
+                for (x, y), native in zip(marks.tolist(), natives):
+                    switch_obj.add_mark(ImagePoint(x, y, native))
                 self.switches[int(switch_id)] = switch_obj
         if "tags" in annotations:
             self.tags = annotations["tags"]
@@ -67,14 +67,15 @@ class Switch:
         msg = f"{self._id:02d}, {kind}, {direction}"
         return msg
 
-    def to_dict(self) -> dict:
+    def to_dict(self, scale: int = 1) -> dict:
         """
         Dict representation of a switch
+        :param scale: Factor from the switch image to the native image
         :return: Switch information
         """
         switch: dict
         switch = {
-            "marks": [mark.point.tolist() for mark in self.marks],
+            "marks": [mark.native_point(scale) for mark in self.marks],
             "kind": self.fork,
             "direction": self.direction,
             "tracks": [],
@@ -1,13 +1,31 @@
-import itertools
+import functools
 
 import pathlib
 import argparse
 import yaml
-import concurrent.futures
-from typing import Iterable, Union
+from typing import Optional
+
+import numpy as np
 
 from data.data_set import DataSet
-from scene import Scene
+from data.loader import load_data_set
+from scene.scene import Scene
+from scene.camera.camera import Camera
+from export.pool import BACKENDS, print_report, worker_camera, worker_dataset
+from export.job_queue import JobQueue
+from export.export_manifest import (
+    ExportManifest,
+    export_scenes,
+    file_hash,
+    settings_hash,
+)
+
+# Label names in id order per label option
+LABEL_NAMES: dict[str, list[str]] = {
+    "both": ["fork_right", "merge_right", "fork_left", "merge_left"],
+    "kind": ["fork", "merge"],
+    "direction": ["right", "left"],
+}
 
 
 class Yolo:
@@ -15,11 +33,13 @@ class Yolo:
     Generation of YOLO labels for switches.
     """
 
-    def __init__(self, desired_label, data, settings):
+    def __init__(self, desired_label, data, settings, camera: Optional[Camera] = None):
         """
         :param desired_label: List of labels
         :param data: Dict representing a scene
         :param settings: Dict representing settings
+        :param camera: Camera opened once per worker, read from the
+                       scene's camera file if None
         """
         all_labels = ["direction", "kind", "both"]
         if not desired_label:
@@ -34,7 +54,13 @@ class Yolo:
         self.image = data["image"]
         self.x_resolution = self.image.shape[1]
         self.y_resolution = self.image.shape[0]
-        self.scene = Scene("", data["image"], data["camera_yml"], settings)
+        self.scene = Scene(
+            "",
+            data["image"],
+            camera or data["camera_yml"],
+            settings,
+            data.get("scale", 1),
+        )
         self.scene.from_dict(data["annotations"])
 
     @property
@@ -42,15 +68,7 @@ class Yolo:
         """
         :return: List of label-names sorted by id
         """
-        if self.desired_label == "both":
-            text = ["fork_right", "merge_right", "fork_left", "merge_left"]
-            return text
-        elif self.desired_label == "kind":
-            text = ["fork", "merge"]
-            return text
-        elif self.desired_label == "direction":
-            text = ["right", "left"]
-            return text
+        return LABEL_NAMES[self.desired_label]
 
     @property
     def labels(self) -> list[str]:
@@ -64,7 +82,7 @@ class Yolo:
             center_x = center.x / self.x_resolution
             center_y = center.y / self.y_resolution
             width = abs(switch.marks[0].x - switch.marks[1].x) / self.x_resolution
-            height = abs(switch.marks[0].y - switch.marks[1].y) / self.x_resolution
+            height = abs(switch.marks[0].y - switch.marks[1].y) / self.y_resolution
             if self.desired_label == "direction":
                 label_id = 0 if switch.direction else 1
                 label = f"{label_id} {center_x} {center_y} {width} {height}"
@@ -87,12 +105,90 @@ class Yolo:
         return yolo_labels
 
 
+def switch_boxes(annotations: dict) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Collect switches of a serialized scene without creating scene
+    objects. Switches with less than two marks are skipped.
+    :param annotations: Serialized scene in native image coordinates
+    :return: Marks of shape (n, 2, 2), forks and directions of shape (n,)
+    """
+    switches: list[dict] = [
+        switch
+        for switch in annotations.get("switches", {}).values()
+        if len(switch["marks"]) == 2
+    ]
+    marks: np.ndarray = np.array(
+        [np.asarray(switch["marks"], dtype=np.float64) for switch in switches]
+    ).reshape(-1, 2, 2)
+    forks: np.ndarray = np.array([switch["kind"] for switch in switches], dtype=bool)
+    directions: np.ndarray = np.array(
+        [switch["direction"] for switch in switches], dtype=bool
+    )
+    return marks, forks, directions
+
+
+def yolo_boxes(
+    desired_label: str,
+    annotations: dict,
+    width: int,
+    height: int,
+    roi: Optional[tuple[int, int, int, int]] = None,
+) -> np.ndarray:
+    """
+    Calculate YOLO-style relative boxes of all switches of a scene at
+    once, identical to Yolo.labels.
+    :param desired_label: Option of ["kind", "direction", "both"]
+    :param annotations: Serialized scene in native image coordinates
+    :param width: Native image width
+    :param height: Native image height
+    :param roi: x, y, width and height of a region of interest in
+                native image coordinates, boxes are clipped to it and
+                relative to it
+    :return: Label id, center x, center y, width and height per row
+    """
+    if desired_label not in LABEL_NAMES:
+        msg = f"Expected labels to be one of {list(LABEL_NAMES)}"
+        msg += f", got {desired_label}"
+        raise ValueError(msg)
+    marks, forks, directions = switch_boxes(annotations)
+    if roi is not None:
+        x, y, width, height = roi
+        marks = np.clip(marks - [x, y], 0, [width, height])
+        # Drop switches outside of the region
+        inside: np.ndarray = np.all(marks[:, 0] != marks[:, 1], axis=1)
+        marks, forks, directions = marks[inside], forks[inside], directions[inside]
+    resolution: np.ndarray = np.array([width, height], dtype=np.float64)
+    # Pixels are discrete values
+    centers: np.ndarray = np.rint(marks.mean(axis=1)) / resolution
+    sizes: np.ndarray = np.abs(marks[:, 0] - marks[:, 1]) / resolution
+    label_ids: np.ndarray
+    if desired_label == "direction":
+        label_ids = ~directions
+    elif desired_label == "kind":
+        label_ids = ~forks
+    else:
+        label_ids = ~forks + 2 * ~directions
+    return np.column_stack([label_ids.astype(np.float64), centers, sizes])
+
+
+def yolo_lines(boxes: np.ndarray) -> list[str]:
+    """
+    :param boxes: Boxes as given by yolo_boxes
+    :return: YOLO-style label line per box
+    """
+    return [
+        f"{int(label_id)} {x} {y} {width} {height}"
+        for label_id, x, y, width, height in boxes.tolist()
+    ]
+
+
 def create_label(
     desired_labels: list[str],
     output_path: pathlib.Path,
     data: dict,
     settings: dict,
     verbose: bool,
+    camera: Optional[Camera] = None,
 ) -> list[str]:
     """
     Generate YOLO labels for switches from RailLabel
@@ -102,9 +198,10 @@ def create_label(
     :param data: Dict representing scene
     :param settings: Dict of RailLabel settings
     :param verbose: Verbose output of RailLabel
+    :param camera: Camera opened once per worker
     :return: List of text labels in id order
     """
-    yolo = Yolo(desired_labels, data, settings)
+    yolo = Yolo(desired_labels, data, settings, camera)
     if data["annotations"]:
         label_data = yolo.labels
         output_path.mkdir(exist_ok=True, parents=True)
@@ -119,39 +216,171 @@ def create_label(
     return yolo.text
 
 
+def create_scene_label(
+    name: str,
+    desired_labels: str,
+    output_path: pathlib.Path,
+    settings: dict,
+    verbose: bool,
+) -> list[pathlib.Path]:
+    """
+    Load a scene and generate its YOLO labels inside an export worker.
+    :param name: Scene name
+    :param desired_labels: Option of ["kind", "direction", "both"]
+    :param output_path: Path to store labels
+    :param settings: Dict of RailLabel settings
+    :param verbose: Verbose output of RailLabel
+    :return: Paths of the written labels
+    """
+    data: dict = worker_dataset().read_scene(name)
+    create_label(desired_labels, output_path, data, settings, verbose, worker_camera())
+    if not data["annotations"]:
+        return []
+    return [output_path / (name + ".txt")]
+
+
+def create_annotation_label(
+    name: str,
+    desired_labels: str,
+    output_path: pathlib.Path,
+    verbose: bool,
+    roi: Optional[tuple[int, int, int, int]] = None,
+) -> list[pathlib.Path]:
+    """
+    Generate YOLO labels of a scene inside an export worker from its
+    annotations and image size only, without decoding the image.
+    :param name: Scene name
+    :param desired_labels: Option of ["kind", "direction", "both"]
+    :param output_path: Path to store labels
+    :param verbose: Verbose output of RailLabel
+    :param roi: x, y, width and height of a region of interest in
+                native image coordinates, boxes are relative to it
+    :return: Paths of the written labels
+    """
+    dataset: DataSet = worker_dataset()
+    annotations: Optional[dict] = dataset.read_annotations(name)
+    if annotations:
+        width, height = dataset.image_size(name)
+        boxes: np.ndarray = yolo_boxes(desired_labels, annotations, width, height, roi)
+        output_path.mkdir(exist_ok=True, parents=True)
+        label_path: pathlib.Path = output_path / (name + ".txt")
+        with open(label_path, "w") as file_pointer:
+            file_pointer.write("\n".join(yolo_lines(boxes)))
+        msg: str = f'Created "{name}" YOLO label.'
+        print(msg) if verbose else None
+        return [label_path]
+    msg: str = f'No annotations found for "{name}".'
+    print(msg) if verbose else None
+    return []
+
+
 def create_labels(
     desired_labels: str,
     output_path: pathlib.Path,
     data: DataSet,
     settings: dict,
     verbose: bool,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    annotations_only: bool = False,
+    force: bool = False,
+    backend: str = "process",
+    fail_fast: bool = False,
+    job_queue: Optional[JobQueue] = None,
+    coordinator: bool = False,
+    roi: Optional[tuple[int, int, int, int]] = None,
 ) -> None:
     """
     Concurrently generate YOLO labels for switches from RailLabel
-    dataset.
+    dataset. Workers receive scene names only and load their scenes
+    themselves.
+    With 'annotations_only' or a region of interest images are never
+    decoded, their sizes are read from the manifest or the image
+    headers instead. Relative boxes do not depend on the size of the
+    training images, so only the region changes the labels.
+    Labels which are up to date according to the export manifest in
+    the output directory are skipped, labels of scenes which are not
+    annotated anymore are deleted.
     :param desired_labels: Option of ["kind", "direction", "both"]
     :param output_path: Path to store labels
-    :param data: Dict representing scene
+    :param data: Data set to generate labels for
     :param settings: Dict of RailLabel settings
     :param verbose: Verbose output of RailLabel
+    :param workers: Number of worker processes, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param annotations_only: Skip decoding images and scene objects
+    :param force: Generate all labels even if they are up to date
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Stop at the first failed scene, otherwise report
+                      all failed scenes at the end
+    :param job_queue: Queue shared by the hosts of a distributed export
+    :param coordinator: Fill the job queue before pulling scenes
+    :param roi: x, y, width and height of a region of interest in
+                native image coordinates, boxes are clipped to it and
+                relative to it
     """
-    arguments: list[Union[Iterable, dict]] = [
-        itertools.repeat(desired_labels),
-        itertools.repeat(output_path),
+    if desired_labels not in LABEL_NAMES:
+        msg = f"Expected labels to be one of {list(LABEL_NAMES)}"
+        msg += f", got {desired_labels}"
+        raise ValueError(msg)
+    function: functools.partial
+    if annotations_only or roi is not None:
+        function = functools.partial(
+            create_annotation_label,
+            desired_labels=desired_labels,
+            output_path=output_path,
+            verbose=verbose,
+            roi=roi,
+        )
+    else:
+        function = functools.partial(
+            create_scene_label,
+            desired_labels=desired_labels,
+            output_path=output_path,
+            settings=settings,
+            verbose=verbose,
+        )
+    # Both modes produce the same labels
+    manifest: ExportManifest = ExportManifest(
+        output_path,
+        f"yolo/{desired_labels}",
+        file_hash(data.camera_yml),
+        settings_hash(
+            settings,
+            desired_labels=desired_labels,
+            **({"roi": roi} if roi is not None else {}),
+        ),
+        # Hosts of a distributed export share the manifest
+        "WAL" if job_queue is None else "DELETE",
+    )
+    if force:
+        manifest.clear()
+    stats: dict = {}
+    exported, skipped, removed = export_scenes(
+        function,
         data,
-        itertools.repeat(settings),
-        itertools.repeat(verbose),
-    ]
-
-    # Create labels for scenes concurrently
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        yolo_names = executor.map(create_label, *arguments)
-    yolo_names = next(yolo_names)
+        settings,
+        manifest,
+        workers,
+        chunksize,
+        stats=stats,
+        backend=backend,
+        fail_fast=fail_fast,
+        job_queue=job_queue,
+        coordinator=coordinator,
+    )
+    manifest.close()
+    if verbose:
+        print(f"Created {exported}, skipped {skipped} up to date", end="")
+        print(f" and removed {removed} outdated YOLO labels.")
+    if job_queue is not None and verbose:
+        print(f"Jobs of all hosts: {job_queue.counts()}")
+    print_report(stats, verbose)
 
     output_path.mkdir(exist_ok=True, parents=True)
     output_path = output_path / "labels.txt"
     with open(output_path, "w") as file_pointer:
-        file_pointer.write("\n".join(yolo_names))
+        file_pointer.write("\n".join(LABEL_NAMES[desired_labels]))
 
 
 def parse_yaml(yaml_path: pathlib.Path) -> dict:
@@ -197,6 +426,69 @@ def parse_cli() -> dict:
         type=str,
         help="Path to settings YAML-file for RailLabel.",
     )
+    parser.add_argument(
+        "-a",
+        "--annotations_only",
+        help="Read image sizes from manifest or headers instead of decoding",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        help="Generate all labels even if they are up to date",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--roi",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help="Region of interest in native image coordinates",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=16,
+        help="Number of scenes sent to a worker at once",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="process",
+        help="Run workers as processes, threads or serially for debugging",
+    )
+    parser.add_argument(
+        "--fail_fast",
+        help="Stop at the first failed scene instead of reporting all failures",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--queue_path",
+        type=str,
+        help="SQLite job queue to share the export with other hosts, e.g. on NFS",
+    )
+    parser.add_argument(
+        "--coordinator",
+        help="Fill the job queue before pulling scenes, start before other hosts",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--lease_time",
+        type=float,
+        default=600.0,
+        help="Seconds until scenes claimed by a crashed host are claimed again",
+    )
     return vars(parser.parse_args())
 
 
@@ -225,9 +517,28 @@ def main():
     output_path: pathlib.Path = pathlib.Path(settings["output_path"])
 
     verbose: bool = settings["verbose"]
-    dataset = DataSet(data_set_path)
+    dataset = load_data_set(data_set_path, settings)
 
-    create_labels("both", output_path, dataset, settings, verbose)
+    create_labels(
+        "both",
+        output_path,
+        dataset,
+        settings,
+        verbose,
+        workers=settings["workers"],
+        chunksize=settings["chunksize"],
+        annotations_only=settings["annotations_only"],
+        force=settings["force"],
+        backend=settings["backend"],
+        fail_fast=settings["fail_fast"],
+        job_queue=(
+            JobQueue(settings["queue_path"], settings["lease_time"])
+            if settings["queue_path"]
+            else None
+        ),
+        coordinator=settings["coordinator"],
+        roi=settings["roi"],
+    )
 
 
 if __name__ == "__main__":
@@ -1,9 +1,88 @@
-import pathlib
+import os
 import json
+import pathlib
+import argparse
 import itertools
+import traceback
+import collections
 import concurrent.futures
-from typing import Union, Iterable, Generator
+from typing import Iterator, Optional, Union
+
 import iteration_utilities
+from tabulate import tabulate
+
+from data.annotation_store import (
+    ANNOTATION_ENCODINGS,
+    ANNOTATION_STORES,
+    AnnotationStore,
+    SQLiteAnnotationStore,
+    open_annotation_store,
+)
+from export.export_manifest import ExportManifest, file_hash, settings_hash
+
+# Workers converting legacy files
+CONVERTER_BACKENDS: list[str] = ["process", "thread", "serial"]
+# Relative track positions of legacy annotations and their new names
+TRACK_POSITIONS: dict[str, str] = {
+    "ego track": "ego",
+    "left neighbors": "left",
+    "right neighbors": "right",
+}
+# Rail keys of legacy tracks and their new names
+RAILS: dict[str, str] = {"leftrail": "left rail", "rightrail": "right rail"}
+
+
+def legacy_scene_name(old_annotation_path: Union[pathlib.Path, str]) -> str:
+    """
+    :param old_annotation_path: Path of a legacy annotation file
+    :return: Scene name, the file name without any suffixes
+    """
+    filename: pathlib.Path = pathlib.Path(old_annotation_path)
+    while filename.suffix:
+        filename = filename.with_suffix("")
+    return filename.stem
+
+
+def convert_legacy_labels(old_labels: dict) -> dict:
+    """
+    Convert and validate legacy annotations, lists of tracks per
+    relative position with flat coordinate lists per rail.
+    :param old_labels: Legacy annotations as read from JSON
+    :return: Serialized scene
+    """
+    if not isinstance(old_labels, dict):
+        msg = f"Expected legacy annotations to be a dict, got {type(old_labels)}"
+        raise ValueError(msg)
+    track_counter: int = 0
+    new_tracks: dict = {}
+    for track_position, tracks in old_labels.items():
+        if track_position not in TRACK_POSITIONS:
+            msg = f"Expected track position to be in {list(TRACK_POSITIONS)}, "
+            msg += f"got '{track_position}'"
+            raise ValueError(msg)
+        for track in tracks:
+            new_track: dict = {
+                "relative position": TRACK_POSITIONS[track_position],
+                "left rail": {"points": []},
+                "right rail": {"points": []},
+            }
+            rail_position: str
+            points: list[int]
+            for rail_position, points in track.items():
+                if rail_position not in RAILS:
+                    msg = f"Expected rail to be in {list(RAILS)}, "
+                    msg += f"got '{rail_position}'"
+                    raise ValueError(msg)
+                if len(points) % 2:
+                    msg = f"Expected pairs of coordinates for {rail_position} of "
+                    msg += f"track {track_counter}, got {len(points)} values"
+                    raise ValueError(msg)
+                point: tuple[int, int]
+                for point in iteration_utilities.grouper(points, 2):
+                    new_track[RAILS[rail_position]]["points"].append(list(point))
+            new_tracks[str(track_counter)] = new_track
+            track_counter += 1
+    return {"tracks": new_tracks}
 
 
 class LegacyConverter:
@@ -37,41 +116,13 @@ class LegacyConverter:
         """
         Read json file of old labels.
         """
-        track_position_converter: dict = {
-            "ego track": "ego",
-            "left neighbors": "left",
-            "right neighbors": "right",
-        }
         with open(self._old_label_path) as file_pointer:
             self._old_labels = json.load(file_pointer)
-        track_counter: int = 0
-        new_tracks: dict = {}
-        for track_position, tracks in self._old_labels.items():
-            for track in tracks:
-                left_rail: dict = {"points": []}
-                right_rail: dict = {"points": []}
-                rail_position: str
-                points: list[int]
-                for rail_position, points in track.items():
-                    point: tuple[int, int]
-                    for point in iteration_utilities.grouper(points, 2):
-                        if rail_position == "leftrail":
-                            left_rail["points"].append(point)
-                        elif rail_position == "rightrail":
-                            right_rail["points"].append(point)
-                new_tracks[track_counter] = {
-                    "relative position": track_position_converter[track_position],
-                    "left rail": {**left_rail},
-                    "right rail": {**right_rail},
-                }
-                track_counter += 1
-        self._new_track_labels["tracks"] = new_tracks
+        self._new_track_labels = convert_legacy_labels(self._old_labels)
 
     def _write_new_labels(self):
-        filename: pathlib.Path = self._old_label_path
-        while filename.suffix:
-            filename = filename.with_suffix("")
-        save_path: pathlib.Path = self._output_path / (filename.stem + ".json")
+        name: str = legacy_scene_name(self._old_label_path)
+        save_path: pathlib.Path = self._output_path / (name + ".json")
         with open(save_path, "w") as file_pointer:
             json.dump(self._new_track_labels, file_pointer, indent=4, sort_keys=True)
 
@@ -88,28 +139,284 @@ def convert_annotation(
     legacy_convert(old_annotation_path)
 
 
+def _convert_file(
+    old_annotation_path: pathlib.Path,
+    manifest: Optional[ExportManifest],
+) -> tuple[str, str, str, Union[dict, str]]:
+    """
+    Convert a legacy file inside a worker unless the manifest records
+    the same file content as converted.
+    :param old_annotation_path: Path of a legacy annotation file
+    :param manifest: Record of converted files, None to convert anyway
+    :return: Scene name, status of ['converted', 'skipped', 'failed'],
+             hash of the file and serialized scene or reason
+    """
+    name: str = legacy_scene_name(old_annotation_path)
+    content_hash: str = ""
+    try:
+        content_hash = file_hash(old_annotation_path)
+        if manifest is not None and manifest.is_current(name, content_hash):
+            return name, "skipped", content_hash, "Already converted"
+        with open(old_annotation_path) as file_pointer:
+            annotations: dict = convert_legacy_labels(json.load(file_pointer))
+    except Exception:
+        reason: str = traceback.format_exc().strip().splitlines()[-1]
+        return name, "failed", content_hash, reason
+    return name, "converted", content_hash, annotations
+
+
+def _convert_chunk(
+    chunk: list[tuple[pathlib.Path, Optional[ExportManifest]]],
+) -> list[tuple[str, str, str, Union[dict, str]]]:
+    return [_convert_file(path, manifest) for path, manifest in chunk]
+
+
+def _map_chunks(
+    chunks: Iterator[list],
+    workers: Optional[int] = None,
+    backend: str = "process",
+) -> Iterator[list]:
+    """
+    Convert chunks in workers with at most two chunks per worker
+    queued at any time.
+    :param chunks: Chunks of _convert_chunk, consumed lazily
+    :param workers: Number of workers, all cores if None
+    :param backend: Workers of CONVERTER_BACKENDS
+    :return: Results per chunk in order
+    """
+    if backend == "serial":
+        yield from map(_convert_chunk, chunks)
+        return
+    workers = workers or os.cpu_count() or 1
+    executor: concurrent.futures.Executor
+    if backend == "process":
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    pending: collections.deque = collections.deque()
+    with executor:
+        for chunk in chunks:
+            pending.append(executor.submit(_convert_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def convert_annotations(
     old_annotations_path: Union[pathlib.Path, str],
-    new_annotations_path: Union[pathlib.Path, str],
-):
-    old_annotations_path: pathlib.Path
+    dataset_path: Union[pathlib.Path, str],
+    annotation_store: str = "json",
+    annotation_encoding: str = "json",
+    workers: Optional[int] = None,
+    chunksize: int = 64,
+    backend: str = "process",
+    force: bool = False,
+) -> list[dict]:
+    """
+    Convert all legacy JSON files of a directory into the annotation
+    store of a data set. Files are streamed in chunks through the
+    workers, which read and convert them, while the new annotations
+    are written in this process. The hash of every converted file is
+    recorded in the export manifest of the data set, so files which
+    did not change since their scene was written are skipped.
+    Unlike convert_annotation, the second argument is the data set
+    root instead of the directory of the new annotation files, which
+    the JSON store writes to 'annotations' inside the data set.
+    :param old_annotations_path: Directory of legacy annotation files
+    :param dataset_path: Root directory of the data set to write the
+                         annotations to, not its annotation directory
+    :param annotation_store: Store layout, one of ANNOTATION_STORES
+    :param annotation_encoding: Encoding, one of ANNOTATION_ENCODINGS
+    :param workers: Number of workers, all cores if None
+    :param chunksize: Number of files sent to a worker at once
+    :param backend: Workers of CONVERTER_BACKENDS
+    :param force: Convert all files, even if converted before
+    :return: File, scene name, status of ['converted', 'skipped',
+             'failed'] and reason per legacy file
+    """
+    if backend not in CONVERTER_BACKENDS:
+        msg = f"Expected backend to be in {CONVERTER_BACKENDS}, got {backend}"
+        raise ValueError(msg)
     old_annotations_path = pathlib.Path(old_annotations_path)
-    new_annotations_path: pathlib.Path
-    new_annotations_path = pathlib.Path(new_annotations_path)
+    dataset_path = pathlib.Path(dataset_path)
+    if dataset_path.name == "annotations":
+        msg = "Expected the data set root, which contains the annotations, "
+        msg += f"got {dataset_path}"
+        raise ValueError(msg)
+    store: AnnotationStore = open_annotation_store(
+        dataset_path, annotation_store, annotation_encoding
+    )
+    # Scenes converted into another layout or encoding are converted again
+    manifest: ExportManifest = ExportManifest(
+        dataset_path,
+        "legacy",
+        "",
+        settings_hash(
+            {},
+            annotation_store=annotation_store,
+            annotation_encoding=annotation_encoding,
+        ),
+    )
+    report: list[dict] = []
+    paths: dict[str, pathlib.Path] = {}
+
+    def collect_paths() -> Iterator[tuple[pathlib.Path, Optional[ExportManifest]]]:
+        for path in sorted(old_annotations_path.glob("*.json")):
+            name: str = legacy_scene_name(path)
+            if name in paths:
+                reason: str = f'Same scene name as "{paths[name].name}"'
+                report.append(_report_row(path, name, "failed", reason))
+                continue
+            paths[name] = path
+            # Scenes missing in the store are converted again
+            current: bool = not force and name in store
+            yield path, manifest if current else None
+
+    items: Iterator = collect_paths()
+    chunks: Iterator[list] = iter(lambda: list(itertools.islice(items, chunksize)), [])
+    try:
+        for results in _map_chunks(chunks, workers, backend):
+            converted: list[tuple[str, str, dict]] = []
+            for name, status, content_hash, result in results:
+                if status == "converted":
+                    converted.append((name, content_hash, result))
+                else:
+                    report.append(_report_row(paths[name], name, status, result))
+            try:
+                _write_scenes(store, converted)
+            except Exception:
+                reason = traceback.format_exc().strip().splitlines()[-1]
+                for name, _, _ in converted:
+                    report.append(_report_row(paths[name], name, "failed", reason))
+                continue
+            for name, content_hash, _ in converted:
+                manifest.record(name, content_hash, [])
+                report.append(_report_row(paths[name], name, "converted", ""))
+            manifest.commit()
+    finally:
+        manifest.close()
+        store.close()
+    return sorted(report, key=lambda row: row["file"])
 
-    old_annotation_paths: Generator[pathlib.Path]
-    old_annotation_paths = old_annotations_path.glob("*.yaml")
-    arguments: list[Iterable]
-    arguments = [old_annotation_paths, itertools.repeat(new_annotations_path)]
 
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        executor.map(convert_annotation, *arguments)
+def _write_scenes(store: AnnotationStore, scenes: list[tuple[str, str, dict]]) -> None:
+    """
+    :param store: Annotation store to write to
+    :param scenes: Name, file hash and serialized scene per scene
+    """
+    if isinstance(store, SQLiteAnnotationStore):
+        store.write_many((name, annotations) for name, _, annotations in scenes)
+    else:
+        for name, _, annotations in scenes:
+            store.write(name, annotations)
+
+
+def _report_row(path: pathlib.Path, name: str, status: str, reason: str) -> dict:
+    return {"file": path.name, "scene": name, "status": status, "reason": reason}
+
+
+def print_conversion_report(report: list[dict], verbose: bool = False) -> None:
+    """
+    Print the number of files per status and all failed files with
+    their reasons.
+    :param report: Rows of convert_annotations
+    :param verbose: Print converted and skipped files too
+    """
+    counts: collections.Counter
+    counts = collections.Counter(row["status"] for row in report)
+    print(
+        f"Converted {counts['converted']}, skipped {counts['skipped']} "
+        f"and failed {counts['failed']} of {len(report)} files."
+    )
+    rows: list[dict] = [row for row in report if verbose or row["status"] == "failed"]
+    if rows:
+        print(tabulate(rows, headers="keys"))
+
+
+def parse_cli() -> dict:
+    """
+    Parse CLI arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-i",
+        "--input_path",
+        type=str,
+        help="Path to the directory containing legacy JSON annotations",
+        required=True,
+    )
+    parser.add_argument(
+        "-d",
+        "--dataset_path",
+        type=str,
+        help="Root of the dataset to write the converted annotations to, "
+        "not its annotations directory",
+        required=True,
+    )
+    parser.add_argument(
+        "--annotation_store",
+        type=str,
+        help="Per-scene files or a single SQLite file",
+        choices=ANNOTATION_STORES,
+        default="json",
+    )
+    parser.add_argument(
+        "--annotation_encoding",
+        type=str,
+        help="Encoding of the converted annotations",
+        choices=ANNOTATION_ENCODINGS,
+        default="json",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=64,
+        help="Number of files sent to a worker at once",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=CONVERTER_BACKENDS,
+        default="process",
+        help="Run workers as processes, threads or serially for debugging",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        help="Convert files again, even if unchanged since their last conversion",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        help="Report converted and skipped files too",
+        action="store_true",
+        required=False,
+    )
+    return vars(parser.parse_args())
 
 
 def main():
-    old_label_path: str = ""
-    new_label_path: str = ""
-    convert_annotations(old_label_path, new_label_path)
+    cli_args = parse_cli()
+    report: list[dict] = convert_annotations(
+        cli_args["input_path"],
+        cli_args["dataset_path"],
+        cli_args["annotation_store"],
+        cli_args["annotation_encoding"],
+        cli_args["workers"],
+        cli_args["chunksize"],
+        cli_args["backend"],
+        cli_args["force"],
+    )
+    print_conversion_report(report, cli_args["verbose"])
 
 
 if __name__ == "__main__":
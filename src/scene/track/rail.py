@@ -1,3 +1,5 @@
+from typing import Optional, Union
+
 import splines
 import numpy as np
 from scene.camera.camera import Camera
@@ -14,7 +16,10 @@ class Rail:
         :param width: Rail width in mm
         """
         self._width: float = width
-        self._marks: list[RailPoint] = []
+        self._marks: Optional[list[RailPoint]] = []
+        # Marks loaded in bulk, converted to rail points on first access
+        self._mark_array: Optional[np.ndarray] = None
+        self._native: Optional[Union[list, np.ndarray]] = None
 
     @property
     def width(self) -> float:
@@ -22,8 +27,67 @@ class Rail:
 
     @property
     def marks(self) -> list[RailPoint]:
+        if self._marks is None:
+            natives: list = (
+                [None] * len(self._mark_array)
+                if self._native is None
+                else self._native_list()
+            )
+            self._marks = [
+                RailPoint(x, y, native)
+                for (x, y), native in zip(self._mark_array.tolist(), natives)
+            ]
+            self._mark_array = None
+            self._native = None
         return self._marks
 
+    @property
+    def mark_array(self) -> np.ndarray:
+        """
+        :return: Image coordinates of all marks, shape (n, 2)
+        """
+        if self._marks is None:
+            return self._mark_array
+        mark: RailPoint
+        return np.array([mark.point for mark in self._marks], dtype=int).reshape(-1, 2)
+
+    def load_marks(
+        self, points: np.ndarray, native: Optional[Union[list, np.ndarray]] = None
+    ) -> None:
+        """
+        Replace marks by image coordinates without creating a rail
+        point per mark. Order of the points is kept.
+        :param points: Integer image coordinates of shape (n, 2)
+        :param native: Coordinates of the same marks in the native image
+                       if loaded from a reduced image
+        """
+        self._mark_array = np.asarray(points, dtype=int).reshape(-1, 2)
+        self._native = native
+        self._marks = None
+
+    def _native_list(self) -> list[list]:
+        """
+        :return: Native coordinates of bulk loaded marks
+        """
+        if isinstance(self._native, np.ndarray):
+            return self._native.reshape(-1, 2).tolist()
+        return [list(point) for point in self._native]
+
+    def native_points(self, scale: int = 1) -> list[list]:
+        """
+        Coordinates of all marks in the native image. Loaded marks keep
+        their native coordinates, added marks have the precision of the
+        scale factor.
+        :param scale: Factor from the rail image to the native image
+        :return: Native x and y coordinates of all marks
+        """
+        if self._marks is None:
+            if self._native is not None:
+                return self._native_list()
+            return (self._mark_array * scale).tolist()
+        mark: RailPoint
+        return [mark.native_point(scale) for mark in self._marks]
+
     @marks.setter
     def marks(self, marks: RailPoint) -> None:
         self._marks = marks
@@ -36,10 +100,8 @@ class Rail:
         :return: Interpolated rail points
         """
         # Calculate splines if at leas two points are available.
-        if len(self._marks) > 1:
-            mark: RailPoint
-            mark_points_arr: np.ndarray
-            mark_points_arr = np.vstack([mark.point for mark in self._marks])
+        mark_points_arr: np.ndarray = self.mark_array
+        if len(mark_points_arr) > 1:
             sp: splines.CatmullRom
             sp = splines.CatmullRom(mark_points_arr, endconditions="natural")
             total_duration: int = sp.grid[-1] - sp.grid[0]
@@ -133,7 +195,7 @@ class Rail:
         :param mark: Mark to add.
         :return:
         """
-        self._marks.append(mark)
+        self.marks.append(mark)
         self._marks = sorted(self._marks)
 
     def del_mark(self, mark: RailPoint) -> None:
@@ -143,14 +205,17 @@ class Rail:
         :return:
         """
         # Can only delete point if there is at least one
-        if len(self._marks) >= 1:
-            mark_points_arr: np.ndarray
-            mark_points_arr = np.vstack([mark.point for mark in self._marks])
+        if len(self.marks) >= 1:
+            mark_points_arr: np.ndarray = self.mark_array
             # Calculate euclidean distance for all points
             distances: np.ndarray = np.linalg.norm(mark_points_arr - mark.point, axis=1)
             lowest_dist_index: int = np.argmin(distances).item()
             self._marks.pop(lowest_dist_index)
 
-    def to_dict(self) -> dict:
-        rail: dict = {"points": [mark.point.tolist() for mark in self._marks]}
+    def to_dict(self, scale: int = 1) -> dict:
+        """
+        :param scale: Factor from the rail image to the native image
+        :return: Rail with marks in native image coordinates
+        """
+        rail: dict = {"points": self.native_points(scale)}
         return rail
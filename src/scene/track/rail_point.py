@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Union
+from typing import Optional, Union
 from scene.point import ImagePoint
 
 
@@ -8,8 +8,10 @@ class RailPoint(ImagePoint):
     Represent point on rail.
     """
 
-    def __init__(self, x: Union[int, float], y: Union[int, float]):
-        super().__init__(x, y)
+    def __init__(
+        self, x: Union[int, float], y: Union[int, float], native: Optional[list] = None
+    ):
+        super().__init__(x, y, native)
 
     def __lt__(self, other: RailPoint) -> bool:
         """
@@ -1,149 +1,497 @@
+import functools
 import itertools
 
 import cv2
 import yaml
 import pathlib
 import argparse
-import concurrent.futures
-from typing import Iterable, Union
+from typing import Optional, Union
 
 import numpy as np
 
 from data.data_set import DataSet
-from scene import Scene
+from data.loader import load_data_set
+from scene.scene import Scene
+from scene.camera.camera import Camera
 from scene.track.track import RailPoint
+from export.encoders import (
+    ENCODERS,
+    Encoder,
+    benchmark_encoders,
+    parse_encoder,
+    print_benchmark,
+)
+from export.pool import BACKENDS, print_report, worker_camera, worker_dataset
+from export.job_queue import JobQueue
+from export.export_manifest import (
+    ExportManifest,
+    export_scenes,
+    file_hash,
+    settings_hash,
+)
+
+# Colors of track classes per color type
+TRACK_COLORS: dict[str, dict[str, tuple[int, ...]]] = {
+    "human": {
+        "left_bed": (58, 58, 197),
+        "left_rails": (0, 0, 255),
+        "ego_bed": (58, 197, 197),
+        "ego_rails": (0, 255, 255),
+        "right_bed": (58, 197, 58),
+        "right_rails": (0, 255, 0),
+    },
+    "segmentation": {
+        "left_bed": (48,),
+        "left_rails": (49,),
+        "ego_bed": (50,),
+        "ego_rails": (51,),
+        "right_bed": (52,),
+        "right_rails": (53,),
+    },
+}
+# Encoders of labels per color type unless configured
+DEFAULT_ENCODERS: dict[str, str] = {
+    "segmentation": "png",
+    "human": "jpg",
+    "overlay": "jpg",
+}
+
+
+def segmentation_palette() -> dict[int, tuple[int, int, int]]:
+    """
+    :return: RGB color of human labels per class id of segmentation
+             masks, for palette PNGs
+    """
+    return {
+        TRACK_COLORS["segmentation"][class_name][0]: color[::-1]
+        for class_name, color in TRACK_COLORS["human"].items()
+    }
+
+
+def label_encoder(color_type: str, encoder: Optional[str] = None) -> Encoder:
+    """
+    :param color_type: Type of label ['segmentation', 'human', 'overlay']
+    :param encoder: Encoder like 'png:9', see export.encoders.ENCODERS,
+                    the default of the color type if None
+    :return: Encoder of labels of the color type
+    """
+    encoder = encoder or DEFAULT_ENCODERS[color_type]
+    if encoder.startswith("palette") and color_type != "segmentation":
+        msg = f"Expected palette encoder for segmentation masks only, got {color_type}"
+        raise ValueError(msg)
+    return parse_encoder(encoder, segmentation_palette())
+
+
+def view_image(
+    image: np.ndarray,
+    scale: int,
+    roi: tuple[int, int, int, int],
+    size: tuple[int, int],
+) -> np.ndarray:
+    """
+    Crop an image to a region of interest and resize it to a size.
+    :param image: Image reduced by scale
+    :param scale: Factor the image is reduced by
+    :param roi: x, y, width and height in native image coordinates
+    :param size: Target width and height
+    :return: Cropped and resized image
+    """
+    x, y, width, height = (round(value / scale) for value in roi)
+    image = image[y : y + height, x : x + width]
+    if (image.shape[1], image.shape[0]) != tuple(size):
+        image = cv2.resize(image, tuple(size), interpolation=cv2.INTER_AREA)
+    return image
 
 
 class SegmentationLabel:
     """
     Generation of segmentation labels.
+
+    Contour polygons of all tracks are calculated once and shared by
+    all label types rasterized from the same scene. Labels may be
+    restricted to a region of interest and rasterized directly at a
+    target size by transforming the polygons instead of the pixels.
     """
 
-    def __init__(self, data, settings):
-        self.image = data["image"]
-        self._label = np.zeros(data["image"].shape)
-        self.scene = Scene("", data["image"], data["camera_yml"], settings)
+    def __init__(
+        self,
+        data,
+        settings,
+        camera: Optional[Camera] = None,
+        roi: Optional[tuple[int, int, int, int]] = None,
+        size: Optional[tuple[int, int]] = None,
+    ):
+        """
+        :param data: Dict representing a scene
+        :param settings: Dict of RailLabel settings
+        :param camera: Camera opened once per worker, read from the
+                       scene's camera file if None
+        :param roi: x, y, width and height of the labeled region in
+                    native image coordinates, the whole image if None
+        :param size: Width and height of the labels, the size of the
+                     region in the decoded image if None
+        """
+        self._source_image: np.ndarray = data["image"]
+        self._scale: int = data.get("scale", 1)
+        height, width = data["image"].shape[:2]
+        self._roi: tuple[int, int, int, int] = (
+            tuple(roi) if roi else (0, 0, width * self._scale, height * self._scale)
+        )
+        self._size: tuple[int, int] = (
+            tuple(size)
+            if size
+            else (round(self._roi[2] / self._scale), round(self._roi[3] / self._scale))
+        )
+        self._image: Optional[np.ndarray] = None
+        self._label: Optional[np.ndarray] = None
+        self.scene = Scene(
+            "",
+            data["image"],
+            camera or data["camera_yml"],
+            settings,
+            self._scale,
+        )
         self.scene.from_dict(data["annotations"])
+        self._scene_polygons: Optional[list[tuple[str, np.ndarray]]] = None
+        self._polygons: Optional[list[tuple[str, np.ndarray]]] = None
 
-    def label(self, color_type="segmentation"):
+    @property
+    def size(self) -> tuple[int, int]:
         """
+        :return: Width and height of the labels
+        """
+        return self._size
 
-        :param color_type:
-        :return:
+    @property
+    def _identity(self) -> bool:
+        """
+        :return: True if labels cover the decoded image at its size
         """
-        choice = ["segmentation", "human", "overlay"]
-        if color_type not in choice:
-            msg = f"Expected type property to be in {choice}, got"
-            msg += f" {color_type}"
+        height, width = self._source_image.shape[:2]
+        native: tuple = (0, 0, width * self._scale, height * self._scale)
+        return self._roi == native and self._size == (width, height)
 
-        if color_type in ["human", "overlay"]:
-            self._label = np.zeros(self._label[:, :, :].shape, dtype=np.uint8)
-            track_to_color = {
-                "left_bed": (58, 58, 197),
-                "left_rails": (0, 0, 255),
-                "ego_bed": (58, 197, 197),
-                "ego_rails": (0, 255, 255),
-                "right_bed": (58, 197, 58),
-                "right_rails": (0, 255, 0),
-            }
-        elif color_type == "segmentation":
-            self._label = np.zeros(self._label[:, :, 0].shape, dtype=np.uint8)
-            track_to_color = {
-                "left_bed": (48,),
-                "left_rails": (49,),
-                "ego_bed": (50,),
-                "ego_rails": (51,),
-                "right_bed": (52,),
-                "right_rails": (53,),
-            }
+    @property
+    def image(self) -> np.ndarray:
+        """
+        :return: Image cropped and resized like the labels
+        """
+        if self._image is None:
+            self._image = self._source_image
+            if not self._identity:
+                self._image = view_image(
+                    self._source_image, self._scale, self._roi, self._size
+                )
+        return self._image
+
+    @property
+    def polygons(self) -> list[tuple[str, np.ndarray]]:
+        """
+        Contour polygons of rails and track beds in drawing order, in
+        coordinates of the labels.
+        :return: Class name, e.g. 'ego_rails', and polygon of shape
+                 (n, 2) per instance, int32 if not transformed
+        """
+        if self._polygons is not None:
+            return self._polygons
+        self._polygons = self._scene_geometry()
+        if not self._identity:
+            # Scene coordinates to label coordinates, cropped like
+            # view_image and resized with aligned pixel centers like
+            # INTER_AREA
+            region: np.ndarray = np.rint(np.array(self._roi) / self._scale)
+            factor: np.ndarray = np.array(self._size) / region[2:]
+            self._polygons = [
+                (class_name, (polygon - region[:2] + 0.5) * factor - 0.5)
+                for class_name, polygon in self._polygons
+            ]
+        return self._polygons
 
+    def _scene_geometry(self) -> list[tuple[str, np.ndarray]]:
+        """
+        :return: Class name and int32 polygon per instance in
+                 coordinates of the decoded image
+        """
+        if self._scene_polygons is not None:
+            return self._scene_polygons
+        polygons: list[tuple[str, np.ndarray]] = []
         for track in self.scene.tracks.values():
             point: RailPoint
             points: list[np.ndarray]
-            points_arr: np.ndarray
+            position: str = track.relative_position
             # Rails
             for rail in [track.left_rail, track.right_rail]:
                 points = []
                 for point in rail.contour_points(self.scene.camera, 15):
                     points.append(point.point)
-                points_arr = np.array(points).astype(np.int32)
                 if len(points) > 1:
-                    if track.relative_position == "ego":
-                        cv2.fillConvexPoly(
-                            self._label,
-                            points_arr,
-                            track_to_color["ego_rails"],
-                        )
-                    elif track.relative_position == "left":
-                        cv2.fillConvexPoly(
-                            self._label,
-                            points_arr,
-                            track_to_color["left_rails"],
-                        )
-                    elif track.relative_position == "right":
-                        cv2.fillConvexPoly(
-                            self._label,
-                            points_arr,
-                            track_to_color["right_rails"],
-                        )
+                    polygons.append(
+                        (f"{position}_rails", np.array(points).astype(np.int32))
+                    )
             if len(points) > 1:
                 # Trackbed
                 points = []
                 for point in track.track_bed_spline_points(self.scene.camera, 15):
                     points.append(point.point)
-                points_arr = np.array(points).astype(np.int32)
-                if track.relative_position == "ego":
-                    cv2.fillConvexPoly(
-                        self._label,
-                        points_arr,
-                        track_to_color["ego_bed"],
-                    )
-                elif track.relative_position == "left":
-                    cv2.fillConvexPoly(
-                        self._label,
-                        points_arr,
-                        track_to_color["left_bed"],
-                    )
-                elif track.relative_position == "right":
-                    cv2.fillConvexPoly(
-                        self._label,
-                        points_arr,
-                        track_to_color["right_bed"],
-                    )
-        if color_type == "overlay":
-            alpha = 0.5
-            cv2.addWeighted(self.image, alpha, self._label, 1 - alpha, 0, self._label)
+                polygons.append((f"{position}_bed", np.array(points).astype(np.int32)))
+        self._scene_polygons = polygons
+        return polygons
+
+    def label(
+        self,
+        color_type="segmentation",
+        tile_height: Optional[int] = None,
+        out: Optional[np.ndarray] = None,
+    ):
+        """
+        Rasterize the label into an uint8 array of the label size.
+        :param color_type: Type of label
+                           ['segmentation', 'human', 'overlay']
+        :param tile_height: Rows per band, the whole frame if None
+        :param out: uint8 array to rasterize into, allocated if None
+        :return: Label
+        """
+        shape: tuple[int, ...] = (self._size[1], self._size[0])
+        if color_type in ["human", "overlay"]:
+            shape += self._source_image.shape[2:]
+        image: Optional[np.ndarray] = self.image if color_type == "overlay" else None
+        self._label = rasterize(
+            self.polygons, shape, color_type, image, tile_height, out
+        )
         return self._label
 
 
+def rasterize(
+    polygons: list[tuple[str, np.ndarray]],
+    shape: tuple[int, ...],
+    color_type: str = "segmentation",
+    image: Optional[np.ndarray] = None,
+    tile_height: Optional[int] = None,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Rasterize track polygons into an uint8 label.
+    Tiled rasterization fills horizontal bands one after another,
+    so only one band of a memory mapped output is touched at once.
+    Tiled labels equal untiled ones for every tile height.
+    :param polygons: Class name and polygon per instance, as given by
+                     SegmentationLabel.polygons
+    :param shape: Shape of the label
+    :param color_type: Type of label ['segmentation', 'human', 'overlay']
+    :param image: Image of the label size to overlay
+    :param tile_height: Rows per band, the whole frame if None
+    :param out: uint8 array to rasterize into, allocated if None
+    :return: Label
+    """
+    choice = ["segmentation", "human", "overlay"]
+    if color_type not in choice:
+        msg = f"Expected type property to be in {choice}, got"
+        msg += f" {color_type}"
+        raise ValueError(msg)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != tuple(shape) or out.dtype != np.uint8:
+        msg = f"Expected output of shape {shape} and type uint8, got"
+        msg += f" {out.shape} and {out.dtype}"
+        raise ValueError(msg)
+
+    track_to_color: dict[str, tuple[int, ...]]
+    if color_type in ["human", "overlay"]:
+        track_to_color = TRACK_COLORS["human"]
+    else:
+        track_to_color = TRACK_COLORS["segmentation"]
+    instances: list[tuple[tuple[int, ...], np.ndarray, int]] = [
+        (track_to_color[class_name], *_fixed_point(polygon))
+        for class_name, polygon in polygons
+        # Tracks of other relative positions are not labeled
+        if class_name in track_to_color and len(polygon)
+    ]
+    tile_height = tile_height or shape[0]
+    if tile_height >= shape[0]:
+        out.fill(0)
+        for color, points, shift in instances:
+            cv2.fillConvexPoly(out, points, color, shift=shift)
+        _overlay(out, 0, color_type, image)
+        return out
+    masks: dict[int, tuple[int, int, np.ndarray]] = {}
+    for row in range(0, shape[0], tile_height):
+        _rasterize_band(out[row : row + tile_height], row, instances, masks, shape)
+        _overlay(out[row : row + tile_height], row, color_type, image)
+    return out
+
+
+def _fixed_point(polygon: np.ndarray) -> tuple[np.ndarray, int]:
+    """
+    Integer polygons of untransformed scenes are rasterized as they are,
+    transformed polygons as fixed-point coordinates with 4 fractional
+    bits to keep their precision.
+    :param polygon: Polygon of shape (n, 2)
+    :return: int32 polygon and its number of fractional bits
+    """
+    if np.issubdtype(polygon.dtype, np.integer):
+        return polygon.astype(np.int32), 0
+    return np.rint(polygon * 16).astype(np.int32), 4
+
+
+def _polygon_mask(
+    points: np.ndarray, shift: int, shape: tuple[int, ...]
+) -> tuple[int, int, np.ndarray]:
+    """
+    Rasterize one polygon into a mask of its bounding box inside the
+    label. OpenCV clips outlines at the border of the array it draws
+    into, which changes their pixels. The mask borders are the label
+    borders or lie outside the polygon, so the mask equals the polygon
+    drawn into the whole label.
+    :param points: Fixed-point polygon
+    :param shift: Number of fractional bits of the polygon
+    :param shape: Shape of the label
+    :return: First row, first column and mask of the polygon
+    """
+    # One pixel of margin covers the rounding of fixed-point coordinates
+    lower: np.ndarray = np.maximum((points.min(axis=0) >> shift) - 1, 0)
+    upper: np.ndarray = np.minimum((points.max(axis=0) >> shift) + 2, shape[1::-1])
+    top: int = lower[1].item()
+    left: int = lower[0].item()
+    mask: np.ndarray = np.zeros(np.maximum(upper - lower, 0)[::-1], dtype=np.uint8)
+    offset: np.ndarray = (lower << shift).astype(np.int32)
+    cv2.fillConvexPoly(mask, points - offset, 1, shift=shift)
+    return top, left, mask
+
+
+def _rasterize_band(
+    band: np.ndarray,
+    row: int,
+    instances: list[tuple[tuple[int, ...], np.ndarray, int]],
+    masks: dict[int, tuple[int, int, np.ndarray]],
+    shape: tuple[int, ...],
+) -> None:
+    """
+    Rasterize a horizontal band of a label. Polygons are drawn into
+    masks shared by all bands instead of the band itself, so their
+    outlines are not clipped at the band borders.
+    :param band: Rows of the label starting at row
+    :param row: First row of the band
+    :param instances: Color, fixed-point polygon and its number of
+                      fractional bits per instance
+    :param masks: First row, first column and mask per instance drawn
+                  in earlier bands, updated in place
+    :param shape: Shape of the label
+    """
+    band.fill(0)
+    end: int = row + len(band)
+    for index, (color, points, shift) in enumerate(instances):
+        if index not in masks:
+            # Polygons starting below the band are drawn in a later band
+            if (points[:, 1].min() >> shift) - 1 >= end:
+                continue
+            masks[index] = _polygon_mask(points, shift, shape)
+        top, left, mask = masks[index]
+        first: int = max(row, top)
+        last: int = min(end, top + len(mask))
+        if first < last:
+            region: np.ndarray = band[first - row : last - row, left:]
+            region = region[:, : mask.shape[1]]
+            region[mask[first - top : last - top] > 0] = color
+        if top + len(mask) <= end:
+            # Free the mask once the polygon is complete
+            masks[index] = (top, left, mask[:0])
+
+
+def _overlay(
+    band: np.ndarray, row: int, color_type: str, image: Optional[np.ndarray]
+) -> None:
+    """
+    Blend a rasterized band of an overlay label with its image.
+    :param band: Rows of the label starting at row
+    :param row: First row of the band
+    :param color_type: Type of label
+    :param image: Image of the label size to overlay
+    """
+    if color_type == "overlay":
+        alpha = 0.5
+        image = image[row : row + len(band)]
+        cv2.addWeighted(image, alpha, band, 1 - alpha, 0, band)
+
+
 def create_label(
     data: dict,
     output_path: pathlib.Path,
     settings: dict,
     color_type: str = "segmentation",
     verbose=False,
-) -> None:
+    camera: Optional[Camera] = None,
+    encoder: Optional[Encoder] = None,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> list[pathlib.Path]:
     """
     :param data:
     :param output_path:
     :param settings: Dict of RailLabel settings
     :param color_type:
     :param verbose: Verbose std out
-    :return:
+    :param camera: Camera opened once per worker
+    :param encoder: Encoder of the label, PNG for segmentation masks
+                    and JPEG otherwise if None
+    :param roi: x, y, width and height of the labeled region in
+                native image coordinates, the whole image if None
+    :param size: Width and height of the labels, the size of the
+                 region in the decoded image if None
+    :return: Paths of the written labels
     """
     if data["annotations"]:
-        segmentation_label: SegmentationLabel = SegmentationLabel(data, settings)
-        image: np.ndarray = segmentation_label.label(color_type)
+        segmentation_label: SegmentationLabel
+        segmentation_label = SegmentationLabel(data, settings, camera, roi, size)
+        image: np.ndarray
+        image = segmentation_label.label(color_type, settings.get("tile_height"))
+        encoder = encoder or label_encoder(color_type)
         output_path.mkdir(parents=True, exist_ok=True)
-        file_extension: str
-        file_extension = ".png" if color_type == "segmentation" else ".jpg"
-        output_path = output_path / (data["name"] + file_extension)
-        cv2.imwrite(str(output_path), image)
+        output_path = output_path / (data["name"] + encoder.extension)
+        output_path.write_bytes(encoder.encode(image))
         msg: str = f'Created "{data["name"]}" segmentation label/mask.'
         print(msg) if verbose else None
+        return [output_path]
     else:
         msg: str = f'No annotations found for "{data["name"]}" segmentation label/mask.'
         print(msg) if verbose else None
+        return []
+
+
+def create_scene_label(
+    name: str,
+    output_path: pathlib.Path,
+    settings: dict,
+    color_type: str = "segmentation",
+    verbose: bool = False,
+    encoder: Optional[Encoder] = None,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
+) -> list[pathlib.Path]:
+    """
+    Load a scene and create its label inside an export worker.
+    :param name: Scene name
+    :param output_path: Path to store generated masks / labels
+    :param settings: Dict of RailLabel settings
+    :param color_type: Type of masks / labels to generate
+    :param verbose: Verbose std out
+    :param encoder: Encoder of the label
+    :param roi: x, y, width and height of the labeled region in
+                native image coordinates, the whole image if None
+    :param size: Width and height of the labels
+    :return: Paths of the written labels
+    """
+    data: dict = worker_dataset().read_scene(name)
+    return create_label(
+        data,
+        output_path,
+        settings,
+        color_type,
+        verbose,
+        worker_camera(),
+        encoder,
+        roi,
+        size,
+    )
 
 
 def create_labels(
@@ -152,37 +500,135 @@ def create_labels(
     settings: dict,
     color_type: str = "segmentation",
     verbose: bool = False,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+    force: bool = False,
+    backend: str = "process",
+    fail_fast: bool = False,
+    job_queue: Optional[JobQueue] = None,
+    coordinator: bool = False,
+    encoder: Optional[str] = None,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    size: Optional[tuple[int, int]] = None,
 ) -> None:
     """
     Create segmentation labels / masks for tracks.
     The 'color_type' parameter selects if the output are colored
     images masks 'human', overlaid images 'overlay' or
     segmentation maks 'segmentation'.
+    Workers receive scene names only and load their scenes themselves.
+    Labels which are up to date according to the export manifest in
+    the output directory are skipped, labels of scenes which are not
+    annotated anymore are deleted.
     :param data_set_path: Path to dataset root directory
     :param output_path: Path to store generated masks / labels
     :param settings: Dict of RailLabel settings
     :param color_type: Type of masks / labels to generate
                        ['human', 'overlay', 'segmentation']
     :param verbose: Verbose std out
+    :param workers: Number of worker processes, all cores if None
+    :param chunksize: Number of scenes sent to a worker at once
+    :param force: Create all labels even if they are up to date
+    :param backend: Workers of ['process', 'thread', 'serial']
+    :param fail_fast: Stop at the first failed scene, otherwise report
+                      all failed scenes at the end
+    :param job_queue: Queue shared by the hosts of a distributed export
+    :param coordinator: Fill the job queue before pulling scenes
+    :param encoder: Encoder like 'png:9', see export.encoders.ENCODERS,
+                    PNG for segmentation masks and JPEG otherwise if None
+    :param roi: x, y, width and height of the labeled region in
+                native image coordinates, the whole image if None
+    :param size: Width and height of the labels, e.g. the training
+                 resolution, the size of the region if None
     """
     # Get data
     data_set_path: pathlib.Path = pathlib.Path(data_set_path)
     output_path: pathlib.Path = pathlib.Path(output_path)
-    dataset: DataSet = DataSet(data_set_path)
+    dataset: DataSet = load_data_set(data_set_path, settings)
     if not dataset:
         print(f'Dataset in directory "{str(data_set_path.absolute())}" is empty.')
 
-    arguments: list[Iterable]
-    arguments = [
+    function = functools.partial(
+        create_scene_label,
+        output_path=output_path,
+        settings=settings,
+        color_type=color_type,
+        verbose=verbose,
+        encoder=label_encoder(color_type, encoder),
+        roi=roi,
+        size=size,
+    )
+    options: dict = {"color_type": color_type}
+    if encoder:
+        options["encoder"] = encoder
+    if roi or size:
+        options.update(roi=roi, size=size)
+    manifest: ExportManifest = ExportManifest(
+        output_path,
+        f"segmentation/{color_type}",
+        file_hash(dataset.camera_yml),
+        settings_hash(settings, **options),
+        # Hosts of a distributed export share the manifest
+        "WAL" if job_queue is None else "DELETE",
+    )
+    if force:
+        manifest.clear()
+    stats: dict = {}
+    exported, skipped, removed = export_scenes(
+        function,
         dataset,
-        itertools.repeat(output_path),
-        itertools.repeat(settings),
-        itertools.repeat(color_type),
-        itertools.repeat(verbose),
-    ]
+        settings,
+        manifest,
+        workers,
+        chunksize,
+        stats=stats,
+        backend=backend,
+        fail_fast=fail_fast,
+        job_queue=job_queue,
+        coordinator=coordinator,
+    )
+    manifest.close()
+    if verbose:
+        print(f"Created {exported}, skipped {skipped} up to date", end="")
+        print(f" and removed {removed} outdated labels / masks.")
+    if job_queue is not None and verbose:
+        print(f"Jobs of all hosts: {job_queue.counts()}")
+    print_report(stats, verbose)
+
 
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        executor.map(create_label, *arguments)
+def benchmark_labels(
+    data_set_path: Union[str, pathlib.Path],
+    settings: dict,
+    color_type: str,
+    encoders: list[str],
+    scenes: int = 16,
+    workers: Optional[int] = None,
+) -> list[dict]:
+    """
+    Compare encoders on labels of the first annotated scenes.
+    :param data_set_path: Path to dataset root directory
+    :param settings: Dict of RailLabel settings
+    :param color_type: Type of labels to encode
+    :param encoders: Encoders like 'png:9' to compare
+    :param scenes: Number of scenes to label
+    :param workers: Number of threads encoding in parallel
+    :return: Encode time and file size per encoder, see
+             export.encoders.benchmark_encoders
+    """
+    dataset: DataSet = load_data_set(data_set_path, settings)
+    camera: Camera = Camera(dataset.camera_yml, dataset.decode_scale)
+    labels: list[np.ndarray] = []
+    names = dataset.iter_names(predicate=dataset.is_annotated)
+    for name in itertools.islice(names, scenes):
+        segmentation_label: SegmentationLabel = SegmentationLabel(
+            dataset.read_scene(name), settings, camera
+        )
+        labels.append(segmentation_label.label(color_type, settings.get("tile_height")))
+    return benchmark_encoders(
+        labels,
+        {encoder: label_encoder(color_type, encoder) for encoder in encoders},
+        workers,
+    )
 
 
 def parse_yaml(yaml_path: pathlib.Path) -> dict:
@@ -228,6 +674,96 @@ def parse_cli() -> dict:
         type=str,
         help="Path to settings YAML-file for RailLabel.",
     )
+    parser.add_argument(
+        "-f",
+        "--force",
+        help="Create all labels even if they are up to date",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--roi",
+        type=int,
+        nargs=4,
+        metavar=("X", "Y", "WIDTH", "HEIGHT"),
+        help="Region of interest in native image coordinates",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        nargs=2,
+        metavar=("WIDTH", "HEIGHT"),
+        help="Size of written labels, e.g. the training resolution",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of workers, all cores if not given",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=16,
+        help="Number of scenes sent to a worker at once",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="process",
+        help="Run workers as processes, threads or serially for debugging",
+    )
+    parser.add_argument(
+        "--fail_fast",
+        help="Stop at the first failed scene instead of reporting all failures",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--queue_path",
+        type=str,
+        help="SQLite job queue to share the export with other hosts, e.g. on NFS",
+    )
+    parser.add_argument(
+        "--coordinator",
+        help="Fill the job queue before pulling scenes, start before other hosts",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "--lease_time",
+        type=float,
+        default=600.0,
+        help="Seconds until scenes claimed by a crashed host are claimed again",
+    )
+    parser.add_argument(
+        "-c",
+        "--color_type",
+        type=str,
+        choices=list(DEFAULT_ENCODERS),
+        default="overlay",
+        help="Type of masks / labels to generate",
+    )
+    parser.add_argument(
+        "-e",
+        "--encoder",
+        type=str,
+        help=f"Encoder like 'png:9' of formats {list(ENCODERS)}",
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=str,
+        nargs="+",
+        metavar="ENCODER",
+        help="Compare encode time and file size of encoders instead of exporting",
+    )
+    parser.add_argument(
+        "--benchmark_scenes",
+        type=int,
+        default=16,
+        help="Number of scenes to benchmark encoders on",
+    )
     return vars(parser.parse_args())
 
 
@@ -256,8 +792,41 @@ def main():
     output_path: pathlib.Path = pathlib.Path(settings["output_path"])
     verbose: bool = settings["verbose"]
 
+    if settings["benchmark"]:
+        print_benchmark(
+            benchmark_labels(
+                data_set_path,
+                settings,
+                settings["color_type"],
+                settings["benchmark"],
+                settings["benchmark_scenes"],
+                settings["workers"],
+            )
+        )
+        return
+
     # Create labels
-    create_labels(data_set_path, output_path, settings, "overlay", verbose)
+    create_labels(
+        data_set_path,
+        output_path,
+        settings,
+        settings["color_type"],
+        verbose,
+        workers=settings["workers"],
+        chunksize=settings["chunksize"],
+        force=settings["force"],
+        backend=settings["backend"],
+        fail_fast=settings["fail_fast"],
+        job_queue=(
+            JobQueue(settings["queue_path"], settings["lease_time"])
+            if settings["queue_path"]
+            else None
+        ),
+        coordinator=settings["coordinator"],
+        encoder=settings["encoder"],
+        roi=settings["roi"],
+        size=settings["size"],
+    )
 
 
 if __name__ == "__main__":
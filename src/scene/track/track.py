@@ -122,14 +122,15 @@ class Track:
         """
         self.right_rail.del_mark(mark)
 
-    def to_dict(self) -> dict:
+    def to_dict(self, scale: int = 1) -> dict:
         """
         Dict representation of a track.
+        :param scale: Factor from the track image to the native image
         """
         track: dict = {
             "relative position": self.relative_position,
-            "left rail": self._left_rail.to_dict(),
-            "right rail": self._right_rail.to_dict(),
+            "left rail": self._left_rail.to_dict(scale),
+            "right rail": self._right_rail.to_dict(scale),
         }
         return track
 
@@ -0,0 +1,92 @@
+import pickle
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from data.annotation_store import (
+    AnnotationStore,
+    JsonAnnotationStore,
+    SQLiteAnnotationStore,
+    convert_annotation_store,
+)
+
+
+class TestAnnotationStore(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        self.annotations: dict[str, dict] = {
+            f"scene_{index:06d}": {
+                "tracks": {"0": {"relative position": "ego"}},
+                "switches": {},
+                "tags": ["snow"] if index % 2 else [],
+            }
+            for index in range(5)
+        }
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def _stores(self) -> list[AnnotationStore]:
+        return [
+            JsonAnnotationStore(self.tmp_path / "annotations"),
+            SQLiteAnnotationStore(self.tmp_path / "annotations.sqlite"),
+        ]
+
+    def test_read_write(self) -> None:
+        """
+        Assert random access by scene name.
+        """
+        for store in self._stores():
+            with self.subTest(msg=f"Round trip {type(store).__name__}"):
+                assert store.read("scene_000000") is None
+                assert "scene_000000" not in store
+                for name, annotations in self.annotations.items():
+                    store.write(name, annotations)
+                for name, annotations in self.annotations.items():
+                    assert store.read(name) == annotations
+                    assert name in store
+                assert store.names() == sorted(self.annotations)
+                assert dict(store.items()) == self.annotations
+
+            with self.subTest(msg=f"Delete {type(store).__name__}"):
+                store.delete("scene_000001")
+                assert store.read("scene_000001") is None
+                assert len(store) == 4
+            store.close()
+
+    def test_abstract(self) -> None:
+        """
+        Assert stores implement all abstract methods.
+        """
+        with self.assertRaises(TypeError):
+            AnnotationStore()
+
+    def test_pickle(self) -> None:
+        """
+        Assert SQLite store reopens its connection after pickling.
+        """
+        store = SQLiteAnnotationStore(self.tmp_path / "annotations.sqlite")
+        store.write("scene_000000", self.annotations["scene_000000"])
+        copy: SQLiteAnnotationStore = pickle.loads(pickle.dumps(store))
+        assert copy.read("scene_000000") == self.annotations["scene_000000"]
+        copy.close()
+        store.close()
+
+    def test_convert_annotation_store(self) -> None:
+        """
+        Assert conversion between layouts in both directions.
+        """
+        json_store, sqlite_store = self._stores()
+        for name, annotations in self.annotations.items():
+            json_store.write(name, annotations)
+
+        with self.subTest(msg="Convert JSON to SQLite"):
+            assert convert_annotation_store(json_store, sqlite_store, 2) == 5
+            assert dict(sqlite_store.items()) == self.annotations
+
+        with self.subTest(msg="Convert SQLite to JSON"):
+            target = JsonAnnotationStore(self.tmp_path / "converted")
+            assert convert_annotation_store(sqlite_store, target) == 5
+            assert dict(target.items()) == self.annotations
+        sqlite_store.close()
@@ -0,0 +1,52 @@
+import time
+from unittest import TestCase
+
+from data.annotation_writer import AnnotationWriter
+
+
+class _Recorder:
+    """
+    Data set recording written annotations.
+    """
+
+    def __init__(self) -> None:
+        self.writes: list[tuple[str, dict]] = []
+
+    def write_annotations(self, name: str, annotations: dict) -> None:
+        self.writes.append((name, annotations))
+
+
+class TestAnnotationWriter(TestCase):
+    def test_debounce(self) -> None:
+        """
+        Assert submits in quick succession result in one write of the
+        latest annotations, even if they span more than the delay.
+        """
+        dataset: _Recorder = _Recorder()
+        with AnnotationWriter(dataset, delay=0.2) as writer:
+            for index in range(8):
+                writer.submit("scene_000000", {"tags": [index]})
+                time.sleep(0.05)
+            time.sleep(0.4)
+            with self.subTest(msg="Coalesced submits"):
+                assert dataset.writes == [("scene_000000", {"tags": [7]})]
+
+            with self.subTest(msg="Unchanged annotations are skipped"):
+                assert not writer.submit("scene_000000", {"tags": [7]})
+            writer.submit("scene_000000", {"tags": [8]})
+            writer.flush()
+            assert dataset.writes[-1] == ("scene_000000", {"tags": [8]})
+
+    def test_pending(self) -> None:
+        """
+        Assert a scene reloaded right after a submit reads the submitted
+        annotations until they are written.
+        """
+        dataset: _Recorder = _Recorder()
+        with AnnotationWriter(dataset, delay=10) as writer:
+            writer.submit("scene_000000", {"tags": [1]})
+            assert dataset.writes == []
+            assert writer.pending("scene_000000") == {"tags": [1]}
+            assert writer.pending("scene_000001") is None
+            writer.flush()
+            assert writer.pending("scene_000000") is None
@@ -0,0 +1,85 @@
+import json
+from unittest import TestCase
+
+import numpy as np
+
+from data.binary_annotations import decode_annotations, encode_annotations
+
+
+class TestBinaryAnnotations(TestCase):
+    def setUp(self) -> None:
+        self.annotations: dict = {
+            "tracks": {
+                0: {
+                    "relative position": "ego",
+                    "left rail": {"points": [[812, 1079], [901, 800], [950, 600]]},
+                    "right rail": {"points": [[1210, 1079], [1090, 800], [1010, 600]]},
+                },
+                1: {
+                    "relative position": "left",
+                    "left rail": {"points": []},
+                    "right rail": {"points": [[40000, 3], [-5, 70000]]},
+                },
+            },
+            "switches": {
+                0: {
+                    "marks": [[100, 200], [180, 260]],
+                    "kind": True,
+                    "direction": False,
+                    "tracks": [],
+                },
+            },
+            "tags": ["snow", "curve"],
+        }
+
+    def test_round_trip(self) -> None:
+        """
+        Assert encoding and decoding is lossless compared to JSON.
+        """
+        as_json: dict = json.loads(json.dumps(self.annotations))
+
+        with self.subTest(msg="Decode to nested lists"):
+            decoded: dict = decode_annotations(encode_annotations(self.annotations))
+            assert decoded == as_json
+
+        with self.subTest(msg="Decode JSON loaded annotations"):
+            assert decode_annotations(encode_annotations(as_json)) == as_json
+
+        with self.subTest(msg="Decode empty scene"):
+            empty: dict = {"tracks": {}, "switches": {}, "tags": []}
+            assert decode_annotations(encode_annotations(empty)) == empty
+
+        with self.subTest(msg="Keep non integral coordinates"):
+            floats: dict = {"tracks": {"0": {"left rail": {"points": [[1.5, 2]]}}}}
+            assert decode_annotations(encode_annotations(floats)) == floats
+
+        with self.subTest(msg="Keep integer coordinates next to floats"):
+            mixed: dict = {**as_json, "switches": {"0": {"marks": [[1.5, 2]]}}}
+            decoded = decode_annotations(encode_annotations(mixed), arrays=True)
+            points: np.ndarray = decoded["tracks"]["0"]["left rail"]["points"]
+            assert np.issubdtype(points.dtype, np.integer)
+            assert decoded["switches"]["0"]["marks"].dtype == np.float64
+
+        with self.subTest(msg="Reject deltas beyond int32"):
+            with self.assertRaises(ValueError):
+                encode_annotations({"points": [[0, 0], [2**40, 0]]})
+
+    def test_arrays(self) -> None:
+        """
+        Assert decoding to coordinate arrays.
+        """
+        decoded: dict = decode_annotations(
+            encode_annotations(self.annotations), arrays=True
+        )
+        points: np.ndarray = decoded["tracks"]["0"]["right rail"]["points"]
+        assert points.shape == (3, 2)
+        assert np.array_equal(points, [[1210, 1079], [1090, 800], [1010, 600]])
+        assert decoded["tracks"]["1"]["left rail"]["points"].shape == (0, 2)
+
+    def test_size(self) -> None:
+        """
+        Assert binary format is smaller than pretty-printed JSON.
+        """
+        encoded: bytes = encode_annotations(self.annotations)
+        pretty: str = json.dumps(self.annotations, indent=4, sort_keys=True)
+        assert len(encoded) < len(pretty)
@@ -0,0 +1,51 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+from data.data_set import DataSet
+
+
+class TestDataSet(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        images_path: pathlib.Path = self.dataset_path / "images"
+        images_path.mkdir()
+        for name in ["scene_000001.png", "scene_000000.jpg", "scene_000002.jpeg"]:
+            (images_path / name).touch()
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_names(self) -> None:
+        """
+        Assert DataSet.names, DataSet.scene_name and DataSet.index.
+        """
+        dataset: DataSet = DataSet(self.dataset_path)
+        names: list[str] = ["scene_000000", "scene_000001", "scene_000002"]
+
+        with self.subTest(msg="Return names in sorted order"):
+            assert dataset.names == names
+
+        with self.subTest(msg="Map index to name and back"):
+            for index, name in enumerate(names):
+                assert dataset.scene_name(index) == name
+                assert dataset.index(name) == index
+
+        with self.subTest(msg="Raise on unknown name"):
+            with self.assertRaises(KeyError):
+                dataset.index("unknown")
+
+    def test_annotations(self) -> None:
+        """
+        Assert DataSet.read_annotations and DataSet.write_annotations.
+        """
+        dataset: DataSet = DataSet(self.dataset_path)
+
+        with self.subTest(msg="Return None for unannotated scene"):
+            assert dataset.read_annotations("scene_000000") is None
+
+        with self.subTest(msg="Write to the named scene only"):
+            annotations: dict = {"tracks": {}, "switches": {}, "tags": ["snow"]}
+            dataset.write_annotations("scene_000001", annotations)
+            assert dataset.read_annotations("scene_000001") == annotations
+            assert dataset.read_annotations("scene_000000") is None
@@ -0,0 +1,50 @@
+import pickle
+import pathlib
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from data.frame_cache import FrameCache
+
+
+class TestFrameCache(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        self.source_path: pathlib.Path = self.tmp_path / "scene_000000.png"
+        self.source_path.write_bytes(b"png")
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_budget(self) -> None:
+        """
+        Assert copies of a cache in several workers share one budget.
+        """
+        cache: FrameCache = FrameCache(self.tmp_path / "cache", 3000)
+        workers: list[FrameCache] = [pickle.loads(pickle.dumps(cache)) for _ in "ab"]
+        image: np.ndarray = np.zeros((20, 50), dtype=np.uint8)
+        for index in range(6):
+            worker: FrameCache = workers[index % 2]
+            frame: np.ndarray = worker.put(f"scene_{index}", self.source_path, image)
+            assert np.array_equal(frame, image)
+        frame_paths: list[pathlib.Path] = list(cache.cache_path.rglob("*.npy"))
+        assert sum(path.stat().st_size for path in frame_paths) <= 3000
+
+        with self.subTest(msg="Reject frames which failed to decode"):
+            with self.assertRaises(ValueError):
+                cache.put("scene_6", self.source_path, None)
+
+    def test_without_flock(self) -> None:
+        """
+        Assert the cache works on platforms without fcntl, e.g. Windows.
+        """
+        cache: FrameCache = FrameCache(self.tmp_path / "cache", 3000)
+        image: np.ndarray = np.zeros((20, 50), dtype=np.uint8)
+        with patch.dict("sys.modules", {"fcntl": None, "msvcrt": None}):
+            for index in range(4):
+                cache.put(f"scene_{index}", self.source_path, image)
+            assert cache.evict(0) > 0
+        assert not list(cache.cache_path.rglob("*.npy"))
@@ -0,0 +1,67 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from PIL import Image
+
+from data.manifest import DataSetManifest
+
+
+class TestDataSetManifest(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        self.images_path: pathlib.Path = self.dataset_path / "images"
+        self.images_path.mkdir()
+        (self.dataset_path / "annotations").mkdir()
+        for index in range(20):
+            image: Image.Image = Image.new("RGB", (16 + index, 8))
+            image.save(self.images_path / f"scene_{index:06d}.png")
+        (self.dataset_path / "annotations" / "scene_000003.json").write_text("{}")
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_refresh(self) -> None:
+        """
+        Assert DataSetManifest.refresh collects images and annotations.
+        """
+        manifest: DataSetManifest = DataSetManifest(self.dataset_path)
+
+        with self.subTest(msg="Save on first refresh"):
+            assert manifest.refresh()
+            assert manifest.manifest_path.exists()
+            assert len(manifest) == 20
+
+        with self.subTest(msg="Read image sizes from headers"):
+            assert manifest.image_size(5) == (21, 8)
+
+        with self.subTest(msg="Mark annotated scenes"):
+            assert np.flatnonzero(manifest.annotated).tolist() == [3]
+
+        with self.subTest(msg="Skip unchanged directories"):
+            assert not DataSetManifest(self.dataset_path).refresh()
+
+        with self.subTest(msg="List corrupt images with unknown size"):
+            (self.images_path / "scene_000020.png").write_bytes(b"truncated")
+            manifest = DataSetManifest(self.dataset_path)
+            assert manifest.refresh()
+            assert len(manifest) == 21
+            assert manifest.image_size(20) == (-1, -1)
+
+    def test_index(self) -> None:
+        """
+        Assert DataSetManifest.index maps names to positions.
+        """
+        DataSetManifest(self.dataset_path).refresh()
+        manifest: DataSetManifest = DataSetManifest(self.dataset_path)
+
+        with self.subTest(msg="Find all names of loaded manifest"):
+            for index, name in enumerate(manifest.names):
+                assert manifest.index(name) == index
+                assert manifest.scene_name(index) == name
+
+        with self.subTest(msg="Raise on unknown name"):
+            with self.assertRaises(KeyError):
+                manifest.index("scene_999999")
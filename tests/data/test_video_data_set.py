@@ -0,0 +1,132 @@
+import os
+import pathlib
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from data.video_data_set import VideoDataSet, VideoSeekIndex
+
+
+def _write_video(video_path: pathlib.Path, count: int, codec: str = "mp4v") -> None:
+    """
+    Write a video whose frames differ in brightness.
+    :param video_path: Path of the video
+    :param count: Number of frames
+    :param codec: FourCC of the codec
+    """
+    writer = cv2.VideoWriter(
+        str(video_path), cv2.VideoWriter_fourcc(*codec), 10, (64, 48)
+    )
+    for frame in range(count):
+        writer.write(np.full((48, 64, 3), frame * 4 % 256, dtype=np.uint8))
+    writer.release()
+
+
+class TestVideoDataSet(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.dataset_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        videos_path: pathlib.Path = self.dataset_path / "videos"
+        videos_path.mkdir()
+        # Names of 'run' sort after names of 'run2' but come first
+        _write_video(videos_path / "run.mp4", 60)
+        _write_video(videos_path / "run2.mp4", 60)
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_seek_index(self) -> None:
+        """
+        Assert timestamps of all frames are cached until the video
+        changes.
+        """
+        video_path: pathlib.Path = self.dataset_path / "videos" / "run.mp4"
+        cache_path: pathlib.Path = self.dataset_path / "index" / "run.npz"
+        index: VideoSeekIndex = VideoSeekIndex(video_path, cache_path)
+        assert len(index) == 60
+        timestamps: list[float] = [index.timestamp(frame) for frame in range(60)]
+        assert timestamps == sorted(set(timestamps))
+        assert cache_path.exists()
+
+        with self.subTest(msg="Reuse cached index"):
+            with patch.object(VideoSeekIndex, "_build") as build:
+                cached: VideoSeekIndex = VideoSeekIndex(video_path, cache_path)
+            build.assert_not_called()
+            assert len(cached) == 60
+            assert cached.timestamp(59) == index.timestamp(59)
+
+        with self.subTest(msg="Rebuild index of a changed video"):
+            _write_video(video_path, 30)
+            os.utime(video_path, ns=(0, 10**9))
+            assert len(VideoSeekIndex(video_path, cache_path)) == 30
+
+    def test_names(self) -> None:
+        """
+        Assert scene names map to video and frame and back.
+        """
+        dataset: VideoDataSet = VideoDataSet(self.dataset_path)
+        assert len(dataset) == 120
+        assert dataset.names[:2] == ["run_000000", "run_000001"]
+        for index, name in [(0, "run_000000"), (59, "run_000059"), (60, "run2_000000")]:
+            with self.subTest(name=name):
+                assert dataset.scene_name(index) == name
+                assert dataset.index(name) == index
+        assert dataset.image_path("run2_000007").name == "run2.mp4"
+        assert dataset.image_size("run_000000") == (64, 48)
+        for name in ["run_000060", "run3_000000", "run_frame", "run"]:
+            with self.subTest(msg=f"Raise on unknown name {name}"):
+                with self.assertRaises(KeyError):
+                    dataset.index(name)
+        dataset.close()
+
+    def test_read_image(self) -> None:
+        """
+        Assert random and sequential reads decode the exact frames of a
+        sequential pass.
+        """
+        videos_path: pathlib.Path = self.dataset_path / "videos"
+        _write_video(videos_path / "clip.avi", 40, "MJPG")
+        dataset: VideoDataSet = VideoDataSet(self.dataset_path)
+        rng: np.random.Generator = np.random.default_rng(0)
+        for stem, count in [("run", 60), ("clip", 40)]:
+            capture = cv2.VideoCapture(str(next(videos_path.glob(stem + ".*"))))
+            frames: list[np.ndarray] = []
+            while True:
+                success, image = capture.read()
+                if not success:
+                    break
+                frames.append(image)
+            capture.release()
+            assert len(frames) == count
+            orders: dict[str, list[int]] = {
+                "random": rng.permutation(count).tolist(),
+                "sequential": list(range(count)),
+                "backward": list(range(count - 1, -1, -7)),
+            }
+            for order, numbers in orders.items():
+                with self.subTest(video=stem, order=order):
+                    for frame in numbers:
+                        image = dataset.read_image(f"{stem}_{frame:06d}")
+                        assert np.array_equal(image, frames[frame]), frame
+        dataset.close()
+
+    def test_iter_names(self) -> None:
+        """
+        Assert start and stop select scenes in data set order.
+        """
+        dataset: VideoDataSet = VideoDataSet(self.dataset_path)
+        for start, stop, expected in [
+            ("run2_000000", None, [f"run2_{frame:06d}" for frame in range(60)]),
+            (None, "run_000010", [f"run_{frame:06d}" for frame in range(10)]),
+            ("run_000058", "run2_000000", ["run_000058", "run_000059"]),
+            ("run_000059", "run2_000001", ["run_000059", "run2_000000"]),
+        ]:
+            with self.subTest(start=start, stop=stop):
+                assert list(dataset.iter_names(start, stop)) == expected
+        with self.subTest(msg="Raise on unknown names"):
+            with self.assertRaises(KeyError):
+                list(dataset.iter_names(stop="run_000060"))
+        dataset.close()
@@ -0,0 +1,78 @@
+import json
+import pathlib
+
+import cv2
+import numpy as np
+
+# RailLabel settings needed to render labels of a scratch data set
+SETTINGS: dict = {
+    "track_bed_width": 1435,
+    "rail_width": 67,
+    "marker_interpolation_steps": 15,
+}
+
+
+def write_camera(camera_path: pathlib.Path) -> None:
+    """
+    Write the calibration of a camera looking ahead onto the track.
+    """
+    storage = cv2.FileStorage(str(camera_path), cv2.FileStorage_WRITE)
+    storage.startWriteStruct("distortion_coefficients", cv2.FileNode_SEQ)
+    for _ in range(5):
+        storage.write("", 0.0)
+    storage.endWriteStruct()
+    for key, value in dict(
+        roll=0.0, pitch=10.0, yaw=0.0, width=640.0, height=480.0, f=500.0
+    ).items():
+        storage.write(key, value)
+    storage.write("tvec", np.array([[0.0], [-2.0], [0.0]]))
+    storage.write(
+        "camera_matrix", np.array([[500.0, 0, 320], [0, 500.0, 240], [0, 0, 1]])
+    )
+    storage.release()
+
+
+def write_data_set(
+    dataset_path: pathlib.Path, count: int = 3, suffix: str = ".png"
+) -> list[str]:
+    """
+    Write a data set of 640x480 images with a camera. All scenes but
+    the last one are annotated with an ego track and a switch.
+    :param dataset_path: Path to dataset root directory
+    :param count: Number of scenes
+    :param suffix: Image file extension
+    :return: Scene names
+    """
+    for directory in ["images", "annotations", "camera"]:
+        (dataset_path / directory).mkdir(parents=True)
+    write_camera(dataset_path / "camera" / "camera.yaml")
+    rng: np.random.Generator = np.random.default_rng(0)
+    names: list[str] = [f"scene_{index:06d}" for index in range(count)]
+    for index, name in enumerate(names):
+        image: np.ndarray = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        cv2.imwrite(str(dataset_path / "images" / (name + suffix)), image)
+        if index == count - 1:
+            continue
+        annotations: dict = {
+            "tracks": {
+                "0": {
+                    "relative position": "ego",
+                    "left rail": {"points": [[250, 470], [300, 300], [310, 250]]},
+                    "right rail": {
+                        "points": [[400 + index, 470], [340, 300], [330, 250]]
+                    },
+                }
+            },
+            "switches": {
+                "0": {
+                    "marks": [[100, 200], [181 + index, 261]],
+                    "kind": True,
+                    "direction": False,
+                    "tracks": [],
+                }
+            },
+            "tags": [],
+        }
+        with open(dataset_path / "annotations" / f"{name}.json", "w") as file:
+            json.dump(annotations, file)
+    return names
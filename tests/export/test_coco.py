@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+import numpy as np
+
+from export.coco import compress_rle, polygon_rle, scene_instances
+
+
+class TestCoco(TestCase):
+    def test_polygon_rle(self) -> None:
+        """
+        Assert polygons are run-length encoded by pixel centers in
+        column-major order.
+        """
+        rectangle: np.ndarray = np.array([[1, 1], [3, 1], [3, 2], [1, 2]])
+        for polygon, counts in [
+            (rectangle, [5, 2, 2, 2, 9]),
+            (rectangle + [10, 0], [20]),
+            (rectangle[:2], [20]),
+            (np.array([[-5, -5], [20, -5], [20, 20], [-5, 20]]), [0, 20]),
+        ]:
+            with self.subTest(polygon=polygon.tolist()):
+                self.assertEqual(polygon_rle(polygon, 5, 4), counts)
+
+    def test_compress_rle(self) -> None:
+        """
+        Assert counts are compressed like the COCO API does.
+        """
+        self.assertEqual(compress_rle([5, 2, 2, 2, 9]), "52207")
+
+    def test_scene_instances(self) -> None:
+        """
+        Assert area and bounding box of instances and empty instances
+        are skipped.
+        """
+        rectangle: np.ndarray = np.array([[1, 1], [3, 1], [3, 2], [1, 2]])
+        instances: list[dict] = scene_instances(
+            [("ego_rails", rectangle), ("ego_bed", rectangle + [10, 0])], 5, 4
+        )
+        self.assertEqual(len(instances), 1)
+        self.assertEqual(instances[0]["category_id"], 4)
+        self.assertEqual(instances[0]["area"], 4)
+        self.assertEqual(instances[0]["bbox"], [1, 1, 2, 1])
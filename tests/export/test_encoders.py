@@ -0,0 +1,76 @@
+import io
+from unittest import TestCase
+
+import numpy as np
+from PIL import Image
+
+from export.encoders import (
+    ENCODERS,
+    Encoder,
+    NpyEncoder,
+    PaletteEncoder,
+    parse_encoder,
+)
+
+
+class TestEncoders(TestCase):
+    def setUp(self) -> None:
+        self.mask: np.ndarray = np.zeros((32, 48), dtype=np.uint8)
+        self.mask[8:24, 10:30] = 50
+
+    def test_abstract(self) -> None:
+        """
+        Assert encoders implement encode.
+        """
+        with self.assertRaises(TypeError):
+            Encoder()
+
+    def test_lossless(self) -> None:
+        """
+        Assert lossless encoders keep the class ids of masks.
+        """
+        for spec in ["png", "png:9", "webp", "npy"]:
+            with self.subTest(spec=spec):
+                encoder = parse_encoder(spec)
+                encoded: bytes = encoder.encode(self.mask)
+                if encoder.extension == ".npy":
+                    decoded: np.ndarray = np.load(io.BytesIO(encoded))
+                else:
+                    decoded = np.asarray(Image.open(io.BytesIO(encoded)))
+                    decoded = decoded.reshape(*self.mask.shape, -1)[..., 0]
+                np.testing.assert_array_equal(decoded, self.mask)
+
+    def test_palette(self) -> None:
+        """
+        Assert palette PNGs keep class ids as indices and reject
+        colored labels.
+        """
+        encoder: PaletteEncoder = PaletteEncoder({50: (58, 197, 197)})
+        image: Image.Image = Image.open(io.BytesIO(encoder.encode(self.mask)))
+        self.assertEqual(image.mode, "P")
+        self.assertEqual(image.getpalette()[150:153], [58, 197, 197])
+        np.testing.assert_array_equal(np.asarray(image), self.mask)
+        with self.assertRaises(ValueError):
+            encoder.encode(np.zeros((4, 4, 3), dtype=np.uint8))
+
+    def test_parse_encoder(self) -> None:
+        """
+        Assert unknown formats and levels out of range are rejected.
+        """
+        self.assertEqual(set(ENCODERS), {"png", "palette", "webp", "jpg", "npy"})
+        self.assertIsInstance(parse_encoder("npy"), NpyEncoder)
+        for spec in ["jpg:0", "jpg:100", "palette:9", "png:0"]:
+            with self.subTest(spec=spec):
+                parse_encoder(spec)
+        for spec in [
+            "tiff",
+            "png:high",
+            "png:10",
+            "palette:99",
+            "jpg:101",
+            "webp:90",
+            "npy:1",
+        ]:
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    parse_encoder(spec)
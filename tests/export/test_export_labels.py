@@ -0,0 +1,128 @@
+import json
+import pathlib
+import tarfile
+import tempfile
+from unittest import TestCase
+
+from export.export_labels import export_labels
+from tests.export.scratch_data_set import SETTINGS, write_data_set
+
+
+def _directory_files(output_path: pathlib.Path) -> dict[str, bytes]:
+    """
+    :param output_path: Directory of a directory export
+    :return: Content by relative path of all files but the manifest
+    """
+    return {
+        str(path.relative_to(output_path)): path.read_bytes()
+        for path in output_path.rglob("*")
+        if path.is_file() and path.name != ".export_manifest.sqlite"
+    }
+
+
+def _shard_members(output_path: pathlib.Path) -> dict[str, bytes]:
+    """
+    :param output_path: Directory of tar shards
+    :return: Content by member name of all shards
+    """
+    members: dict[str, bytes] = {}
+    for shard_path in output_path.glob("*.tar"):
+        with tarfile.open(shard_path) as shard:
+            for member in shard.getmembers():
+                members[member.name] = shard.extractfile(member).read()
+    return members
+
+
+class TestExportLabels(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        self.dataset_path: pathlib.Path = self.tmp_path / "dataset"
+        self.names: list[str] = write_data_set(self.dataset_path, suffix=".jpg")
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_pipeline_shards(self) -> None:
+        """
+        Assert pipeline and worker exports write the same shard samples,
+        with the stored image copied once.
+        """
+        outputs: dict[bool, dict[str, bytes]] = {}
+        for pipeline in [False, True]:
+            output_path: pathlib.Path = self.tmp_path / f"pipeline_{pipeline}"
+            export_labels(
+                self.dataset_path,
+                output_path,
+                SETTINGS,
+                ["segmentation"],
+                workers=2,
+                shards=True,
+                pipeline=pipeline,
+                backend="thread",
+            )
+            outputs[pipeline] = _shard_members(output_path)
+        assert sorted(outputs[True]) == [
+            f"{name}.{key}"
+            for name in self.names[:-1]
+            for key in ["image.jpg", "segmentation.png"]
+        ]
+        assert outputs[True] == outputs[False]
+
+    def test_targets(self) -> None:
+        """
+        Assert directory and shard exports of all targets write the same
+        labels with and without the pipeline.
+        """
+        targets: list[str] = ["segmentation", "yolo", "coco"]
+        outputs: dict[tuple[bool, bool], dict[str, bytes]] = {}
+        for shards in [False, True]:
+            for pipeline in [False, True]:
+                output_path: pathlib.Path = self.tmp_path / f"{shards}_{pipeline}"
+                export_labels(
+                    self.dataset_path,
+                    output_path,
+                    SETTINGS,
+                    targets,
+                    workers=2,
+                    shards=shards,
+                    pipeline=pipeline,
+                    backend="thread",
+                )
+                if shards:
+                    outputs[shards, pipeline] = _shard_members(output_path)
+                    assert (output_path / "yolo" / "labels.txt").exists()
+                else:
+                    outputs[shards, pipeline] = _directory_files(output_path)
+        names: list[str] = self.names[:-1]
+        suffixes: dict[str, str] = {
+            "coco": "json",
+            "segmentation": "png",
+            "yolo": "txt",
+        }
+        assert sorted(outputs[False, True]) == sorted(
+            ["coco.json", "yolo/labels.txt"]
+            + [
+                f"{target}/{name}.{suffix}"
+                for target, suffix in suffixes.items()
+                for name in names
+            ]
+        )
+        assert sorted(outputs[True, True]) == sorted(
+            f"{name}.{key}"
+            for name in names
+            for key in ["image.jpg", "coco.json", "segmentation.png", "yolo.txt"]
+        )
+        for shards in [False, True]:
+            with self.subTest(shards=shards):
+                assert outputs[shards, True] == outputs[shards, False]
+        with self.subTest(msg="Same labels in directories and shards"):
+            for name in names:
+                for target, suffix in suffixes.items():
+                    assert (
+                        outputs[False, True][f"{target}/{name}.{suffix}"]
+                        == outputs[True, True][f"{name}.{target}.{suffix}"]
+                    )
+        coco: dict = json.loads(outputs[False, True]["coco.json"])
+        assert len(coco["images"]) == len(names)
+        assert coco["annotations"]
@@ -0,0 +1,66 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from export.export_manifest import ExportManifest, settings_hash
+
+
+class TestExportManifest(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_path: pathlib.Path = pathlib.Path(self.tmp_dir.name)
+        self.manifest: ExportManifest = ExportManifest(
+            self.output_path, "segmentation/overlay", "camera", "settings"
+        )
+
+    def tearDown(self) -> None:
+        self.manifest.close()
+        self.tmp_dir.cleanup()
+
+    def _write(self, name: str) -> pathlib.Path:
+        output: pathlib.Path = self.output_path / (name + ".png")
+        output.write_bytes(b"label")
+        return output
+
+    def test_is_current(self) -> None:
+        """
+        Assert outputs are current only for equal hashes.
+        """
+        self.manifest.record("scene_0", "annotations", [self._write("scene_0")])
+        self.assertTrue(self.manifest.is_current("scene_0", "annotations"))
+        self.assertFalse(self.manifest.is_current("scene_0", "edited"))
+        self.assertFalse(self.manifest.is_current("scene_1", "annotations"))
+        for camera_hash, options_hash in [("other", "settings"), ("camera", "other")]:
+            with self.subTest(camera_hash=camera_hash, settings_hash=options_hash):
+                manifest: ExportManifest = ExportManifest(
+                    self.output_path, "segmentation/overlay", camera_hash, options_hash
+                )
+                self.assertFalse(manifest.is_current("scene_0", "annotations"))
+                manifest.close()
+
+    def test_prune(self) -> None:
+        """
+        Assert outputs of scenes which are not annotated anymore are
+        deleted.
+        """
+        outputs: list[pathlib.Path] = [self._write(f"scene_{i}") for i in range(3)]
+        for i, output in enumerate(outputs):
+            self.manifest.record(f"scene_{i}", "annotations", [output])
+        removed: list[str] = self.manifest.prune({"scene_0", "scene_2"})
+        self.assertEqual(removed, ["scene_1"])
+        self.assertEqual([output.exists() for output in outputs], [True, False, True])
+        self.assertEqual(sorted(self.manifest.names()), ["scene_0", "scene_2"])
+
+    def test_settings_hash(self) -> None:
+        """
+        Assert run settings do not change the settings hash.
+        """
+        settings: dict = {"rail_width": 67, "verbose": False}
+        self.assertEqual(
+            settings_hash(settings, color_type="overlay"),
+            settings_hash({**settings, "verbose": True}, color_type="overlay"),
+        )
+        self.assertNotEqual(
+            settings_hash(settings, color_type="overlay"),
+            settings_hash({**settings, "rail_width": 70}, color_type="overlay"),
+        )
@@ -0,0 +1,87 @@
+import time
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from export.job_queue import JobQueue
+
+
+class TestJobQueue(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue_path: pathlib.Path = pathlib.Path(self.tmp_dir.name) / "jobs.sqlite"
+        self.job_queue: JobQueue = JobQueue(self.queue_path, max_attempts=2)
+        self.job_queue.fill([f"scene_{i}" for i in range(5)])
+
+    def tearDown(self) -> None:
+        self.job_queue.close()
+        self.tmp_dir.cleanup()
+
+    def test_claim(self) -> None:
+        """
+        Assert every scene is leased to one worker only.
+        """
+        other: JobQueue = JobQueue(self.queue_path)
+        claimed: list[str] = self.job_queue.claim("a", 3) + other.claim("b", 3)
+        other.close()
+        self.assertEqual(sorted(claimed), [f"scene_{i}" for i in range(5)])
+        self.assertEqual(self.job_queue.claim("c", 3), [])
+        self.assertEqual(self.job_queue.counts()["leased"], 5)
+
+    def test_expired_lease(self) -> None:
+        """
+        Assert scenes of expired leases are claimed again until their
+        attempts are used up.
+        """
+        expiring: JobQueue = JobQueue(self.queue_path, lease_time=-1, max_attempts=2)
+        for attempt in range(2):
+            with self.subTest(attempt=attempt):
+                self.assertEqual(len(expiring.claim("crashed", 5)), 5)
+        self.assertEqual(expiring.claim("crashed", 5), [])
+        self.assertEqual(expiring.counts()["failed"], 5)
+        expiring.close()
+
+    def test_pull(self) -> None:
+        """
+        Assert pulling claims available scenes without waiting and
+        waiting ends when all scenes are done or failed.
+        """
+        job_queue: JobQueue = JobQueue(self.queue_path, max_attempts=2, poll_interval=0)
+        names: list[str] = []
+        while True:
+            for name in job_queue.pull("a", 2):
+                names.append(name)
+                if name == "scene_1":
+                    job_queue.fail(name, "Traceback")
+                else:
+                    job_queue.complete([name])
+            if not job_queue.wait("a"):
+                break
+        job_queue.close()
+        self.assertEqual(names.count("scene_1"), 2)
+        self.assertEqual(
+            self.job_queue.counts(), {"pending": 0, "leased": 0, "done": 4, "failed": 1}
+        )
+
+    def test_renew(self) -> None:
+        """
+        Assert renewed leases are not claimed again.
+        """
+        expiring: JobQueue = JobQueue(self.queue_path, lease_time=0.1)
+        self.assertEqual(len(expiring.claim("a", 2)), 2)
+        with expiring.keep_leases("a"):
+            time.sleep(0.3)
+            self.assertEqual(len(self.job_queue.claim("b", 5)), 3)
+        time.sleep(0.15)
+        self.assertEqual(len(self.job_queue.claim("b", 5)), 2)
+        expiring.close()
+
+    def test_reset(self) -> None:
+        """
+        Assert workers wait for the coordinator of the next run.
+        """
+        self.job_queue.complete(self.job_queue.claim("a", 5))
+        self.assertFalse(self.job_queue.wait("b"))
+        self.job_queue.reset()
+        self.assertFalse(self.job_queue.filled)
+        self.assertEqual(self.job_queue.counts()["done"], 0)
@@ -0,0 +1,176 @@
+import io
+import json
+import time
+import asyncio
+import pathlib
+import tempfile
+import threading
+import contextlib
+import concurrent.futures
+from unittest import TestCase
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from export import mask_server
+from export.mask_server import LabelCache, MaskClient, MaskServer, parse_label_request
+
+
+def _write_camera(camera_path: pathlib.Path) -> None:
+    """
+    Write the calibration of a camera looking ahead onto the track.
+    """
+    storage = cv2.FileStorage(str(camera_path), cv2.FileStorage_WRITE)
+    storage.startWriteStruct("distortion_coefficients", cv2.FileNode_SEQ)
+    for _ in range(5):
+        storage.write("", 0.0)
+    storage.endWriteStruct()
+    for key, value in dict(
+        roll=0.0, pitch=10.0, yaw=0.0, width=640.0, height=480.0, f=500.0
+    ).items():
+        storage.write(key, value)
+    storage.write("tvec", np.array([[0.0], [-2.0], [0.0]]))
+    storage.write(
+        "camera_matrix", np.array([[500.0, 0, 320], [0, 500.0, 240], [0, 0, 1]])
+    )
+    storage.release()
+
+
+class TestMaskServer(TestCase):
+    def test_label_cache(self) -> None:
+        """
+        Assert least recently used labels are evicted beyond the budget.
+        """
+        cache: LabelCache = LabelCache(250)
+        cache.put(("a", "segmentation", None, None, None), b"a" * 100)
+        cache.put(("b", "segmentation", None, None, None), b"b" * 100)
+        assert cache.get(("a", "segmentation", None, None, None)) == b"a" * 100
+        cache.put(("c", "segmentation", None, None, None), b"c" * 100)
+        with self.subTest(msg="Evict least recently used"):
+            assert cache.get(("b", "segmentation", None, None, None)) is None
+            assert cache.get(("a", "segmentation", None, None, None)) is not None
+            assert cache.stats()["bytes"] == 200
+        with self.subTest(msg="Skip labels beyond the budget"):
+            cache.put(("d", "segmentation", None, None, None), b"d" * 300)
+            assert len(cache) == 2
+            assert cache.stats()["evictions"] == 1
+
+    def test_parse_label_request(self) -> None:
+        """
+        Assert label keys of valid requests and errors of invalid ones.
+        """
+        with self.subTest(msg="Defaults"):
+            key = parse_label_request("/labels/scene_000001")
+            assert key == ("scene_000001", "segmentation", None, None, None)
+        with self.subTest(msg="All parameters"):
+            key = parse_label_request(
+                "/labels/scene%20a?target=overlay&size=640,360&roi=0,10,1920,1070"
+                "&encoder=npy"
+            )
+            assert key == ("scene a", "overlay", (640, 360), (0, 10, 1920, 1070), "npy")
+        for target in [
+            "/scene_000001",
+            "/labels/scene_000001?target=coco",
+            "/labels/scene_000001?size=640",
+            "/labels/scene_000001?size=0,360",
+            "/labels/scene_000001?encoder=gif",
+            "/labels/scene_000001?encoder=png:99",
+            "/labels/scene_000001?encoder=npy:1",
+        ]:
+            with self.subTest(msg=f"Invalid request {target}"):
+                with self.assertRaises(ValueError):
+                    parse_label_request(target)
+
+
+class TestMaskServerClient(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        dataset_path: pathlib.Path = self.tmp_path / "dataset"
+        for directory in ["images", "annotations", "camera"]:
+            (dataset_path / directory).mkdir(parents=True)
+        _write_camera(dataset_path / "camera" / "camera.yaml")
+        image: np.ndarray = np.full((480, 640, 3), 100, dtype=np.uint8)
+        for name in ["scene_000000", "scene_000001"]:
+            cv2.imwrite(str(dataset_path / "images" / f"{name}.png"), image)
+        annotations: dict = {
+            "tracks": {
+                "0": {
+                    "relative position": "ego",
+                    "left rail": {"points": [[250, 470], [300, 300], [310, 250]]},
+                    "right rail": {"points": [[400, 470], [340, 300], [330, 250]]},
+                }
+            },
+            "switches": {},
+            "tags": [],
+        }
+        with open(dataset_path / "annotations" / "scene_000000.json", "w") as file:
+            json.dump(annotations, file)
+
+        self.socket_path: pathlib.Path = self.tmp_path / "labels.sock"
+        settings: dict = {
+            "track_bed_width": 1435,
+            "rail_width": 67,
+            "marker_interpolation_steps": 15,
+        }
+        self.server: MaskServer = MaskServer(dataset_path, settings, 4, "thread")
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.serving: asyncio.Task = self.loop.create_task(
+            self.server.serve(socket_path=self.socket_path)
+        )
+        self.thread: threading.Thread = threading.Thread(target=self._serve)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.thread.start()
+            while not self.socket_path.exists():
+                time.sleep(0.01)
+
+    def _serve(self) -> None:
+        with contextlib.suppress(asyncio.CancelledError):
+            self.loop.run_until_complete(self.serving)
+
+    def tearDown(self) -> None:
+        self.loop.call_soon_threadsafe(self.serving.cancel)
+        self.thread.join()
+        self.loop.close()
+        self._tmp_dir.cleanup()
+
+    def _label(self, name: str, target: str = "segmentation") -> bytes:
+        client: MaskClient = MaskClient(socket_path=self.socket_path)
+        try:
+            return client.label(name, target, encoder="npy")
+        finally:
+            client.close()
+
+    def test_labels(self) -> None:
+        """
+        Assert concurrent requests of the same label are rendered once
+        and errors of the workers are not reported as unknown scenes.
+        """
+        with patch.object(
+            mask_server, "render_label", wraps=mask_server.render_label
+        ) as render_label:
+            with concurrent.futures.ThreadPoolExecutor(8) as executor:
+                labels: list[bytes] = list(
+                    executor.map(self._label, ["scene_000000"] * 16)
+                )
+        with self.subTest(msg="Render concurrent requests once"):
+            assert render_label.call_count == 1
+            assert len(set(labels)) == 1
+            label: np.ndarray = np.load(io.BytesIO(labels[0]))
+            assert label.shape == (480, 640)
+            assert label.any()
+
+        with self.subTest(msg="Empty labels of scenes without annotations"):
+            label = np.load(io.BytesIO(self._label("scene_000001")))
+            assert label.shape == (480, 640)
+            assert not label.any()
+
+        with self.subTest(msg="Unknown scene"):
+            with self.assertRaises(KeyError):
+                self._label("scene_000002")
+
+        with self.subTest(msg="Failures of the workers"):
+            with patch.object(mask_server, "render_label", side_effect=KeyError("x")):
+                with self.assertRaisesRegex(ValueError, "500"):
+                    self._label("scene_000001", "human")
@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from export.pipeline import Pipeline, Stage
+
+
+def _square(value: int) -> int:
+    return value * value
+
+
+def _fail_on_three(value: int) -> int:
+    if value == 3:
+        msg = "Expected value other than 3"
+        raise ValueError(msg)
+    return value
+
+
+class TestPipeline(TestCase):
+    def test_run(self) -> None:
+        """
+        Assert all items pass all thread and process stages.
+        """
+        pipeline: Pipeline = Pipeline(
+            [
+                Stage("add", lambda value: value + 1, workers=3),
+                Stage(
+                    "square",
+                    _square,
+                    workers=2,
+                    processes=True,
+                    payload=lambda item: item,
+                    merge=lambda item, result: (item, result),
+                ),
+            ],
+            queue_size=2,
+        )
+        results: list = sorted(pipeline.run(range(20)))
+        self.assertEqual(results, [(i + 1, (i + 1) ** 2) for i in range(20)])
+        report: list[dict] = pipeline.report()
+        self.assertEqual([stage["items"] for stage in report], [20, 20])
+        for stage in report:
+            with self.subTest(stage=stage["stage"]):
+                self.assertGreaterEqual(stage["utilization"], 0)
+                self.assertLessEqual(stage["utilization"], 1)
+
+    def test_error(self) -> None:
+        """
+        Assert the first error of a stage is raised to the consumer.
+        """
+        pipeline: Pipeline = Pipeline([Stage("fail", _fail_on_three, workers=2)])
+        with self.assertRaises(ValueError):
+            list(pipeline.run(range(100)))
+
+    def test_failures(self) -> None:
+        """
+        Assert failed items are collected with their traceback and all
+        other items pass, for every backend.
+        """
+        for backend in ["process", "thread", "serial"]:
+            with self.subTest(backend=backend):
+                pipeline: Pipeline = Pipeline(
+                    [
+                        Stage("fail", _fail_on_three, workers=2),
+                        Stage(
+                            "square",
+                            _square,
+                            workers=2,
+                            processes=True,
+                            payload=lambda item: item,
+                            merge=lambda item, result: result,
+                        ),
+                    ],
+                    backend=backend,
+                    fail_fast=False,
+                    key=str,
+                )
+                results: list = sorted(pipeline.run(range(6)))
+                self.assertEqual(results, [0, 1, 4, 16, 25])
+                self.assertEqual(len(pipeline.failures), 1)
+                name, failure = pipeline.failures[0]
+                self.assertEqual(name, "3")
+                self.assertIn("Expected value other than 3", failure)
@@ -0,0 +1,54 @@
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+from unittest.mock import patch
+
+from export.pool import _run_chunk, peak_memory, print_report
+
+
+def _scene_length(name: str) -> int:
+    if name == "broken":
+        msg = f'Expected a valid scene, got "{name}"'
+        raise ValueError(msg)
+    return len(name)
+
+
+class TestRunChunk(TestCase):
+    def test_failures(self) -> None:
+        """
+        Assert failed scenes are collected with their traceback or
+        raised for fail fast.
+        """
+        names: list[str] = ["a", "broken", "abc"]
+        results, failures, peak = _run_chunk(_scene_length, names, fail_fast=False)
+        self.assertEqual(results, [1, 3])
+        self.assertEqual([name for name, _ in failures], ["broken"])
+        self.assertIn("ValueError", failures[0][1])
+        self.assertGreater(peak, 0)
+        with self.assertRaises(ValueError):
+            _run_chunk(_scene_length, names, fail_fast=True)
+
+
+class TestReport(TestCase):
+    def test_peak_memory(self) -> None:
+        """
+        Assert peak memory is 0 without the resource module.
+        """
+        self.assertGreater(peak_memory(), 0)
+        with patch.dict("sys.modules", {"resource": None}):
+            self.assertEqual(peak_memory(), 0)
+
+    def test_print_report(self) -> None:
+        """
+        Assert peak memory is reported per worker for process workers
+        only.
+        """
+        stats: dict = dict(peak_memory=2**20, scenes=2, elapsed=1.0, failures=[])
+        for process_workers, line in [
+            (True, "Peak memory per worker: 1 MB"),
+            (False, "Peak memory of this process: 1 MB"),
+        ]:
+            with self.subTest(process_workers=process_workers):
+                with redirect_stdout(io.StringIO()) as stdout:
+                    print_report({**stats, "process_workers": process_workers}, True)
+                self.assertIn(line, stdout.getvalue())
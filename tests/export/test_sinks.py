@@ -0,0 +1,75 @@
+import json
+import pickle
+import pathlib
+import tarfile
+import tempfile
+from unittest import TestCase
+
+from export.sinks import DirectorySink, ShardSink, Sink, close_shard_sinks
+
+
+class TestSinks(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_path: pathlib.Path = pathlib.Path(self.tmp_dir.name)
+        self.files: dict[str, bytes] = {
+            "segmentation.png": b"mask",
+            "yolo.txt": b"0 0.5 0.5 0.1 0.1",
+        }
+
+    def tearDown(self) -> None:
+        close_shard_sinks()
+        self.tmp_dir.cleanup()
+
+    def test_abstract(self) -> None:
+        """
+        Assert sinks implement write.
+        """
+        with self.assertRaises(TypeError):
+            Sink()
+
+    def test_directory_sink(self) -> None:
+        """
+        Assert files are written to the directory of their target.
+        """
+        outputs = DirectorySink(self.output_path).write("scene_0", self.files)
+        self.assertEqual(
+            outputs,
+            [
+                self.output_path / "segmentation" / "scene_0.png",
+                self.output_path / "yolo" / "scene_0.txt",
+            ],
+        )
+        self.assertEqual(outputs[0].read_bytes(), b"mask")
+
+    def test_shard_sink(self) -> None:
+        """
+        Assert scenes are split into complete shards without splitting
+        a scene and indexed with their number of scenes.
+        """
+        sink: ShardSink = ShardSink(self.output_path, max_samples=2)
+        samples: dict[str, int] = {}
+        for i in range(5):
+            for shard_path in sink.write(f"scene_{i}", self.files):
+                samples[shard_path.name] = samples.get(shard_path.name, 0) + 1
+        sink.close()
+        self.assertEqual(sorted(samples.values()), [1, 2, 2])
+        members: list[str] = []
+        for shard in sorted(samples):
+            with tarfile.open(self.output_path / shard) as tar:
+                members += tar.getnames()
+        self.assertEqual(len(members), 10)
+        self.assertEqual(members[:2], ["scene_0.segmentation.png", "scene_0.yolo.txt"])
+        with open(sink.write_index(samples)) as file_pointer:
+            index: dict = json.load(file_pointer)
+        self.assertEqual(sum(s["nsamples"] for s in index["shardlist"]), 5)
+        self.assertFalse(list(self.output_path.glob("*.tmp")))
+
+    def test_pickled_shard_sink(self) -> None:
+        """
+        Assert a pickled shard sink is the one sink of this process.
+        """
+        sink: ShardSink = ShardSink(self.output_path)
+        restored: ShardSink = pickle.loads(pickle.dumps(sink))
+        self.assertIs(restored, pickle.loads(pickle.dumps(sink)))
+        self.assertEqual(restored.output_path, self.output_path)
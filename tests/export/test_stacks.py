@@ -0,0 +1,89 @@
+import io
+import pathlib
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from export.export_labels import export_labels
+from export.stacks import create_stacks, export_stacks, load_stacks
+from tests.export.scratch_data_set import SETTINGS, write_data_set
+
+
+class TestStacks(TestCase):
+    def test_create_stacks(self) -> None:
+        """
+        Assert stacks are preallocated per target and samples written
+        by index are read back by scene name.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path: pathlib.Path = pathlib.Path(tmp_dir)
+            names: list[str] = ["scene_0", "scene_1", "scene_2"]
+            create_stacks(output_path, names, (8, 4), ["segmentation", "image"])
+            index, stacks = load_stacks(output_path, "r+")
+            for stack, shape in [("segmentation", (3, 4, 8)), ("image", (3, 4, 8, 3))]:
+                with self.subTest(stack=stack):
+                    self.assertEqual(stacks[stack].shape, shape)
+                    self.assertEqual(stacks[stack].dtype, np.uint8)
+            stacks["segmentation"][1] = 50
+            stacks["segmentation"].flush()
+            del stacks
+
+            index, stacks = load_stacks(output_path)
+            sample: int = index["names"].index("scene_1")
+            self.assertTrue(np.all(stacks["segmentation"][sample] == 50))
+            self.assertFalse(stacks["segmentation"][0].any())
+            del stacks
+
+    def test_export_stacks(self) -> None:
+        """
+        Assert workers fill the samples of their scenes like the label
+        export and failed scenes are named in the index and report.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path: pathlib.Path = pathlib.Path(tmp_dir)
+            dataset_path: pathlib.Path = tmp_path / "dataset"
+            names: list[str] = write_data_set(dataset_path, count=4)
+            with open(dataset_path / "annotations" / f"{names[-1]}.json", "w") as file:
+                file.write("{")
+            export_labels(
+                dataset_path,
+                tmp_path / "labels",
+                SETTINGS,
+                ["segmentation"],
+                size=(320, 240),
+                backend="serial",
+            )
+            for backend in ["thread", "process"]:
+                with self.subTest(backend=backend):
+                    output_path: pathlib.Path = tmp_path / backend
+                    with redirect_stdout(io.StringIO()) as stdout:
+                        export_stacks(
+                            dataset_path,
+                            output_path,
+                            SETTINGS,
+                            ["segmentation"],
+                            (320, 240),
+                            images=True,
+                            workers=2,
+                            chunksize=1,
+                            backend=backend,
+                        )
+                    index, stacks = load_stacks(output_path)
+                    self.assertEqual(index["names"], names)
+                    self.assertEqual(index["failed"], [names[-1]])
+                    self.assertIn(f'Traceback of "{names[-1]}"', stdout.getvalue())
+                    for sample, name in enumerate(names[:-1]):
+                        label: np.ndarray = cv2.imread(
+                            str(tmp_path / "labels" / "segmentation" / f"{name}.png"),
+                            cv2.IMREAD_UNCHANGED,
+                        )
+                        self.assertTrue(label.any())
+                        self.assertTrue(
+                            np.array_equal(stacks["segmentation"][sample], label)
+                        )
+                        self.assertTrue(stacks["image"][sample].any())
+                    self.assertFalse(stacks["segmentation"][3].any())
+                    del stacks
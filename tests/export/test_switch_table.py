@@ -0,0 +1,60 @@
+import pathlib
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from export.switch_table import COLUMNS, switch_columns, write_switch_table
+
+
+class TestSwitchTable(TestCase):
+    def setUp(self) -> None:
+        self.annotations: dict = {
+            "switches": {
+                "0": {
+                    "marks": [[181, 260], [100, 200]],
+                    "kind": True,
+                    "direction": False,
+                },
+                "1": {"marks": [[10, 20]], "kind": False, "direction": True},
+                "2": {
+                    "marks": [[400, 500], [300, 300]],
+                    "kind": False,
+                    "direction": True,
+                },
+            },
+        }
+
+    def test_switch_columns(self) -> None:
+        """
+        Assert pixel and relative boxes of complete switches.
+        """
+        columns: dict = switch_columns("scene_0", self.annotations, 1000, 500)
+        self.assertEqual(columns["switch_id"].tolist(), ["0", "2"])
+        self.assertEqual(columns["kind"].tolist(), ["fork", "merge"])
+        self.assertEqual(columns["direction"].tolist(), ["left", "right"])
+        np.testing.assert_allclose(columns["x_min"], [100, 300])
+        np.testing.assert_allclose(columns["y_max"], [260, 500])
+        np.testing.assert_allclose(columns["x_center"], [0.14, 0.35])
+        np.testing.assert_allclose(columns["height"], [0.12, 0.4])
+
+    def test_write_switch_table(self) -> None:
+        """
+        Assert CSV and NPZ tables contain all switches of all scenes.
+        """
+        tables: list[dict] = [
+            switch_columns(f"scene_{i}", self.annotations, 1000, 500) for i in range(3)
+        ]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for suffix in [".csv", ".npz"]:
+                with self.subTest(suffix=suffix):
+                    output_file = pathlib.Path(tmp_dir) / f"switches{suffix}"
+                    self.assertEqual(write_switch_table(tables, output_file), 6)
+                    if suffix == ".csv":
+                        lines: list[str] = output_file.read_text().splitlines()
+                        self.assertEqual(lines[0].split(","), COLUMNS)
+                        self.assertEqual(len(lines), 7)
+                    else:
+                        with np.load(output_file) as table:
+                            self.assertEqual(list(table["scene"][:2]), ["scene_0"] * 2)
+                            self.assertEqual(len(table["width"]), 6)
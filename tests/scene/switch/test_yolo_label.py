@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+import numpy as np
+
+from scene.switch.yolo_label import yolo_boxes
+
+
+class TestYoloBoxes(TestCase):
+    def setUp(self) -> None:
+        self.annotations: dict = {
+            "switches": {
+                0: {
+                    "marks": [[100, 200], [181, 260]],
+                    "kind": True,
+                    "direction": False,
+                    "tracks": [],
+                },
+                1: {"marks": [[10, 20]], "kind": False, "direction": True},
+                2: {
+                    "marks": [[400, 500], [300, 300]],
+                    "kind": False,
+                    "direction": True,
+                    "tracks": [],
+                },
+            },
+        }
+
+    def test_boxes(self) -> None:
+        """
+        Assert boxes are relative to width and height and incomplete
+        switches are skipped.
+        """
+        boxes: np.ndarray = yolo_boxes("both", self.annotations, 1000, 500)
+        expected: np.ndarray = np.array(
+            [
+                [2, 0.14, 0.46, 0.081, 0.12],
+                [1, 0.35, 0.8, 0.1, 0.4],
+            ]
+        )
+        np.testing.assert_allclose(boxes, expected)
+
+    def test_label_ids(self) -> None:
+        """
+        Assert label ids of all label options.
+        """
+        for desired_label, label_ids in [
+            ("kind", [0, 1]),
+            ("direction", [1, 0]),
+            ("both", [2, 1]),
+        ]:
+            with self.subTest(desired_label=desired_label):
+                boxes: np.ndarray = yolo_boxes(
+                    desired_label, self.annotations, 1000, 500
+                )
+                self.assertEqual(boxes[:, 0].tolist(), label_ids)
+        with self.assertRaises(ValueError):
+            yolo_boxes("color", self.annotations, 1000, 500)
+
+    def test_roi(self) -> None:
+        """
+        Assert boxes are relative to a region of interest and switches
+        outside of it are dropped.
+        """
+        boxes: np.ndarray = yolo_boxes(
+            "both", self.annotations, 1000, 500, roi=(100, 200, 200, 100)
+        )
+        np.testing.assert_allclose(boxes, [[2, 0.2, 0.3, 0.405, 0.6]])
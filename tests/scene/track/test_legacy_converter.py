@@ -0,0 +1,77 @@
+import json
+import pathlib
+import tempfile
+from unittest import TestCase
+
+from data.annotation_store import open_annotation_store
+from scene.track.legacy_converter import convert_annotations, convert_legacy_labels
+
+
+class TestLegacyConverter(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path: pathlib.Path = pathlib.Path(self._tmp_dir.name)
+        self.old_path: pathlib.Path = self.tmp_path / "old"
+        self.old_path.mkdir()
+        self.old_labels: dict = {
+            "ego track": [{"leftrail": [1, 2, 3, 4], "rightrail": [5, 6]}],
+            "left neighbors": [{"leftrail": [], "rightrail": [7, 8]}],
+        }
+        files: dict[str, str] = {
+            "scene_000000.json": json.dumps(self.old_labels),
+            "scene_000001.json": json.dumps({"tracks": []}),
+            "scene_000002.json": "{",
+        }
+        for file_name, content in files.items():
+            (self.old_path / file_name).write_text(content)
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_convert_legacy_labels(self) -> None:
+        """
+        Assert tracks are numbered in order with pairs of coordinates.
+        """
+        annotations: dict = convert_legacy_labels(self.old_labels)
+        assert annotations["tracks"]["0"] == {
+            "relative position": "ego",
+            "left rail": {"points": [[1, 2], [3, 4]]},
+            "right rail": {"points": [[5, 6]]},
+        }
+        assert annotations["tracks"]["1"]["relative position"] == "left"
+        with self.subTest(msg="Odd number of coordinates"):
+            with self.assertRaises(ValueError):
+                convert_legacy_labels({"ego track": [{"leftrail": [1, 2, 3]}]})
+
+    def test_convert_annotations(self) -> None:
+        """
+        Assert valid files are converted once per store and invalid
+        files are reported with a reason.
+        """
+        for store in ["json", "sqlite"]:
+            dataset_path: pathlib.Path = self.tmp_path / store
+            with self.subTest(msg=f"Convert into {store} store"):
+                report: list[dict]
+                report = convert_annotations(
+                    self.old_path, dataset_path, store, backend="serial"
+                )
+                statuses: list[str] = [row["status"] for row in report]
+                assert statuses == ["converted", "failed", "failed"]
+                assert all(row["reason"] for row in report[1:])
+                annotation_store = open_annotation_store(dataset_path, store)
+                assert annotation_store.read("scene_000000") == (
+                    convert_legacy_labels(self.old_labels)
+                )
+                annotation_store.close()
+
+            with self.subTest(msg=f"Skip converted files of {store} store"):
+                report = convert_annotations(
+                    self.old_path, dataset_path, store, backend="thread"
+                )
+                assert report[0]["status"] == "skipped"
+
+        with self.subTest(msg="Reject the annotation directory of a data set"):
+            with self.assertRaises(ValueError):
+                convert_annotations(
+                    self.old_path, self.tmp_path / "json" / "annotations"
+                )
@@ -114,6 +114,30 @@ class TestRail(TestCase):
 
             assert rail.to_dict() == rail_dict
 
+    def test_m_load_marks(self):
+        """
+        Assert Rail.load_marks methode.
+        """
+        rail: Rail = Rail(23.5)
+        rail.load_marks(np.array([[20, 15], [3, 5]]))
+        with self.subTest(msg="Keep order without rail points"):
+            assert rail.to_dict() == {"points": [[20, 15], [3, 5]]}
+            assert len(rail.splines(5)) == 10
+
+        with self.subTest(msg="Edit loaded marks"):
+            rail.add_mark(RailPoint(5, 10))
+            assert rail.marks == sorted(
+                [RailPoint(20, 15), RailPoint(3, 5), RailPoint(5, 10)]
+            )
+            assert rail.mark_array.shape == (3, 2)
+
+        with self.subTest(msg="Keep native coordinates of unedited marks"):
+            rail = Rail(23.5)
+            rail.load_marks(np.array([[20, 15], [3, 5]]), [[81, 59], [13, 21]])
+            assert rail.to_dict(4) == {"points": [[81, 59], [13, 21]]}
+            rail.add_mark(RailPoint(5, 10))
+            assert rail.to_dict(4) == {"points": [[13, 21], [20, 40], [81, 59]]}
+
     def test_m__contour_point(self) -> None:
         """
         Assert Rail._contour_point methode.
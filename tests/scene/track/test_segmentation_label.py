@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+import cv2
+import numpy as np
+
+from scene.track.segmentation_label import TRACK_COLORS, rasterize
+
+
+class TestRasterize(TestCase):
+    def setUp(self) -> None:
+        rng: np.random.Generator = np.random.default_rng(0)
+        self.polygons: list[tuple[str, np.ndarray]] = []
+        for index, class_name in enumerate(["ego_bed", "ego_rails", "left_rails"] * 4):
+            rows: np.ndarray = np.linspace(
+                rng.uniform(-50, 100), rng.uniform(150, 300), 15
+            )
+            columns: np.ndarray = rng.uniform(-20, 300) + np.cumsum(
+                rng.normal(0, 8, 15)
+            )
+            width: float = rng.uniform(3, 40)
+            polygon: np.ndarray = np.vstack(
+                [
+                    np.stack([columns, rows], 1),
+                    np.stack([columns + width, rows], 1)[::-1],
+                ]
+            )
+            # Polygons of untransformed scenes are integral
+            if index % 2:
+                polygon = np.rint(polygon).astype(np.int32)
+            self.polygons.append((class_name, polygon))
+
+    def test_tiles(self) -> None:
+        """
+        Assert tiled labels equal untiled labels, also for polygons
+        beyond the label borders.
+        """
+        for color_type, shape in [
+            ("segmentation", (240, 320)),
+            ("human", (240, 320, 3)),
+        ]:
+            label: np.ndarray = rasterize(self.polygons, shape, color_type)
+            assert label.any()
+            for tile_height in [1, 7, 64, 100, 239]:
+                with self.subTest(msg=f"{color_type} tiles of {tile_height} rows"):
+                    tiled: np.ndarray = rasterize(
+                        self.polygons, shape, color_type, tile_height=tile_height
+                    )
+                    assert np.array_equal(tiled, label)
+
+    def test_integer_polygons(self) -> None:
+        """
+        Assert polygons of untransformed scenes are rasterized at integer
+        precision like cv2.fillConvexPoly.
+        """
+        label: np.ndarray = rasterize(self.polygons[1::2], (240, 320))
+        expected: np.ndarray = np.zeros((240, 320), dtype=np.uint8)
+        for class_name, polygon in self.polygons[1::2]:
+            cv2.fillConvexPoly(
+                expected, polygon, TRACK_COLORS["segmentation"][class_name]
+            )
+        assert np.array_equal(label, expected)